@@ -0,0 +1,4 @@
+"""
+DIANA - Benchmarks de performance
+Mesures reproductibles hors ligne (images et modèles synthétiques)
+"""
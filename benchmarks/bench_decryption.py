@@ -0,0 +1,177 @@
+"""
+DIANA - Benchmark du déchiffrement du modèle
+Compare l'ancien format (jeton Fernet unique) au conteneur par blocs AES-GCM,
+déchiffré sur 1 à N threads : durée, débit et pic d'allocations Python
+
+Les fichiers sont déchiffrés par EncryptionManager, comme au chargement du
+modèle ; ils viennent d'être écrits et sont donc dans le cache disque.
+
+Usage:
+    python benchmarks/bench_decryption.py --size-mb 200
+    python benchmarks/bench_decryption.py --threads 1 2 4 8 --output benchmarks/results/decryption.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Sequence
+
+import cryptography
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config
+from benchmarks.bench_pipeline import latency_stats
+from src.encryption_manager import EncryptionManager
+
+DEFAULT_THREADS = [1, 2, 4, 8]
+
+
+def _measure(manager: EncryptionManager, path: Path, expected: bytes, iterations: int, warmup: int) -> Dict:
+    """
+    Mesure le déchiffrement d'un fichier
+
+    Returns:
+        Latences (ms), débit (Mo/s à p50) et pic d'allocations Python (Mo)
+    """
+    if manager.decrypt_to_memory(path) != expected:
+        raise RuntimeError(f"Déchiffrement incorrect: {path.name}")
+    for _ in range(warmup):
+        manager.decrypt_to_memory(path)
+
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        manager.decrypt_to_memory(path)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    # Passe séparée : tracemalloc ralentit les allocations
+    tracemalloc.start()
+    try:
+        manager.decrypt_to_memory(path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    stats = latency_stats(latencies)
+    return {
+        "latency_ms": stats,
+        "throughput_mb_per_second": len(expected) / (1024 * 1024) / (stats["p50"] / 1000),
+        "peak_memory_mb": peak / (1024 * 1024),
+    }
+
+
+def run_benchmark(
+    size_mb: float = 100,
+    threads: Sequence[int] = DEFAULT_THREADS,
+    iterations: int = 5,
+    warmup: int = 1,
+    chunk_size: int = config.MODEL_ENCRYPTION_CHUNK_SIZE,
+    use_mmap: bool = True
+) -> Dict:
+    """
+    Compare le déchiffrement Fernet et le conteneur par blocs
+
+    Args:
+        size_mb: Taille du modèle synthétique (Mo, données aléatoires)
+        threads: Nombres de threads à mesurer pour le conteneur par blocs
+        iterations: Déchiffrements mesurés par variante
+        warmup: Déchiffrements non mesurés par variante
+        chunk_size: Taille des blocs du conteneur
+        use_mmap: Lire le conteneur par projection mémoire (sinon lectures positionnelles)
+
+    Returns:
+        Rapport JSON-sérialisable (environnement, paramètres, résultats par variante)
+    """
+    data = os.urandom(int(size_mb * 1024 * 1024))
+    manager = EncryptionManager()
+    manager.chunk_size = chunk_size
+    manager.use_mmap = use_mmap
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        legacy_path = Path(work_dir) / "model.fernet.enc"
+        legacy_path.write_bytes(manager.fernet.encrypt(data))
+        chunked_path = Path(work_dir) / "model.chunked.enc"
+        if not manager.encrypt_to_file(data, chunked_path):
+            raise RuntimeError("Échec du chiffrement du modèle synthétique")
+
+        results["fernet"] = _measure(manager, legacy_path, data, iterations, warmup)
+        for thread_count in threads:
+            manager.decryption_threads = thread_count
+            results[f"chunked_{thread_count}"] = _measure(manager, chunked_path, data, iterations, warmup)
+
+    reference = results["fernet"]["latency_ms"]["p50"]
+    for result in results.values():
+        result["speedup_vs_fernet"] = reference / result["latency_ms"]["p50"]
+
+    return {
+        "environment": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cryptography": cryptography.__version__,
+            "cpu_count": os.cpu_count(),
+            "available_cpus": len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count(),
+        },
+        "parameters": {
+            "size_mb": size_mb,
+            "threads": list(threads),
+            "iterations": iterations,
+            "warmup": warmup,
+            "chunk_size": chunk_size,
+            "use_mmap": use_mmap,
+        },
+        "results": results,
+    }
+
+
+def parse_args():
+    """Arguments de la ligne de commande"""
+    parser = argparse.ArgumentParser(description="Benchmark du déchiffrement du modèle DIANA")
+    parser.add_argument("--size-mb", type=float, default=100, help="Taille du modèle synthétique en Mo (défaut: 100)")
+    parser.add_argument("--threads", type=int, nargs="+", default=DEFAULT_THREADS, help="Threads du conteneur par blocs (défaut: 1 2 4 8)")
+    parser.add_argument("--iterations", type=int, default=5, help="Déchiffrements mesurés par variante (défaut: 5)")
+    parser.add_argument("--warmup", type=int, default=1, help="Déchiffrements de préchauffage par variante (défaut: 1)")
+    parser.add_argument("--chunk-size", type=int, default=config.MODEL_ENCRYPTION_CHUNK_SIZE, help="Taille des blocs en octets (défaut: MODEL_ENCRYPTION_CHUNK_SIZE)")
+    parser.add_argument("--no-mmap", action="store_true", help="Lire le conteneur sans projection mémoire")
+    parser.add_argument("--output", type=Path, help="Fichier JSON du rapport (défaut: sortie standard)")
+    return parser.parse_args()
+
+
+def main():
+    """Exécute le benchmark"""
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    report = run_benchmark(
+        args.size_mb, args.threads, args.iterations, args.warmup, args.chunk_size,
+        use_mmap=not args.no_mmap
+    )
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+    for variant, result in report["results"].items():
+        print(
+            f"{variant:>10}: p50 {result['latency_ms']['p50']:8.1f} ms, "
+            f"{result['throughput_mb_per_second']:7.0f} Mo/s, pic {result['peak_memory_mb']:7.1f} Mo, "
+            f"x{result['speedup_vs_fernet']:.1f}",
+            file=sys.stderr
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""
+DIANA - Benchmark du pipeline de prédiction
+Mesure chaque étape (décodage, filtre, classifieur, post-traitement) pour des
+lots de 1 à 32 images, sur des images et des modèles synthétiques (hors ligne)
+
+Usage:
+    python benchmarks/bench_pipeline.py --output benchmarks/results/pipeline.json
+    python benchmarks/bench_pipeline.py --baseline ancienne_version.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import onnxruntime as ort
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config
+from benchmarks.synthetic import make_classifier_model, make_images
+from src.image_filter import ImageFilter
+from src.inference_engine import InferenceEngine
+from src.ort_session import IOBindingRunner, create_session
+from src.preprocessing import prepare_image
+
+STAGES = [
+    "decode",
+    "filter_preprocess",
+    "filter_inference",
+    "classifier_preprocess",
+    "classifier_inference",
+    "postprocess",
+]
+DEFAULT_BATCH_SIZES = [1, 2, 4, 8, 16, 32]
+
+# Écart absolu minimal (ms) pour signaler une régression : ignore le bruit des étapes très courtes
+_REGRESSION_FLOOR_MS = 0.05
+
+
+def latency_stats(latencies_ms: Sequence[float]) -> Dict:
+    """
+    Statistiques de latence
+
+    Args:
+        latencies_ms: Durées mesurées en millisecondes
+
+    Returns:
+        Moyenne et percentiles p50/p95/p99 en millisecondes
+    """
+    return {
+        "mean": float(np.mean(latencies_ms)),
+        "p50": float(np.percentile(latencies_ms, 50)),
+        "p95": float(np.percentile(latencies_ms, 95)),
+        "p99": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+def build_pipeline(work_dir: Path, filter_size: Tuple[int, int], classifier_size: Tuple[int, int]):
+    """
+    Construit un filtre et un classifieur sur des modèles synthétiques
+
+    Le filtre est chargé par ImageFilter.load_model ; le classifieur reçoit
+    sa session directement (le modèle synthétique n'est pas chiffré et le
+    benchmark ne doit pas consommer de quota).
+
+    Args:
+        work_dir: Dossier temporaire pour le modèle de filtrage
+        filter_size: Taille d'entrée du filtre
+        classifier_size: Taille d'entrée du classifieur
+
+    Returns:
+        (filtre, moteur d'inférence) prêts à l'emploi
+    """
+    filter_path = work_dir / "filter.onnx"
+    filter_path.write_bytes(make_classifier_model(filter_size, seed=1))
+    image_filter = ImageFilter()
+    image_filter.model_path = filter_path
+    if not image_filter.load_model():
+        raise RuntimeError("Échec du chargement du filtre synthétique")
+
+    engine = InferenceEngine()
+    engine.session = create_session(
+        make_classifier_model(classifier_size, seed=2),
+        engine.session_profile,
+        uint8_input=config.ORT_UINT8_INPUT
+    )
+    model_input = engine.session.get_inputs()[0]
+    engine.input_name = model_input.name
+    engine.output_names = [output.name for output in engine.session.get_outputs()]
+    engine.input_shape = model_input.shape
+    engine.input_type = model_input.type
+    engine.io_runner = IOBindingRunner(
+        engine.session, min(config.BATCH_MAX_SIZE, engine._max_batch_size())
+    ) if config.ORT_IO_BINDING else None
+    engine.model_version = "synthetic"
+    engine.is_loaded = True
+    return image_filter, engine
+
+
+def run_batch(sources: List[bytes], image_filter: ImageFilter, engine: InferenceEngine) -> Dict[str, float]:
+    """
+    Exécute le pipeline sur un lot en chronométrant chaque étape
+
+    Toutes les images passent par le classifieur (pire cas : aucune n'est
+    rejetée par le filtre).
+
+    Args:
+        sources: Images encodées
+        image_filter: Filtre chargé
+        engine: Moteur d'inférence chargé
+
+    Returns:
+        Durée de chaque étape en millisecondes
+    """
+    timings = {}
+    clock = time.perf_counter
+
+    start = clock()
+    size_hint = engine.get_input_size()
+    images = [prepare_image(source, size_hint) for source in sources]
+    for image in images:
+        image.decode(size_hint)
+    timings["decode"] = clock() - start
+
+    start = clock()
+    filter_inputs = [image_filter._model_input(image) for image in images]
+    timings["filter_preprocess"] = clock() - start
+
+    start = clock()
+    filter_logits = np.array(image_filter._run_inference(filter_inputs))
+    timings["filter_inference"] = clock() - start
+
+    start = clock()
+    classifier_inputs = [engine._model_input(image) for image in images]
+    timings["classifier_preprocess"] = clock() - start
+
+    start = clock()
+    classifier_logits = np.array(engine._run_inference(classifier_inputs))
+    timings["classifier_inference"] = clock() - start
+
+    start = clock()
+    for logits in filter_logits:
+        image_filter._interpret_logits(logits)
+    for logits in classifier_logits:
+        engine._build_result(logits)
+    timings["postprocess"] = clock() - start
+
+    return {stage: duration * 1000 for stage, duration in timings.items()}
+
+
+def run_benchmark(
+    batch_sizes: Sequence[int] = DEFAULT_BATCH_SIZES,
+    iterations: int = 30,
+    warmup: int = 3,
+    image_size: Tuple[int, int] = (1024, 768),
+    filter_size: Tuple[int, int] = (224, 224),
+    classifier_size: Tuple[int, int] = (256, 256)
+) -> Dict:
+    """
+    Mesure le pipeline pour chaque taille de lot
+
+    Args:
+        batch_sizes: Tailles de lot à mesurer
+        iterations: Lots mesurés par taille
+        warmup: Lots non mesurés avant chaque taille
+        image_size: Taille des images JPEG synthétiques
+        filter_size: Taille d'entrée du filtre synthétique
+        classifier_size: Taille d'entrée du classifieur synthétique ;
+            différente du filtre pour que son prétraitement soit mesuré
+
+    Returns:
+        Rapport JSON-sérialisable (environnement, paramètres, résultats par lot)
+    """
+    sources = make_images(max(batch_sizes), image_size)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        image_filter, engine = build_pipeline(Path(work_dir), filter_size, classifier_size)
+
+        results = {}
+        for batch_size in batch_sizes:
+            batch = sources[:batch_size]
+            for _ in range(warmup):
+                run_batch(batch, image_filter, engine)
+
+            samples = [run_batch(batch, image_filter, engine) for _ in range(iterations)]
+            totals = [sum(sample.values()) for sample in samples]
+            total_stats = latency_stats(totals)
+            results[str(batch_size)] = {
+                "batch_size": batch_size,
+                "stages": {stage: latency_stats([sample[stage] for sample in samples]) for stage in STAGES},
+                "total": total_stats,
+                "throughput_images_per_second": batch_size * 1000 / total_stats["p50"],
+            }
+
+    return {
+        "environment": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "onnxruntime": ort.__version__,
+            "numpy": np.__version__,
+            "cpu_count": os.cpu_count(),
+            "ort_profile": config.ORT_PROFILE,
+            "filter_ort_profile": config.FILTER_ORT_PROFILE,
+            "fast_image_decode": config.FAST_IMAGE_DECODE,
+            "ort_uint8_input": config.ORT_UINT8_INPUT,
+            "ort_io_binding": config.ORT_IO_BINDING,
+        },
+        "parameters": {
+            "batch_sizes": list(batch_sizes),
+            "iterations": iterations,
+            "warmup": warmup,
+            "image_size": list(image_size),
+            "filter_size": list(filter_size),
+            "classifier_size": list(classifier_size),
+        },
+        "results": results,
+    }
+
+
+def compare_results(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Compare deux rapports et liste les régressions de latence p50
+
+    Args:
+        current: Rapport de la version testée
+        baseline: Rapport de référence (version précédente)
+        tolerance: Hausse relative tolérée (0.15 = +15 %)
+
+    Returns:
+        Descriptions des étapes en régression (vide si aucune)
+    """
+    regressions = []
+    for key, result in current["results"].items():
+        reference = baseline.get("results", {}).get(key)
+        if reference is None:
+            continue
+
+        measures = dict(result["stages"], total=result["total"])
+        references = dict(reference["stages"], total=reference["total"])
+        for stage, stats in measures.items():
+            if stage not in references:
+                continue
+            before, after = references[stage]["p50"], stats["p50"]
+            if after > before * (1 + tolerance) and after - before > _REGRESSION_FLOOR_MS:
+                regressions.append(
+                    f"lot {key} / {stage}: p50 {before:.2f} ms -> {after:.2f} ms (+{(after / before - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def parse_size(value: str) -> Tuple[int, int]:
+    """Taille "LxH" (ou "N" pour un carré)"""
+    width, _, height = value.lower().partition("x")
+    return int(width), int(height or width)
+
+
+def parse_args():
+    """Arguments de la ligne de commande"""
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline de prédiction DIANA")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=DEFAULT_BATCH_SIZES, help="Tailles de lot (défaut: 1 2 4 8 16 32)")
+    parser.add_argument("--iterations", type=int, default=30, help="Lots mesurés par taille (défaut: 30)")
+    parser.add_argument("--warmup", type=int, default=3, help="Lots de préchauffage par taille (défaut: 3)")
+    parser.add_argument("--image-size", type=parse_size, default=(1024, 768), help="Taille des images synthétiques (défaut: 1024x768)")
+    parser.add_argument("--classifier-size", type=parse_size, default=(256, 256), help="Entrée du classifieur synthétique (défaut: 256)")
+    parser.add_argument("--output", type=Path, help="Fichier JSON du rapport (défaut: sortie standard)")
+    parser.add_argument("--baseline", type=Path, help="Rapport de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Hausse de p50 tolérée face à la référence (défaut: 0.15)")
+    return parser.parse_args()
+
+
+def main():
+    """Exécute le benchmark et compare éventuellement à une référence"""
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    report = run_benchmark(
+        args.batch_sizes, args.iterations, args.warmup, args.image_size,
+        classifier_size=args.classifier_size
+    )
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+    for key, result in report["results"].items():
+        print(
+            f"lot {key:>2}: p50 {result['total']['p50']:8.2f} ms, p99 {result['total']['p99']:8.2f} ms, "
+            f"{result['throughput_images_per_second']:7.1f} img/s",
+            file=sys.stderr
+        )
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare_results(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"❌ Régression: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("✅ Aucune régression", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+DIANA - Données synthétiques des benchmarks
+Images JPEG et petits modèles ONNX générés à la volée, sans téléchargement
+"""
+
+import io
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image
+
+try:
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+except ImportError:  # Optionnel : requis pour générer les modèles synthétiques
+    onnx = None
+
+
+def make_images(count: int, size: Tuple[int, int], seed: int = 0, quality: int = 90) -> List[bytes]:
+    """
+    Génère des images JPEG synthétiques (dégradés bruités, proches d'un cliché)
+
+    Args:
+        count: Nombre d'images
+        size: Taille (largeur, hauteur)
+        seed: Graine du générateur aléatoire
+        quality: Qualité JPEG
+
+    Returns:
+        Images encodées en JPEG
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    gradient = np.linspace(0, 200, width, dtype=np.float32)[np.newaxis, :, np.newaxis]
+
+    images = []
+    for _ in range(count):
+        noise = rng.normal(0, 25, size=(height, width, 3)).astype(np.float32)
+        pixels = np.clip(gradient + noise + rng.uniform(0, 55), 0, 255).astype(np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format='JPEG', quality=quality)
+        images.append(buffer.getvalue())
+    return images
+
+
+def make_classifier_model(
+    input_size: Tuple[int, int] = (224, 224),
+    num_classes: int = 3,
+    channels: int = 16,
+    seed: int = 0
+) -> bytes:
+    """
+    Construit un petit réseau convolutif ONNX aux poids aléatoires
+
+    Conv 3x3 (pas de 2) -> Relu -> Conv 3x3 (pas de 2) -> Relu ->
+    GlobalAveragePool -> Gemm, entrée "input" [batch, 3, H, W] et sortie
+    "output" [batch, num_classes], comme les modèles de DIANA.
+
+    Args:
+        input_size: Taille (largeur, hauteur) d'entrée
+        num_classes: Nombre de sorties
+        channels: Nombre de canaux des convolutions
+        seed: Graine des poids
+
+    Returns:
+        Modèle ONNX sérialisé
+
+    Raises:
+        ImportError: Si le paquet onnx n'est pas installé
+    """
+    if onnx is None:
+        raise ImportError("Le paquet onnx est requis pour générer le modèle synthétique (pip install onnx)")
+
+    rng = np.random.default_rng(seed)
+    width, height = input_size
+
+    def weights(name: str, shape: Tuple[int, ...]):
+        scale = np.sqrt(2.0 / np.prod(shape[1:]))
+        return numpy_helper.from_array((rng.standard_normal(shape) * scale).astype(np.float32), name)
+
+    initializers = [
+        weights("conv1_w", (channels, 3, 3, 3)),
+        numpy_helper.from_array(np.zeros(channels, dtype=np.float32), "conv1_b"),
+        weights("conv2_w", (channels, channels, 3, 3)),
+        numpy_helper.from_array(np.zeros(channels, dtype=np.float32), "conv2_b"),
+        weights("fc_w", (num_classes, channels)),
+        numpy_helper.from_array(np.zeros(num_classes, dtype=np.float32), "fc_b"),
+        numpy_helper.from_array(np.array([0, -1], dtype=np.int64), "flat_shape"),
+    ]
+    conv = dict(kernel_shape=[3, 3], strides=[2, 2], pads=[1, 1, 1, 1])
+    nodes = [
+        helper.make_node("Conv", ["input", "conv1_w", "conv1_b"], ["conv1"], **conv),
+        helper.make_node("Relu", ["conv1"], ["relu1"]),
+        helper.make_node("Conv", ["relu1", "conv2_w", "conv2_b"], ["conv2"], **conv),
+        helper.make_node("Relu", ["conv2"], ["relu2"]),
+        helper.make_node("GlobalAveragePool", ["relu2"], ["pool"]),
+        helper.make_node("Reshape", ["pool", "flat_shape"], ["features"]),
+        helper.make_node("Gemm", ["features", "fc_w", "fc_b"], ["output"], transB=1),
+    ]
+    graph = helper.make_graph(
+        nodes,
+        "diana_synthetic",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, ["batch_size", 3, height, width])],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, ["batch_size", num_classes])],
+        initializers
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.checker.check_model(model)
+    return model.SerializeToString()
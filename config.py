@@ -52,6 +52,99 @@ MODEL_ENCRYPTED_PATH = MODELS_DIR / "breast_cancer_model.onnx.enc"
 MODEL_DECRYPTED_PATH = MODELS_DIR / "breast_cancer_model.onnx"
 FILTER_MODEL_PATH = Path("models/filter/breast_cancer_filter.onnx")
 ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY", "").encode()
+# Taille des blocs (octets en clair) des modèles chiffrés au format conteneur par blocs
+MODEL_ENCRYPTION_CHUNK_SIZE = int(os.getenv("MODEL_ENCRYPTION_CHUNK_SIZE", str(1024 * 1024)))
+# Conserver la clé dérivée du mot de passe (PBKDF2) dans le trousseau du système
+# (paquet keyring requis) : les nouveaux processus évitent la dérivation
+KDF_KEYRING_CACHE = os.getenv("KDF_KEYRING_CACHE", "false").lower() in ("1", "true", "yes")
+# Lire les modèles chiffrés par projection mémoire (mmap) plutôt que par copies successives
+MODEL_MMAP_READ = os.getenv("MODEL_MMAP_READ", "true").lower() in ("1", "true", "yes")
+# Threads de déchiffrement des blocs (0 = cœurs disponibles, 8 au plus ; 1 = séquentiel)
+MODEL_DECRYPTION_THREADS = int(os.getenv("MODEL_DECRYPTION_THREADS", "0"))
+
+# Précision du classifieur : "fp32" (modèle d'origine) ou "int8" (variante quantifiée
+# produite par scripts/quantize_model.py). Repli sur fp32 si la variante est absente.
+MODEL_PRECISIONS = ("fp32", "int8")
+MODEL_PRECISION = os.getenv("MODEL_PRECISION", "fp32").lower()
+MODEL_INT8_ENCRYPTED_PATH = MODELS_DIR / "breast_cancer_model.int8.onnx.enc"
+QUANTIZATION_REPORT_PATH = MODELS_DIR / "quantization_report.json"
+
+# Profils de performance ONNX Runtime (SessionOptions)
+# intra/inter_op_num_threads: 0 = choix automatique d'ONNX Runtime
+# graph_optimization_level: "disable", "basic", "extended" ou "all"
+# execution_mode: "sequential" ou "parallel"
+ORT_PROFILES = {
+    "latency": {
+        "intra_op_num_threads": 0,
+        "inter_op_num_threads": 1,
+        "execution_mode": "sequential",
+        "graph_optimization_level": "all",
+        "enable_cpu_mem_arena": True,
+        "enable_mem_pattern": True,
+    },
+    "throughput": {
+        "intra_op_num_threads": 2,
+        "inter_op_num_threads": 1,
+        "execution_mode": "sequential",
+        "graph_optimization_level": "all",
+        "enable_cpu_mem_arena": True,
+        "enable_mem_pattern": True,
+    },
+    "low_memory": {
+        "intra_op_num_threads": 1,
+        "inter_op_num_threads": 1,
+        "execution_mode": "sequential",
+        "graph_optimization_level": "extended",
+        "enable_cpu_mem_arena": False,
+        "enable_mem_pattern": False,
+    },
+}
+ORT_PROFILE = os.getenv("ORT_PROFILE", "latency")  # Profil du classifieur
+FILTER_ORT_PROFILE = os.getenv("FILTER_ORT_PROFILE", ORT_PROFILE)  # Profil du filtre
+ORT_INTRA_OP_THREADS = os.getenv("ORT_INTRA_OP_THREADS")  # Surcharge optionnelle du profil
+ORT_INTER_OP_THREADS = os.getenv("ORT_INTER_OP_THREADS")  # Surcharge optionnelle du profil
+
+# Décodage JPEG rapide à résolution réduite (draft/reduce) avant le LANCZOS final
+# Plus rapide sur les grandes images, mais pixels légèrement différents du LANCZOS exact
+FAST_IMAGE_DECODE = os.getenv("FAST_IMAGE_DECODE", "false").lower() in ("1", "true", "yes")
+
+# Normalisation et passage HWC -> CHW intégrés au graphe ONNX (entrée uint8 NHWC)
+ORT_UINT8_INPUT = os.getenv("ORT_UINT8_INPUT", "false").lower() in ("1", "true", "yes")
+
+# Exécution par IOBinding avec tampons préalloués par thread (pas d'allocation par inférence)
+ORT_IO_BINDING = os.getenv("ORT_IO_BINDING", "false").lower() in ("1", "true", "yes")
+
+# Cache chiffré du graphe ONNX optimisé (évite la ré-optimisation au démarrage)
+ORT_OPTIMIZED_MODEL_CACHE = os.getenv("ORT_OPTIMIZED_MODEL_CACHE", "false").lower() in ("1", "true", "yes")
+ORT_CACHE_DIR = DATA_DIR / "ort_cache"
+
+# Préchauffage des modèles au démarrage (inférences factices avant de servir)
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+WARMUP_ITERATIONS = int(os.getenv("WARMUP_ITERATIONS", "3"))
+
+# Cache des résultats de prédiction (clé: empreinte de l'image + version des modèles)
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))  # 0 = sans expiration
+RESULT_CACHE_DISK = os.getenv("RESULT_CACHE_DISK", "false").lower() in ("1", "true", "yes")
+RESULT_CACHE_DISK_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_DISK_MAX_ENTRIES", "10000"))
+RESULT_CACHE_DIR = DATA_DIR / "result_cache"
+RESULT_CACHE_COUNT_QUOTA = os.getenv("RESULT_CACHE_COUNT_QUOTA", "true").lower() in ("1", "true", "yes")
+
+# Pool de threads pour le traitement CPU de l'API web (décodage, filtrage, inférence)
+WEB_WORKER_THREADS = int(os.getenv("WEB_WORKER_THREADS", str(min(4, os.cpu_count() or 1))))
+
+# Inférence multi-processus : le modèle est déchiffré une seule fois puis partagé
+# (fork copy-on-write, ou mémoire partagée avec "spawn") entre N processus épinglés
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))  # 0 = inférence dans le processus web
+INFERENCE_WORKER_START_METHOD = os.getenv("INFERENCE_WORKER_START_METHOD", "spawn")  # spawn, forkserver ou fork
+INFERENCE_WORKER_AFFINITY = os.getenv("INFERENCE_WORKER_AFFINITY", "true").lower() in ("1", "true", "yes")
+INFERENCE_WORKER_TIMEOUT = float(os.getenv("INFERENCE_WORKER_TIMEOUT", "30"))  # Secondes par inférence
+INFERENCE_WORKER_MAX_RESTARTS = int(os.getenv("INFERENCE_WORKER_MAX_RESTARTS", "5"))  # Redémarrages consécutifs avant abandon
+
+# Configuration du micro-batching de l'API web
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))  # Images max par inférence
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "10"))  # Attente max pour compléter un lot
 
 # Configuration des quotas
 FREE_TIER_LIMIT = int(os.getenv("FREE_TIER_LIMIT", "500"))
@@ -0,0 +1,116 @@
+"""
+DIANA - Analyse par lots d'un dossier d'images
+Analyse hors ligne d'un dossier ou d'un manifeste, résultats écrits au fil de
+l'eau en CSV ou JSONL ; relancer la même commande reprend là où elle s'est arrêtée
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+try:
+    from tqdm import tqdm
+except ImportError:  # Optionnel : barre de progression
+    tqdm = None
+
+import config
+from src.batch_analysis import (
+    OUTPUT_FORMATS, ResultWriter, Throughput, analyze, collect_images, load_processed, output_format
+)
+from src.inference_engine import get_inference_engine
+from src.quota_manager import QUOTA_EXCEEDED_MESSAGE, get_quota_manager
+
+
+def parse_args():
+    """Arguments de la ligne de commande"""
+    parser = argparse.ArgumentParser(description="Analyse par lots d'images avec DIANA")
+    parser.add_argument(
+        "input", type=Path,
+        help="Dossier d'images (parcouru récursivement) ou manifeste (.txt : un chemin par ligne, .csv : colonne 'path')"
+    )
+    parser.add_argument("--output", type=Path, default=Path("diana_results.csv"), help="Fichier de résultats (défaut: diana_results.csv)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default=None, help="Format de sortie (défaut: selon l'extension)")
+    parser.add_argument("--batch-size", type=int, default=config.BATCH_MAX_SIZE, help=f"Images par inférence (défaut: {config.BATCH_MAX_SIZE})")
+    parser.add_argument("--workers", type=int, default=config.WEB_WORKER_THREADS, help=f"Threads de décodage (défaut: {config.WEB_WORKER_THREADS})")
+    parser.add_argument("--retry-errors", action="store_true", help="Réanalyser les images en erreur lors d'une reprise")
+    return parser.parse_args()
+
+
+def main():
+    """Analyse toutes les images non encore traitées"""
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(message)s')
+
+    print("=" * 60)
+    print("DIANA - Analyse par lots")
+    print("=" * 60)
+
+    if not args.input.exists():
+        print(f"❌ Introuvable: {args.input}")
+        return 1
+
+    fmt = output_format(args.output, args.format)
+    paths = collect_images(args.input)
+    processed = load_processed(args.output, fmt, args.retry_errors)
+    remaining = [path for path in paths if str(path) not in processed]
+
+    print(f"\n📁 Source: {args.input} ({len(paths)} images)")
+    if processed:
+        print(f"⏭️  Déjà analysées: {len(paths) - len(remaining)}")
+    print(f"📄 Résultats: {args.output} ({fmt})")
+
+    if not remaining:
+        print("\n✅ Rien à analyser")
+        return 0
+
+    if not get_quota_manager().can_analyze():
+        print(f"\n⛔ {QUOTA_EXCEEDED_MESSAGE}")
+        return 1
+
+    engine = get_inference_engine()
+    if not engine.load_model():
+        print("❌ Impossible de charger le modèle")
+        return 1
+
+    throughput = Throughput()
+    progress = tqdm(total=len(remaining), unit="img") if tqdm is not None else None
+
+    def on_batch(count: int):
+        throughput.add(count)
+        if progress is not None:
+            progress.update(count)
+            progress.set_postfix_str(f"{throughput.rate:.1f} img/s")
+        else:
+            print(f"   {throughput.count}/{len(remaining)} images - {throughput.rate:.1f} img/s", flush=True)
+
+    print(f"\n🔬 Analyse de {len(remaining)} images (lots de {args.batch_size})...")
+    try:
+        with ResultWriter(args.output, fmt) as writer:
+            counts = analyze(remaining, engine, writer, args.batch_size, args.workers, on_batch)
+    except KeyboardInterrupt:
+        print(f"\n⏸️  Interrompu après {throughput.count} images. Relancer la même commande pour reprendre.")
+        return 130
+    finally:
+        if progress is not None:
+            progress.close()
+
+    if counts["quota_exceeded"]:
+        analyzed = counts["ok"] + counts["rejected"] + counts["error"] - counts["quota_exceeded"]
+        print(f"\n⛔ {QUOTA_EXCEEDED_MESSAGE}")
+        print(
+            f"   Analyse arrêtée après {analyzed} images : {len(remaining) - analyzed} non analysées. "
+            "Relancer la même commande pour reprendre."
+        )
+        return 1
+
+    print(f"\n✅ {counts['ok']} analysées, {counts['rejected']} rejetées, {counts['error']} en erreur")
+    print(f"⚡ Débit moyen: {throughput.rate:.1f} img/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -52,6 +52,7 @@ def main():
     print(f"\n📁 Source: {model_path}")
     print(f"📁 Destination: {output_path}")
     print(f"🔑 Clé de chiffrement: {'*' * 20}...")
+    print(f"📦 Format: conteneur par blocs AES-256-GCM ({config.MODEL_ENCRYPTION_CHUNK_SIZE // 1024} Ko par bloc)")
     
     confirm = input("\nLancer le chiffrement ? (o/n): ").strip().lower()
     
@@ -0,0 +1,110 @@
+"""
+DIANA - Script de quantification INT8 du modèle
+Construit la variante INT8 du modèle chiffré, la chiffre à côté du modèle FP32
+et compare précision et latence des deux variantes sur le jeu de calibration
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config
+from src.encryption_manager import EncryptionManager
+from src.quantization import (
+    QUANTIZATION_MODES, compare_models, list_calibration_images, quantize_model
+)
+
+
+def parse_args():
+    """Arguments de la ligne de commande"""
+    parser = argparse.ArgumentParser(description="Quantification INT8 du modèle DIANA")
+    parser.add_argument(
+        "calibration_dir", type=Path,
+        help="Dossier d'images de calibration (sous-dossiers Bénin/Malin/Normal optionnels pour mesurer l'exactitude)"
+    )
+    parser.add_argument("--mode", choices=QUANTIZATION_MODES, default="static", help="Type de quantification (défaut: static)")
+    parser.add_argument("--per-channel", action="store_true", help="Quantifier les poids par canal")
+    parser.add_argument("--input", type=Path, default=config.MODEL_ENCRYPTED_PATH, help="Modèle FP32 chiffré (.onnx.enc) ou en clair (.onnx)")
+    parser.add_argument("--output", type=Path, default=config.MODEL_INT8_ENCRYPTED_PATH, help="Modèle INT8 chiffré produit")
+    parser.add_argument("--report", type=Path, default=config.QUANTIZATION_REPORT_PATH, help="Rapport de comparaison JSON")
+    parser.add_argument("--max-images", type=int, default=0, help="Nombre maximal d'images utilisées (0 = toutes)")
+    return parser.parse_args()
+
+
+def main():
+    """Quantifie, chiffre et évalue le modèle INT8"""
+    args = parse_args()
+    
+    print("=" * 60)
+    print("DIANA - Quantification INT8 du modèle")
+    print("=" * 60)
+    
+    if not args.input.exists():
+        print(f"❌ Modèle introuvable: {args.input}")
+        return 1
+    
+    image_paths = list_calibration_images(args.calibration_dir)
+    if args.max_images > 0:
+        image_paths = image_paths[:args.max_images]
+    if not image_paths:
+        print(f"❌ Aucune image dans {args.calibration_dir}")
+        return 1
+    
+    print(f"\n📁 Modèle FP32: {args.input}")
+    print(f"🖼️  Images de calibration: {len(image_paths)}")
+    print(f"⚙️  Mode: {args.mode}{' (par canal)' if args.per_channel else ''}")
+    
+    # Le modèle FP32 n'est jamais écrit en clair sur disque
+    encryption_manager = EncryptionManager()
+    if args.input.suffix == '.enc':
+        fp32_model = encryption_manager.decrypt_to_memory(args.input)
+        if fp32_model is None:
+            print("❌ Échec du déchiffrement du modèle")
+            return 1
+    else:
+        fp32_model = args.input.read_bytes()
+    
+    print("\n🔧 Quantification en cours...")
+    int8_model = quantize_model(fp32_model, args.mode, image_paths, args.per_channel)
+    
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    if not encryption_manager.encrypt_to_file(int8_model, args.output):
+        print("❌ Échec du chiffrement du modèle INT8")
+        return 1
+    print(f"✅ Modèle INT8 chiffré: {args.output} ({args.output.stat().st_size / (1024*1024):.2f} MB)")
+    
+    # Comparaison précision / latence sur le même jeu d'images
+    print("\n📊 Comparaison FP32 / INT8...")
+    report = compare_models(fp32_model, int8_model, image_paths, labels_root=args.calibration_dir)
+    report.update({
+        "mode": args.mode,
+        "per_channel": args.per_channel,
+        "fp32_model": str(args.input),
+        "int8_model": str(args.output)
+    })
+    
+    args.report.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    
+    for precision in ("fp32", "int8"):
+        stats = report[precision]
+        accuracy = f", exactitude {stats['accuracy'] * 100:.1f}%" if stats["accuracy"] is not None else ""
+        print(
+            f"   {precision.upper()}: {stats['size_mb']:.2f} MB, "
+            f"p50 {stats['latency_ms']['p50']:.2f} ms, p95 {stats['latency_ms']['p95']:.2f} ms{accuracy}"
+        )
+    print(f"   Accord top-1: {report['top1_agreement'] * 100:.1f}%")
+    print(f"   Écart de probabilité: moyen {report['probability_delta_percent']['mean']:.2f} pts, max {report['probability_delta_percent']['max']:.2f} pts")
+    print(f"   Accélération: x{report['speedup']:.2f}")
+    print(f"\n📄 Rapport: {args.report}")
+    print("\nPour utiliser le modèle INT8: MODEL_PRECISION=int8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
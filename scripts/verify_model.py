@@ -0,0 +1,88 @@
+"""
+DIANA - Script de vérification d'intégrité des modèles chiffrés
+Contrôle les modèles chiffrés sans les déchiffrer en mémoire, pour les sondes
+de santé des déploiements (code de sortie 0 si tous les fichiers sont valides)
+
+Usage:
+    python scripts/verify_model.py                      # modèles configurés, tous les blocs
+    python scripts/verify_model.py --sample 8           # contrôle rapide : 8 blocs tirés au hasard
+    python scripts/verify_model.py --sample 0           # contrôle structurel seul (MAC et manifeste)
+    python scripts/verify_model.py models/x.onnx.enc --sample 8 --json
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config
+from src.encryption_manager import EncryptionManager
+from src.model_container import DEFAULT_ASSUMED_CORRUPTION
+
+
+def parse_args():
+    """Arguments de la ligne de commande"""
+    parser = argparse.ArgumentParser(description="Vérification d'intégrité des modèles chiffrés DIANA")
+    parser.add_argument(
+        "paths", type=Path, nargs="*",
+        help="Fichiers chiffrés à vérifier (défaut: modèles FP32 et INT8 configurés, s'ils existent)"
+    )
+    parser.add_argument("--sample", type=int, help="Nombre de blocs authentifiés par fichier (défaut: tous, 0 : contrôle structurel seul)")
+    parser.add_argument(
+        "--assumed-corruption", type=float, default=DEFAULT_ASSUMED_CORRUPTION,
+        help=f"Fraction de blocs altérés supposée pour la confiance (défaut: {DEFAULT_ASSUMED_CORRUPTION})"
+    )
+    parser.add_argument("--json", action="store_true", help="Afficher les bilans au format JSON")
+    return parser.parse_args()
+
+
+def main():
+    """Vérifie les modèles chiffrés"""
+    args = parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+
+    paths = args.paths or [
+        path for path in (config.MODEL_ENCRYPTED_PATH, config.MODEL_INT8_ENCRYPTED_PATH) if path.exists()
+    ]
+    if not paths:
+        print("❌ Aucun modèle chiffré à vérifier")
+        return 1
+    if args.sample is not None and args.sample < 0:
+        print(f"❌ Taille d'échantillon invalide: {args.sample}")
+        return 1
+
+    encryption_manager = EncryptionManager()
+    reports = [
+        encryption_manager.check_integrity(path, args.sample, args.assumed_corruption)
+        for path in paths
+    ]
+
+    if args.json:
+        print(json.dumps(reports, indent=2, ensure_ascii=False))
+    else:
+        for report in reports:
+            if not report["valid"]:
+                print(f"❌ {report['path']}: {report['error']}")
+                continue
+            if report["format"] == "fernet":
+                detail = "ancien format Fernet, déchiffré en entier"
+            elif report["chunks_checked"] == 0 and not report["complete"]:
+                detail = f"contrôle structurel (MAC et manifeste de {report['chunk_count']} blocs), aucun bloc déchiffré"
+            else:
+                detail = f"{report['chunks_checked']}/{report['chunk_count']} blocs authentifiés"
+                if not report["complete"]:
+                    detail += (
+                        f", confiance {report['confidence'] * 100:.1f}% "
+                        f"(si {report['assumed_corruption'] * 100:g}% des blocs sont altérés)"
+                    )
+            print(f"✅ {report['path']}: {detail}, {report['duration_ms']:.1f} ms")
+
+    return 0 if all(report["valid"] for report in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
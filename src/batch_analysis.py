@@ -0,0 +1,353 @@
+"""
+DIANA - Analyse par lots hors ligne
+Parcours d'un dossier ou d'un manifeste, décodage parallèle et inférence par lots
+avec écriture incrémentale et reprise après interruption
+"""
+
+import csv
+import io
+import json
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import config
+from src.inference_engine import InferenceEngine
+from src.preprocessing import PreparedImage, prepare_image
+from src.quota_manager import QUOTA_EXCEEDED_MESSAGE
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ("csv", "jsonl")
+STATUSES = ("ok", "rejected", "error")
+CSV_FIELDS = ["path", "status", "prediction", "confidence", "risk_level", "probabilities", "cached", "error"]
+
+
+def collect_images(source: Path) -> List[Path]:
+    """
+    Liste les images à analyser
+
+    Args:
+        source: Dossier (parcouru récursivement) ou manifeste : fichier texte
+            avec un chemin par ligne, ou CSV avec une colonne "path". Les
+            chemins relatifs d'un manifeste partent de son dossier.
+
+    Returns:
+        Chemins absolus des images, dans l'ordre de parcours
+    """
+    source = Path(source)
+    if source.is_dir():
+        return sorted(
+            path.resolve() for path in source.rglob("*")
+            if path.is_file() and path.suffix.lower() in config.SUPPORTED_IMAGE_FORMATS
+        )
+
+    with open(source, 'r', encoding='utf-8', newline='') as f:
+        if source.suffix.lower() == '.csv':
+            entries = [row["path"] for row in csv.DictReader(f)]
+        else:
+            entries = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+    return [(source.parent / entry).resolve() for entry in entries]
+
+
+def output_format(output_path: Path, requested: Optional[str] = None) -> str:
+    """Format de sortie demandé, sinon déduit de l'extension (CSV par défaut)"""
+    if requested:
+        return requested
+    return "jsonl" if Path(output_path).suffix.lower() in (".jsonl", ".ndjson") else "csv"
+
+
+def load_processed(output_path: Path, fmt: str, retry_errors: bool = False) -> Set[str]:
+    """
+    Chemins déjà présents dans un fichier de résultats (reprise)
+
+    Args:
+        output_path: Fichier de résultats existant ou absent
+        fmt: "csv" ou "jsonl"
+        retry_errors: Ne pas compter les images en erreur comme traitées
+
+    Returns:
+        Chemins déjà traités (la dernière ligne d'un chemin fait foi) ; les
+        images refusées faute de quota sont toujours réanalysées
+    """
+    statuses: Dict[str, str] = {}
+    if not Path(output_path).exists():
+        return set()
+
+    with open(output_path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+        content = f.read()
+    # Ligne finale sans fin de ligne : écriture interrompue, ignorée (retirée par ResultWriter)
+    lines = content[:content.rfind("\n") + 1].splitlines(keepends=True)
+
+    for row in _parse_rows(lines, fmt):
+        status = row.get("status")
+        if not isinstance(row.get("path"), str) or status not in STATUSES:
+            logger.warning(f"Ligne de résultats incomplète ignorée: {row.get('path')}")
+            continue
+        if status == "error" and row.get("error") == QUOTA_EXCEEDED_MESSAGE:
+            status = "quota"
+        statuses[row["path"]] = status
+
+    return {
+        path for path, status in statuses.items()
+        if status != "quota" and not (retry_errors and status == "error")
+    }
+
+
+def _parse_rows(lines: List[str], fmt: str) -> Iterator[Dict]:
+    """Lignes de résultats lisibles, une ligne illisible n'empêchant pas de lire les suivantes"""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        while True:
+            try:
+                yield next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                logger.warning(f"Ligne de résultats illisible ignorée: {e}")
+    else:
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                logger.warning(f"Ligne de résultats illisible ignorée: {e}")
+                continue
+            if isinstance(row, dict):
+                yield row
+
+
+def _truncate_partial_line(path: Path, block_size: int = 64 * 1024):
+    """
+    Retire la dernière ligne d'un fichier si elle est incomplète
+
+    Une interruption pendant l'écriture laisse une ligne sans fin de ligne :
+    sans cette coupure, la ligne suivante y serait ajoutée et les deux
+    seraient perdues à la reprise.
+    """
+    with open(path, 'r+b') as f:
+        end = f.seek(0, io.SEEK_END)
+        if end == 0:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return
+
+        keep = 0
+        position = end
+        while position > 0:
+            start = max(0, position - block_size)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b"\n")
+            if newline >= 0:
+                keep = start + newline + 1
+                break
+            position = start
+        logger.warning(f"Ligne incomplète retirée de {path} ({end - keep} octets)")
+        f.truncate(keep)
+
+
+class ResultWriter:
+    """Écrit les résultats au fil de l'eau (CSV ou JSONL), vidés après chaque lot"""
+
+    def __init__(self, output_path: Path, fmt: str):
+        self.output_path = Path(output_path)
+        self.fmt = fmt
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.output_path.exists():
+            _truncate_partial_line(self.output_path)
+        write_header = fmt == "csv" and (
+            not self.output_path.exists() or self.output_path.stat().st_size == 0
+        )
+        self._file = open(self.output_path, 'a', encoding='utf-8', newline='')
+        self._csv = csv.DictWriter(self._file, fieldnames=CSV_FIELDS) if fmt == "csv" else None
+        if write_header:
+            self._csv.writeheader()
+
+    def write(self, row: Dict):
+        """Ajoute une ligne de résultat"""
+        if self._csv is not None:
+            row = dict(row)
+            if row.get("probabilities") is not None:
+                row["probabilities"] = json.dumps(row["probabilities"], ensure_ascii=False)
+            self._csv.writerow(row)
+        else:
+            self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        """Force l'écriture sur disque"""
+        self._file.flush()
+
+    def close(self):
+        """Ferme le fichier de résultats"""
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def result_row(path: Path, result: Optional[Dict], error: Optional[str] = None) -> Dict:
+    """
+    Ligne de sortie pour un résultat de predict_batch
+
+    Args:
+        path: Image analysée
+        result: Résultat de prédiction (None si échec)
+        error: Message d'erreur (décodage)
+
+    Returns:
+        Ligne avec un statut "ok", "rejected" ou "error" (erreur aussi pour
+        une image refusée faute de quota)
+    """
+    row = {field: None for field in CSV_FIELDS}
+    row["path"] = str(path)
+
+    if result is None:
+        row.update(status="error", error=error or "Erreur lors de la prédiction")
+    elif result.get("quota_exceeded"):
+        row.update(status="error", error=result.get("message"))
+    elif result.get("error"):
+        row.update(status="rejected", error=result.get("message"))
+    else:
+        row.update(
+            status="ok",
+            prediction=result["prediction"],
+            confidence=round(result["confidence"], 4),
+            risk_level=result.get("risk_level"),
+            probabilities=result.get("probabilities"),
+            cached=bool(result.get("cached", False))
+        )
+    return row
+
+
+def _decode(path: Path, size_hint: Optional[Tuple[int, int]]) -> PreparedImage:
+    """Décode une image (exécuté dans le pool de décodage)"""
+    image = prepare_image(path, size_hint)
+    image.decode(size_hint)
+    return image
+
+
+def iter_decoded(
+    paths: Iterable[Path],
+    size_hint: Optional[Tuple[int, int]],
+    workers: int,
+    prefetch: int
+) -> Iterator[Tuple[Path, Optional[PreparedImage], Optional[str]]]:
+    """
+    Décode les images en parallèle, dans l'ordre, avec une avance bornée
+
+    Args:
+        paths: Images à décoder
+        size_hint: Indication de taille pour le décodage rapide
+        workers: Nombre de threads de décodage
+        prefetch: Nombre maximal d'images décodées en avance (borne la mémoire)
+
+    Yields:
+        (chemin, image décodée ou None, message d'erreur ou None)
+    """
+    paths = iter(paths)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="diana-decode") as pool:
+        pending = deque()
+        for path in paths:
+            pending.append((path, pool.submit(_decode, path, size_hint)))
+            if len(pending) >= prefetch:
+                break
+
+        while pending:
+            path, future = pending.popleft()
+            next_path = next(paths, None)
+            if next_path is not None:
+                pending.append((next_path, pool.submit(_decode, next_path, size_hint)))
+            try:
+                yield path, future.result(), None
+            except Exception as e:
+                yield path, None, f"Impossible de lire l'image: {e}"
+
+
+def analyze(
+    paths: List[Path],
+    engine: InferenceEngine,
+    writer: ResultWriter,
+    batch_size: int = config.BATCH_MAX_SIZE,
+    workers: int = config.WEB_WORKER_THREADS,
+    on_batch: Optional[Callable[[int], None]] = None
+) -> Dict[str, int]:
+    """
+    Analyse une liste d'images par lots et écrit chaque résultat
+
+    L'analyse s'arrête au premier lot dont des images sont refusées faute de
+    quota : ces images sont écrites en erreur, les suivantes ne sont pas
+    analysées.
+
+    Args:
+        paths: Images à analyser
+        engine: Moteur d'inférence chargé
+        writer: Destination des résultats
+        batch_size: Images par appel à predict_batch
+        workers: Threads de décodage
+        on_batch: Rappel après chaque lot avec le nombre d'images traitées
+
+    Returns:
+        Compteurs par statut ("ok", "rejected", "error") et nombre d'images
+        refusées faute de quota ("quota_exceeded", comptées aussi en erreur)
+    """
+    counts = {"ok": 0, "rejected": 0, "error": 0, "quota_exceeded": 0}
+    batch_size = max(1, batch_size)
+    batch: List[Tuple[Path, PreparedImage]] = []
+
+    def flush_batch():
+        if batch:
+            results = engine.predict_batch([image for _, image in batch], batch_size)
+            for (path, _), result in zip(batch, results):
+                row = result_row(path, result)
+                counts[row["status"]] += 1
+                if result is not None and result.get("quota_exceeded"):
+                    counts["quota_exceeded"] += 1
+                writer.write(row)
+        writer.flush()
+        if on_batch is not None:
+            on_batch(processed)
+        batch.clear()
+
+    processed = 0
+    for path, image, error in iter_decoded(paths, engine.get_input_size(), workers, 2 * batch_size):
+        processed += 1
+        if image is None:
+            counts["error"] += 1
+            writer.write(result_row(path, None, error))
+        else:
+            batch.append((path, image))
+        if len(batch) >= batch_size:
+            flush_batch()
+            processed = 0
+            if counts["quota_exceeded"]:
+                return counts
+
+    flush_batch()
+    return counts
+
+
+class Throughput:
+    """Mesure du débit (images par seconde)"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.count = 0
+
+    def add(self, count: int):
+        """Ajoute des images traitées"""
+        self.count += count
+
+    @property
+    def rate(self) -> float:
+        """Images par seconde depuis le début"""
+        elapsed = time.perf_counter() - self.start
+        return self.count / elapsed if elapsed > 0 else 0.0
@@ -0,0 +1,193 @@
+"""
+DIANA - Ordonnanceur de micro-batching
+Regroupe les requêtes de prédiction concurrentes en inférences par lots
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Dict, List, Any
+
+import config
+from src.inference_engine import InferenceEngine, get_inference_engine
+from src.executor import run_cpu_bound
+from src.metrics import get_service_metrics
+from src.single_flight import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingRequest:
+    """Requête en attente dans la file du micro-batcher"""
+    image: Any
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class MicroBatcher:
+    """
+    Micro-batcher asynchrone devant InferenceEngine.predict_batch
+
+    Les requêtes sont placées dans une file ; un worker collecte jusqu'à
+    max_batch_size requêtes ou attend au plus max_wait_ms, puis exécute une
+    seule inférence par lot et renvoie chaque résultat à sa requête.
+    """
+
+    def __init__(
+        self,
+        engine: Optional[InferenceEngine] = None,
+        max_batch_size: int = config.BATCH_MAX_SIZE,
+        max_wait_ms: float = config.BATCH_MAX_WAIT_MS
+    ):
+        self.engine = engine
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._in_flight = AsyncSingleFlight()
+
+    @property
+    def queue_depth(self) -> int:
+        """Nombre de requêtes en attente"""
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self):
+        """Démarre le worker de batching sur la boucle courante"""
+        if self._worker is not None and not self._worker.done():
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+        logger.info(
+            f"Micro-batcher démarré (lot max: {self.max_batch_size}, "
+            f"attente max: {self.max_wait_ms:.1f} ms)"
+        )
+
+    async def stop(self):
+        """Arrête le worker et annule les requêtes en attente"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        while self._queue and not self._queue.empty():
+            pending = self._queue.get_nowait()
+            if not pending.future.done():
+                pending.future.cancel()
+        logger.info("Micro-batcher arrêté")
+
+    async def submit(self, image) -> Optional[Dict]:
+        """
+        Soumet une image et attend son résultat
+
+        Les soumissions concurrentes d'une même image (même empreinte de
+        contenu) partagent une seule place dans la file.
+
+        Args:
+            image: Image à analyser (tout format accepté par predict_batch)
+
+        Returns:
+            Résultat de prédiction enrichi de la clé "batching"
+            (queue_time_ms, batch_size), ou None si erreur
+        """
+        await self.start()
+
+        key = self._coalescing_key(image)
+        if key is None:
+            return await self._enqueue(image)
+
+        result, shared = await self._in_flight.do(key, lambda: self._enqueue(image))
+        if shared:
+            # Décompte du quota (écriture de fichier) hors de la boucle
+            result = await run_cpu_bound(self._get_engine().mark_shared_result, result)
+        return result
+
+    def _coalescing_key(self, image) -> Optional[str]:
+        """Empreinte du contenu d'une image préparée, None sinon"""
+        try:
+            return getattr(image, "content_hash", None)
+        except Exception as e:
+            logger.warning(f"Empreinte de l'image impossible, coalescence ignorée: {e}")
+            return None
+
+    def _get_engine(self) -> InferenceEngine:
+        """Moteur utilisé par le worker"""
+        return self.engine or get_inference_engine()
+
+    async def _enqueue(self, image) -> Optional[Dict]:
+        """Place une image dans la file et attend son résultat"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingRequest(image=image, future=future))
+        return await future
+
+    async def _collect_batch(self) -> List[_PendingRequest]:
+        """Attend une requête puis complète le lot jusqu'à la taille ou au délai max"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait_ms / 1000
+
+        while len(batch) < self.max_batch_size:
+            # Prendre sans attendre les requêtes déjà en file
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        """Boucle principale du worker"""
+        engine = self._get_engine()
+
+        while True:
+            batch = await self._collect_batch()
+
+            # Ignorer les requêtes abandonnées par le client
+            batch = [pending for pending in batch if not pending.future.done()]
+            if not batch:
+                continue
+
+            get_service_metrics().observe_batch(len(batch))
+            batch_start = time.perf_counter()
+            try:
+                results = await run_cpu_bound(
+                    engine.predict_batch,
+                    [pending.image for pending in batch],
+                    len(batch)
+                )
+            except Exception as e:
+                logger.error(f"Erreur du micro-batcher: {e}")
+                results = [None] * len(batch)
+
+            for pending, result in zip(batch, results):
+                if pending.future.done():
+                    continue
+                if result is not None:
+                    result["batching"] = {
+                        "queue_time_ms": (batch_start - pending.enqueued_at) * 1000,
+                        "batch_size": len(batch)
+                    }
+                pending.future.set_result(result)
+
+
+# Singleton global
+_micro_batcher_instance: Optional[MicroBatcher] = None
+
+
+def get_micro_batcher() -> MicroBatcher:
+    """Retourne l'instance singleton du micro-batcher"""
+    global _micro_batcher_instance
+    if _micro_batcher_instance is None:
+        _micro_batcher_instance = MicroBatcher()
+    return _micro_batcher_instance
@@ -0,0 +1,219 @@
+"""
+DIANA - Lecture des images DICOM
+Décodage des pixels et fenêtrage VOI LUT vectorisé, sans conversion intermédiaire
+"""
+
+import io
+import logging
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+from PIL import Image
+
+try:
+    import pydicom
+except ImportError:  # Optionnel : lecture des fichiers DICOM
+    pydicom = None
+
+logger = logging.getLogger(__name__)
+
+DICOM_EXTENSIONS = (".dcm", ".dicom")
+
+# Seuls les attributs utiles au rendu sont lus (pas les métadonnées patient)
+_PIXEL_TAGS = [
+    "SamplesPerPixel", "PhotometricInterpretation", "PlanarConfiguration",
+    "NumberOfFrames", "Rows", "Columns",
+    "BitsAllocated", "BitsStored", "HighBit", "PixelRepresentation",
+    "RescaleSlope", "RescaleIntercept",
+    "WindowCenter", "WindowWidth", "VOILUTFunction", "VOILUTSequence",
+    "PixelData", "FloatPixelData", "DoubleFloatPixelData",
+]
+
+_RASTER_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+DicomSource = Union[str, Path, bytes, bytearray, memoryview]
+
+
+def is_dicom(source) -> bool:
+    """
+    Détecte un fichier DICOM (préambule "DICM" ou extension .dcm)
+
+    Args:
+        source: Chemin ou contenu du fichier
+
+    Returns:
+        True si la source est un fichier DICOM
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source[128:132]) == b"DICM"
+
+    if isinstance(source, (str, Path)):
+        path = Path(source)
+        if path.suffix.lower() in DICOM_EXTENSIONS:
+            return True
+        if path.suffix.lower() in _RASTER_EXTENSIONS:
+            return False
+        # Extension absente ou inconnue : vérifier le préambule
+        try:
+            with open(path, 'rb') as f:
+                f.seek(128)
+                return f.read(4) == b"DICM"
+        except OSError:
+            return False
+
+    return False
+
+
+def load_dicom(source: DicomSource) -> Image.Image:
+    """
+    Lit une image DICOM et la convertit en image 8 bits fenêtrée
+
+    Seuls les pixels et les attributs de fenêtrage sont lus. Les syntaxes de
+    transfert compressées (JPEG, JPEG 2000, RLE...) sont décodées par les
+    décodeurs de pydicom (Pillow, pylibjpeg ou GDCM selon l'installation).
+    Pour un fichier multi-images, seule la première image est décodée.
+
+    Args:
+        source: Chemin ou contenu du fichier DICOM
+
+    Returns:
+        Image PIL ("L" en niveaux de gris, "RGB" en couleur)
+
+    Raises:
+        ImportError: Si pydicom n'est pas installé
+    """
+    if pydicom is None:
+        raise ImportError("Le paquet pydicom est requis pour lire les fichiers DICOM (pip install pydicom)")
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+
+    dataset = pydicom.dcmread(source, specific_tags=_PIXEL_TAGS, force=True)
+    pixels = _first_frame(dataset)
+
+    photometric = str(dataset.get("PhotometricInterpretation", "MONOCHROME2")).upper()
+    if dataset.get("SamplesPerPixel", 1) > 1:
+        return Image.fromarray(_color_to_uint8(dataset, pixels, photometric))
+
+    values = _apply_modality_lut(dataset, pixels)
+    values = apply_voi_lut(dataset, values)
+
+    # MONOCHROME1 : valeurs élevées = noir
+    if photometric == "MONOCHROME1":
+        np.subtract(1.0, values, out=values)
+
+    return Image.fromarray(_to_uint8(values))
+
+
+def _first_frame(dataset) -> np.ndarray:
+    """Décode uniquement la première image des pixels"""
+    number_of_frames = int(dataset.get("NumberOfFrames", 1) or 1)
+
+    if number_of_frames > 1 and hasattr(pydicom, "pixels"):
+        # pydicom >= 3 : décodage d'une seule image sans décoder tout le volume
+        return pydicom.pixels.pixel_array(dataset, index=0)
+
+    pixels = dataset.pixel_array
+    return pixels[0] if number_of_frames > 1 else pixels
+
+
+def _apply_modality_lut(dataset, pixels: np.ndarray) -> np.ndarray:
+    """Convertit les pixels stockés en valeurs de modalité (RescaleSlope/Intercept) en float32"""
+    values = pixels.astype(np.float32)
+    slope = float(dataset.get("RescaleSlope", 1) or 1)
+    intercept = float(dataset.get("RescaleIntercept", 0) or 0)
+    if slope != 1:
+        np.multiply(values, slope, out=values)
+    if intercept != 0:
+        np.add(values, intercept, out=values)
+    return values
+
+
+def _first_value(value) -> Optional[float]:
+    """Première valeur d'un attribut DICOM éventuellement multi-valué"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except TypeError:
+        return float(value[0]) if len(value) else None
+
+
+def apply_voi_lut(dataset, values: np.ndarray) -> np.ndarray:
+    """
+    Applique la transformation VOI (PS3.3 C.11.2) et normalise dans [0, 1]
+
+    Ordre de priorité : VOI LUT Sequence, puis fenêtre WindowCenter/WindowWidth
+    (fonctions LINEAR, LINEAR_EXACT et SIGMOID), sinon étirement min/max.
+
+    Args:
+        dataset: Dataset DICOM (attributs de fenêtrage)
+        values: Valeurs de modalité (float32), modifiées en place si possible
+
+    Returns:
+        Valeurs normalisées float32 dans [0, 1]
+    """
+    voi_lut_sequence = dataset.get("VOILUTSequence")
+    if voi_lut_sequence:
+        item = voi_lut_sequence[0]
+        entries, first_mapped, bits = (int(value) for value in item.LUTDescriptor)
+        entries = entries or 65536
+        lut_data = item.LUTData
+        if isinstance(lut_data, bytes):
+            # OW : mots de 16 bits, quel que soit le nombre de bits utiles
+            lut_data = np.frombuffer(lut_data, dtype=np.uint16 if len(lut_data) >= 2 * entries else np.uint8)
+        lut = np.asarray(lut_data, dtype=np.float32)[:entries]
+        indices = np.clip(values - first_mapped, 0, len(lut) - 1).astype(np.intp)
+        return np.take(lut, indices) / np.float32(2 ** bits - 1)
+
+    center = _first_value(dataset.get("WindowCenter"))
+    width = _first_value(dataset.get("WindowWidth"))
+    if center is not None and width is not None and width > 0:
+        function = str(dataset.get("VOILUTFunction", "LINEAR")).upper()
+
+        if function == "SIGMOID":
+            np.subtract(values, center, out=values)
+            np.multiply(values, -4.0 / width, out=values)
+            np.exp(values, out=values)
+            np.add(values, 1.0, out=values)
+            return np.reciprocal(values, out=values)
+
+        if function == "LINEAR_EXACT":
+            np.subtract(values, center, out=values)
+            np.divide(values, width, out=values)
+        else:
+            if width < 1:
+                width = 1.0
+            np.subtract(values, center - 0.5, out=values)
+            np.divide(values, max(width - 1, 1.0), out=values)
+        np.add(values, 0.5, out=values)
+        return np.clip(values, 0.0, 1.0, out=values)
+
+    # Pas de fenêtre : étirement sur la dynamique de l'image
+    low, high = float(values.min()), float(values.max())
+    np.subtract(values, low, out=values)
+    if high > low:
+        np.divide(values, high - low, out=values)
+    return values
+
+
+def _to_uint8(values: np.ndarray) -> np.ndarray:
+    """Convertit des valeurs [0, 1] en pixels 8 bits"""
+    np.multiply(values, 255.0, out=values)
+    np.rint(values, out=values)
+    return values.astype(np.uint8)
+
+
+def _color_to_uint8(dataset, pixels: np.ndarray, photometric: str) -> np.ndarray:
+    """Convertit une image DICOM couleur en RGB 8 bits"""
+    if photometric.startswith("YBR") and not hasattr(pydicom, "pixels"):
+        # pydicom < 3 ne convertit pas automatiquement l'espace colorimétrique
+        from pydicom.pixel_data_handlers.util import convert_color_space
+        pixels = convert_color_space(pixels, photometric, "RGB")
+
+    bits_stored = int(dataset.get("BitsStored", 8) or 8)
+    if pixels.dtype == np.uint8 and bits_stored <= 8:
+        return np.ascontiguousarray(pixels)
+    values = pixels.astype(np.float32) / np.float32(2 ** bits_stored - 1)
+    return _to_uint8(np.clip(values, 0.0, 1.0, out=values))
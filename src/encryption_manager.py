@@ -1,22 +1,135 @@
 """
 DIANA - Gestionnaire de chiffrement
 Chiffrement/déchiffrement sécurisé du modèle ONNX
+
+Les fichiers sont écrits au format conteneur par blocs (AES-256-GCM, voir
+src/model_container.py) ; l'ancien format (jeton Fernet unique) reste lisible.
 """
 
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
 import base64
+import hashlib
+import hmac
+import io
 import os
+import threading
+import time
+
+try:
+    import keyring
+except ImportError:  # Optionnel : cache de la clé dérivée dans le trousseau du système
+    keyring = None
 
 import config
+from src.model_container import (
+    DEFAULT_ASSUMED_CORRUPTION, MAGIC, decrypt_container, is_chunked_container, verify_container, write_container
+)
 
 logger = logging.getLogger(__name__)
 
+# Dérivation PBKDF2 de la clé à partir du mot de passe
+KDF_SALT = b'diana_breast_cancer_detection_2025'  # Salt fixe pour reproductibilité
+KDF_ITERATIONS = 100000
+_KEYRING_SERVICE = "diana"
+
+# Clés dérivées par (empreinte du mot de passe, sel, itérations) : PBKDF2 une seule fois par processus
+_derived_keys: Dict[Tuple[bytes, bytes, int], bytes] = {}
+_derived_keys_lock = threading.Lock()
+
+# Au-delà, le déchiffrement est limité par la bande passante mémoire
+_MAX_AUTO_DECRYPTION_THREADS = 8
+
+
+def default_decryption_threads() -> int:
+    """Threads de déchiffrement : config.MODEL_DECRYPTION_THREADS ou cœurs disponibles"""
+    if config.MODEL_DECRYPTION_THREADS > 0:
+        return config.MODEL_DECRYPTION_THREADS
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    return max(1, min(cpus, _MAX_AUTO_DECRYPTION_THREADS))
+
+
+def derive_key(password: bytes, salt: bytes = KDF_SALT, iterations: int = KDF_ITERATIONS) -> bytes:
+    """
+    Dérive une clé par PBKDF2-SHA256, mémorisée pour tout le processus
+    
+    Les instances suivantes d'EncryptionManager (scripts, tests, cache du
+    graphe optimisé...) réutilisent la clé au lieu de refaire les itérations.
+    Avec KDF_KEYRING_CACHE, la clé est aussi conservée dans le trousseau du
+    système : un nouveau processus ne la redérive pas.
+    
+    Args:
+        password: Mot de passe source
+        salt: Sel de dérivation
+        iterations: Nombre d'itérations PBKDF2
+        
+    Returns:
+        Clé brute de 32 octets
+    """
+    cache_key = (hashlib.sha256(password).digest(), salt, iterations)
+    with _derived_keys_lock:
+        key = _derived_keys.get(cache_key)
+        if key is None:
+            key = _load_keyring_key(password, salt, iterations)
+            if key is None:
+                kdf = PBKDF2HMAC(
+                    algorithm=hashes.SHA256(),
+                    length=32,
+                    salt=salt,
+                    iterations=iterations,
+                    backend=default_backend()
+                )
+                key = kdf.derive(password)
+                _store_keyring_key(password, salt, iterations, key)
+            _derived_keys[cache_key] = key
+        return key
+
+
+def _keyring_entry(salt: bytes, iterations: int) -> str:
+    """Nom de l'entrée du trousseau (indépendant du mot de passe, visible hors du secret)"""
+    return "kdf-" + hashlib.sha256(salt + iterations.to_bytes(8, "big")).hexdigest()[:16]
+
+
+def _keyring_verifier(password: bytes, salt: bytes, key: bytes) -> str:
+    """Vérificateur stocké avec la clé : détecte un changement de mot de passe"""
+    return hmac.new(key, salt + password, hashlib.sha256).hexdigest()
+
+
+def _load_keyring_key(password: bytes, salt: bytes, iterations: int) -> Optional[bytes]:
+    """Clé dérivée conservée dans le trousseau, ou None (absente, autre mot de passe, trousseau indisponible)"""
+    if not config.KDF_KEYRING_CACHE or keyring is None:
+        return None
+    try:
+        secret = keyring.get_password(_KEYRING_SERVICE, _keyring_entry(salt, iterations))
+        if not secret:
+            return None
+        verifier, _, encoded_key = secret.partition(":")
+        key = base64.urlsafe_b64decode(encoded_key)
+    except Exception as e:
+        logger.warning(f"Clé dérivée non lue depuis le trousseau: {e}")
+        return None
+    
+    if not hmac.compare_digest(verifier, _keyring_verifier(password, salt, key)):
+        return None
+    logger.info("Clé de chiffrement lue depuis le trousseau du système")
+    return key
+
+
+def _store_keyring_key(password: bytes, salt: bytes, iterations: int, key: bytes):
+    """Conserve la clé dérivée dans le trousseau (si activé)"""
+    if not config.KDF_KEYRING_CACHE or keyring is None:
+        return
+    secret = f"{_keyring_verifier(password, salt, key)}:{base64.urlsafe_b64encode(key).decode()}"
+    try:
+        keyring.set_password(_KEYRING_SERVICE, _keyring_entry(salt, iterations), secret)
+    except Exception as e:
+        logger.warning(f"Clé dérivée non enregistrée dans le trousseau: {e}")
+
 
 class EncryptionManager:
     """Gestion du chiffrement et déchiffrement du modèle ONNX"""
@@ -33,6 +146,11 @@ class EncryptionManager:
         
         self.encryption_key = self._derive_key(key)
         self.fernet = Fernet(self.encryption_key)
+        # Clé maître du conteneur par blocs (les 32 octets de la clé Fernet)
+        self.container_key = base64.urlsafe_b64decode(self.encryption_key)
+        self.chunk_size = config.MODEL_ENCRYPTION_CHUNK_SIZE
+        self.decryption_threads = default_decryption_threads()
+        self.use_mmap = config.MODEL_MMAP_READ
     
     def _derive_key(self, password: bytes) -> bytes:
         """
@@ -51,17 +169,8 @@ class EncryptionManager:
         except:
             pass
         
-        # Sinon, dériver une clé à partir du mot de passe
-        salt = b'diana_breast_cancer_detection_2025'  # Salt fixe pour reproductibilité
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-            backend=default_backend()
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password))
-        return key
+        # Sinon, dériver une clé à partir du mot de passe (mémorisée pour le processus)
+        return base64.urlsafe_b64encode(derive_key(password))
     
     def encrypt_file(self, input_path: Path, output_path: Optional[Path] = None) -> bool:
         """
@@ -80,18 +189,39 @@ class EncryptionManager:
         try:
             logger.info(f"Chiffrement de {input_path}...")
             
-            # Lire le fichier source
-            with open(input_path, 'rb') as f:
-                data = f.read()
+            # Chiffrer bloc par bloc, sans lire le fichier source en entier
+            with open(input_path, 'rb') as source, open(output_path, 'wb') as output:
+                write_container(
+                    source,
+                    os.fstat(source.fileno()).st_size,
+                    output,
+                    self.container_key,
+                    self.chunk_size
+                )
             
-            # Chiffrer
-            encrypted_data = self.fernet.encrypt(data)
+            logger.info(f"Fichier chiffré: {output_path}")
+            return True
             
-            # Écrire le fichier chiffré
-            with open(output_path, 'wb') as f:
-                f.write(encrypted_data)
+        except Exception as e:
+            logger.error(f"Erreur lors du chiffrement: {e}")
+            return False
+    
+    def encrypt_to_file(self, data: bytes, output_path: Path) -> bool:
+        """
+        Chiffre des données en mémoire directement vers un fichier
+        
+        Args:
+            data: Données en clair à chiffrer
+            output_path: Chemin du fichier chiffré
             
-            logger.info(f"Fichier chiffré: {output_path}")
+        Returns:
+            True si succès, False sinon
+        """
+        try:
+            with open(output_path, 'wb') as output:
+                write_container(io.BytesIO(data), len(data), output, self.container_key, self.chunk_size)
+            
+            logger.info(f"Données chiffrées: {output_path}")
             return True
             
         except Exception as e:
@@ -115,12 +245,7 @@ class EncryptionManager:
         try:
             logger.info(f"Déchiffrement de {input_path}...")
             
-            # Lire le fichier chiffré
-            with open(input_path, 'rb') as f:
-                encrypted_data = f.read()
-            
-            # Déchiffrer
-            decrypted_data = self.fernet.decrypt(encrypted_data)
+            decrypted_data = self._decrypt(input_path)
             
             # Écrire le fichier déchiffré
             with open(output_path, 'wb') as f:
@@ -146,12 +271,7 @@ class EncryptionManager:
         try:
             logger.info(f"Déchiffrement en mémoire: {input_path}")
             
-            # Lire le fichier chiffré
-            with open(input_path, 'rb') as f:
-                encrypted_data = f.read()
-            
-            # Déchiffrer
-            decrypted_data = self.fernet.decrypt(encrypted_data)
+            decrypted_data = self._decrypt(input_path)
             
             logger.info("Déchiffrement en mémoire réussi")
             return decrypted_data
@@ -160,28 +280,104 @@ class EncryptionManager:
             logger.error(f"Erreur déchiffrement en mémoire: {e}")
             return None
     
-    def verify_encrypted_file(self, file_path: Path) -> bool:
+    def verify_encrypted_file(self, file_path: Path, sample: Optional[int] = None) -> bool:
         """
         Vérifie qu'un fichier est bien chiffré et déchiffrable
         
         Args:
             file_path: Chemin du fichier chiffré
+            sample: Nombre de blocs authentifiés (défaut: tous, voir check_integrity)
             
         Returns:
             True si le fichier est valide
         """
+        return self.check_integrity(file_path, sample)["valid"]
+    
+    def check_integrity(
+        self,
+        file_path: Path,
+        sample: Optional[int] = None,
+        assumed_corruption: float = DEFAULT_ASSUMED_CORRUPTION
+    ) -> Dict:
+        """
+        Vérifie l'intégrité d'un fichier chiffré sans produire le modèle en clair
+        
+        Conteneur par blocs : MAC de l'en-tête et manifeste des tags, puis tags
+        GCM de tous les blocs ou d'un échantillon (contrôle rapide pour les
+        sondes de santé). Ancien format Fernet : déchiffrement complet, seul
+        moyen de vérifier son unique jeton.
+        
+        Args:
+            file_path: Chemin du fichier chiffré
+            sample: Nombre de blocs tirés au hasard et authentifiés (défaut: tous,
+                0 : contrôle structurel seul, sans déchiffrement)
+            assumed_corruption: Fraction de blocs altérés supposée pour la confiance
+            
+        Returns:
+            Bilan : valid, format, durée, blocs vérifiés, confiance et erreur éventuelle
+        """
+        report = {"valid": False, "path": str(file_path), "format": None, "error": None}
+        start = time.perf_counter()
         try:
             with open(file_path, 'rb') as f:
-                encrypted_data = f.read()
-            
-            # Essayer de déchiffrer (sans sauvegarder)
-            self.fernet.decrypt(encrypted_data)
+                if is_chunked_container(f.read(len(MAGIC))):
+                    report["format"] = "chunked"
+                    f.seek(0)
+                    result = verify_container(
+                        f, self.container_key, self.decryption_threads, self.use_mmap,
+                        sample=sample, assumed_corruption=assumed_corruption
+                    )
+                    report.update(result.as_dict())
+                    report["valid"] = True
             
-            return True
+            if report["format"] is None:
+                # Ancien format : essayer de déchiffrer (sans sauvegarder)
+                report["format"] = "fernet"
+                self._decrypt(file_path)
+                report.update({"complete": True, "confidence": 1.0})
+                report["valid"] = True
             
         except Exception as e:
             logger.error(f"Fichier chiffré invalide: {e}")
-            return False
+            report["error"] = str(e) or type(e).__name__
+        
+        report["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return report
+    
+    def _decrypt(self, input_path: Path) -> bytes:
+        """
+        Déchiffre un fichier au format conteneur par blocs ou Fernet (détecté)
+        
+        Args:
+            input_path: Chemin du fichier chiffré
+            
+        Returns:
+            Données déchiffrées
+            
+        Raises:
+            ValueError, InvalidToken: Si le fichier est invalide ou la clé fausse
+        """
+        with open(input_path, 'rb') as f:
+            if is_chunked_container(f.read(len(MAGIC))):
+                f.seek(0)
+                return decrypt_container(f, self.container_key, self.decryption_threads, self.use_mmap)
+            
+            # Ancien format : un seul jeton Fernet ("gAAAAA...") lu en entier
+            f.seek(0)
+            return self.fernet.decrypt(f.read())
+    
+    def is_legacy_format(self, file_path: Path) -> bool:
+        """
+        Indique si un fichier chiffré utilise l'ancien format Fernet
+        
+        Args:
+            file_path: Chemin du fichier chiffré
+            
+        Returns:
+            True pour l'ancien format, False pour le conteneur par blocs
+        """
+        with open(file_path, 'rb') as f:
+            return not is_chunked_container(f.read(len(MAGIC)))
     
     @staticmethod
     def generate_key() -> bytes:
@@ -221,8 +417,25 @@ class ModelDecryptor:
     def __init__(self):
         self.encryption_manager = EncryptionManager()
         self.encrypted_model_path = config.MODEL_ENCRYPTED_PATH
+        self.int8_encrypted_model_path = config.MODEL_INT8_ENCRYPTED_PATH
         self.decrypted_model_path = config.MODEL_DECRYPTED_PATH
     
+    def get_encrypted_model_path(self, precision: str = "fp32") -> Path:
+        """
+        Retourne le chemin du modèle chiffré pour une précision
+        
+        Args:
+            precision: "fp32" ou "int8"
+            
+        Returns:
+            Chemin du fichier chiffré
+        """
+        if precision == "fp32":
+            return self.encrypted_model_path
+        if precision == "int8":
+            return self.int8_encrypted_model_path
+        raise ValueError(f"Précision inconnue: {precision} (disponibles: {', '.join(config.MODEL_PRECISIONS)})")
+    
     def can_decrypt(self, is_premium: bool, has_quota: bool) -> bool:
         """
         Vérifie si le déchiffrement est autorisé
@@ -266,13 +479,14 @@ class ModelDecryptor:
         
         return None
     
-    def get_model_in_memory(self, is_premium: bool, has_quota: bool) -> Optional[bytes]:
+    def get_model_in_memory(self, is_premium: bool, has_quota: bool, precision: str = "fp32") -> Optional[bytes]:
         """
         Déchiffre le modèle directement en mémoire (plus sécurisé)
         
         Args:
             is_premium: L'utilisateur est premium
             has_quota: L'utilisateur a du quota gratuit restant
+            precision: Variante du modèle à déchiffrer ("fp32" ou "int8")
             
         Returns:
             Données du modèle déchiffré ou None
@@ -281,11 +495,12 @@ class ModelDecryptor:
             logger.warning("Déchiffrement non autorisé")
             return None
         
-        if not self.encrypted_model_path.exists():
-            logger.error(f"Modèle chiffré introuvable: {self.encrypted_model_path}")
+        encrypted_model_path = self.get_encrypted_model_path(precision)
+        if not encrypted_model_path.exists():
+            logger.error(f"Modèle chiffré introuvable: {encrypted_model_path}")
             return None
         
-        return self.encryption_manager.decrypt_to_memory(self.encrypted_model_path)
+        return self.encryption_manager.decrypt_to_memory(encrypted_model_path)
     
     def cleanup(self):
         """Supprime le modèle déchiffré du disque"""
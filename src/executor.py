@@ -0,0 +1,58 @@
+"""
+DIANA - Exécuteur des tâches CPU
+Pool de threads borné pour sortir le traitement d'images de la boucle asyncio
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Any
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+# Singleton global
+_cpu_executor_instance: Optional[ThreadPoolExecutor] = None
+
+
+def get_cpu_executor() -> ThreadPoolExecutor:
+    """Retourne le pool de threads partagé pour les tâches CPU"""
+    global _cpu_executor_instance
+    if _cpu_executor_instance is None:
+        max_workers = max(1, config.WEB_WORKER_THREADS)
+        _cpu_executor_instance = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="diana-cpu"
+        )
+        logger.info(f"Pool de threads CPU initialisé ({max_workers} threads)")
+    return _cpu_executor_instance
+
+
+async def run_cpu_bound(func: Callable, *args, **kwargs) -> Any:
+    """
+    Exécute une fonction bloquante dans le pool CPU sans bloquer la boucle
+
+    Args:
+        func: Fonction à exécuter
+        *args, **kwargs: Arguments de la fonction
+
+    Returns:
+        Valeur de retour de la fonction
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_cpu_executor(),
+        functools.partial(func, *args, **kwargs)
+    )
+
+
+def shutdown_cpu_executor():
+    """Arrête le pool de threads CPU"""
+    global _cpu_executor_instance
+    if _cpu_executor_instance is not None:
+        _cpu_executor_instance.shutdown(wait=False, cancel_futures=True)
+        _cpu_executor_instance = None
+        logger.info("Pool de threads CPU arrêté")
@@ -4,14 +4,17 @@ Vérifie si les images sont relatives au cancer du sein avant analyse
 """
 
 import logging
+import hashlib
 import io
+import time
 from pathlib import Path
-from typing import Optional, Dict, Tuple
+from typing import Optional, Dict, Tuple, List, Union
 import numpy as np
-from PIL import Image
 import onnxruntime as ort
 
 import config
+from src.ort_session import IOBindingRunner, create_session, get_profile_settings, warmup_session
+from src.preprocessing import ImageSource, PreparedImage, prepare_image
 
 logger = logging.getLogger(__name__)
 
@@ -24,8 +27,13 @@ class ImageFilter:
         self.input_name: Optional[str] = None
         self.output_names: Optional[list] = None
         self.input_shape: Optional[Tuple] = None
+        self.input_type: Optional[str] = None
+        self.io_runner: Optional[IOBindingRunner] = None
         self.is_loaded = False
         self.model_path = config.FILTER_MODEL_PATH
+        self.session_profile = config.FILTER_ORT_PROFILE
+        self.model_version = "disabled"
+        self.load_time_ms: Optional[float] = None
     
     def load_model(self, force_reload: bool = False) -> bool:
         """
@@ -41,6 +49,7 @@ class ImageFilter:
             logger.info("Modèle de filtrage déjà chargé")
             return True
         
+        load_start = time.perf_counter()
         try:
             # Vérifier que le modèle existe
             if not self.model_path.exists():
@@ -51,24 +60,35 @@ class ImageFilter:
             # Charger le modèle ONNX
             logger.info("Chargement du modèle de filtrage ONNX...")
             
-            # Configurer les providers (GPU si disponible, sinon CPU)
-            providers = ['CPUExecutionProvider']
-            if 'CUDAExecutionProvider' in ort.get_available_providers():
-                providers.insert(0, 'CUDAExecutionProvider')
-                logger.info("GPU CUDA détecté pour le filtrage")
-            
-            self.session = ort.InferenceSession(
-                str(self.model_path),
-                providers=providers
+            # Session configurée selon le profil de performance (GPU si disponible)
+            self.session = create_session(
+                self.model_path,
+                self.session_profile,
+                uint8_input=config.ORT_UINT8_INPUT
             )
             
+            # Empreinte du modèle (invalide le cache de résultats à chaque nouveau filtre)
+            with open(self.model_path, 'rb') as f:
+                self.model_version = hashlib.sha256(f.read()).hexdigest()[:16]
+            
             # Récupérer les métadonnées du modèle
             self.input_name = self.session.get_inputs()[0].name
             self.output_names = [output.name for output in self.session.get_outputs()]
             self.input_shape = self.session.get_inputs()[0].shape
+            self.input_type = self.session.get_inputs()[0].type
+            
+            # Tampons préalloués réutilisés d'une inférence à l'autre (optionnel)
+            self.io_runner = IOBindingRunner(
+                self.session,
+                min(config.BATCH_MAX_SIZE, self._max_batch_size())
+            ) if config.ORT_IO_BINDING else None
             
             self.is_loaded = True
-            logger.info(f"Modèle de filtrage chargé: {self.input_name}, Shape: {self.input_shape}")
+            self.load_time_ms = (time.perf_counter() - load_start) * 1000
+            logger.info(
+                f"Modèle de filtrage chargé en {self.load_time_ms:.0f} ms: "
+                f"{self.input_name}, Shape: {self.input_shape}"
+            )
             
             return True
             
@@ -77,46 +97,69 @@ class ImageFilter:
             self.is_loaded = False
             return False
     
-    def preprocess_image(self, image_path: Path) -> Optional[np.ndarray]:
+    def warmup(self, iterations: int = config.WARMUP_ITERATIONS) -> bool:
+        """
+        Charge le modèle de filtrage et exécute des inférences factices
+        
+        Args:
+            iterations: Nombre d'inférences factices
+            
+        Returns:
+            True si le modèle est chargé et préchauffé
+        """
+        if not self.is_loaded and not self.load_model():
+            return False
+        
+        try:
+            warmup_time = warmup_session(self.session, iterations)
+            logger.info(f"Modèle de filtrage préchauffé ({iterations} inférences, {warmup_time:.2f} ms)")
+            return True
+        except Exception as e:
+            logger.error(f"Erreur lors du préchauffage du filtre: {e}")
+            return False
+    
+    def _get_target_size(self) -> Tuple[int, int]:
+        """
+        Détermine la taille (largeur, hauteur) attendue par le modèle de filtrage
+        
+        Returns:
+            Taille cible pour le redimensionnement
+        """
+        # Redimensionner à 224x224 (standard pour les modèles de vision)
+        target_size = (224, 224)
+        if self.input_shape and len(self.input_shape) >= 3:
+            # Adapter selon la forme d'entrée du modèle
+            if self.input_shape[1] in [1, 3]:  # Channels first
+                target_size = (self.input_shape[2], self.input_shape[3])
+            else:  # Channels last
+                target_size = (self.input_shape[1], self.input_shape[2])
+        return target_size
+    
+    def _model_input(self, image: PreparedImage) -> np.ndarray:
+        """
+        Entrée du modèle pour une image préparée
+        
+        Returns:
+            Pixels uint8 NHWC si la normalisation est intégrée au graphe,
+            sinon tenseur float32 NCHW normalisé
+        """
+        if self.input_type == "tensor(uint8)":
+            return image.pixels(self._get_target_size())
+        return image.tensor(self._get_target_size())
+    
+    def preprocess_image(self, image_path: Union[ImageSource, PreparedImage]) -> Optional[np.ndarray]:
         """
         Prétraite une image pour le filtrage
         
         Args:
-            image_path: Chemin de l'image
+            image_path: Chemin, octets, image PIL, tableau numpy (HWC) ou PreparedImage
             
         Returns:
             Tensor numpy prétraité ou None si erreur
         """
         try:
-            # Charger l'image
-            image = Image.open(image_path)
-            
-            # Convertir en RGB si nécessaire
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Redimensionner à 224x224 (standard pour les modèles de vision)
-            target_size = (224, 224)
-            if self.input_shape and len(self.input_shape) >= 3:
-                # Adapter selon la forme d'entrée du modèle
-                if self.input_shape[1] in [1, 3]:  # Channels first
-                    target_size = (self.input_shape[2], self.input_shape[3])
-                else:  # Channels last
-                    target_size = (self.input_shape[1], self.input_shape[2])
-            
-            image = image.resize(target_size, Image.Resampling.LANCZOS)
-            
-            # Convertir en array numpy
-            img_array = np.array(image, dtype=np.float32)
-            
-            # Normaliser (0-255 -> 0-1)
-            img_array = img_array / 255.0
-            
-            # Ajouter la dimension batch et réorganiser (HWC -> CHW)
-            if len(img_array.shape) == 3:
-                img_array = np.transpose(img_array, (2, 0, 1))  # HWC -> CHW
-            
-            img_array = np.expand_dims(img_array, axis=0)  # Ajouter batch dimension
+            # Décodage et redimensionnement partagés (mis en cache par taille)
+            img_array = self._model_input(prepare_image(image_path))
             
             logger.debug(f"Image prétraitée pour filtrage: {img_array.shape}")
             return img_array
@@ -125,12 +168,12 @@ class ImageFilter:
             logger.error(f"Erreur lors du prétraitement pour filtrage: {e}")
             return None
     
-    def filter_image(self, image_path: Path) -> Dict:
+    def filter_image(self, image_path: Union[ImageSource, PreparedImage]) -> Dict:
         """
         Filtre une image pour vérifier si elle est relative au cancer du sein
         
         Args:
-            image_path: Chemin de l'image à filtrer
+            image_path: Image à filtrer (chemin, octets, image PIL ou tableau numpy)
             
         Returns:
             Dictionnaire avec le résultat du filtrage
@@ -139,97 +182,176 @@ class ImageFilter:
             # Si le modèle n'est pas chargé, accepter toutes les images
             if not self.is_loaded:
                 logger.warning("Modèle de filtrage non disponible - image acceptée par défaut")
-                return {
-                    "accepted": True,
-                    "reason": "Filtrage désactivé",
-                    "confidence": 1.0,
-                    "category": "unknown",
-                    "category_name": "Filtrage désactivé"
-                }
+                return self._disabled_result()
             
             # Prétraiter l'image
             input_tensor = self.preprocess_image(image_path)
             if input_tensor is None:
-                return {
-                    "accepted": False,
-                    "reason": "Erreur de prétraitement",
-                    "confidence": 0.0,
-                    "category": "error"
-                }
+                return self._error_result("Erreur de prétraitement")
             
             # Effectuer l'inférence de filtrage
             logger.info("Exécution du filtrage d'image...")
-            outputs = self.session.run(
-                self.output_names,
-                {self.input_name: input_tensor}
-            )
+            output = self._run_inference([input_tensor])
             
             # Traiter les résultats
-            logits = outputs[0][0]  # Première sortie, premier batch
-            
-            # Appliquer softmax pour obtenir des probabilités
-            exp_logits = np.exp(logits - np.max(logits))  # Stabilité numérique
-            probabilities = exp_logits / np.sum(exp_logits)
-            
-            logger.info(f"Probabilités de filtrage: {probabilities}")
-            
-            # Classes de filtrage - Vérifier l'ordre
-            categories = ["non_medical", "medical_other", "breast_cancer"]
-            category_names = ["Non-médical", "Médical autre", "Cancer du sein"]
-            
-            # Debug : Afficher les probabilités par classe
-            logger.info(f"Probabilités par classe:")
-            for i, (cat, name) in enumerate(zip(categories, category_names)):
-                logger.info(f"  {name}: {probabilities[i]*100:.2f}%")
-            
-            # Trouver la catégorie prédite
-            category_id = int(np.argmax(probabilities))
-            category = categories[category_id]
-            category_name = category_names[category_id]
-            confidence = float(probabilities[category_id])
+            logits = output[0]  # Première sortie, premier batch
+            return self._interpret_logits(logits)
             
-            # Déterminer si l'image est acceptée
-            # Seules les images de cancer du sein sont acceptées
-            # Ajuster le seuil de confiance pour être plus permissif
-            accepted = (category == "breast_cancer") or (category == "medical_other" and confidence > 0.3)
-            
-            # Messages selon la catégorie
-            if category == "non_medical":
-                reason = "Image non-médicale détectée. Veuillez uploader une image médicale (mammographie, échographie mammaire, etc.)"
-            elif category == "medical_other":
-                reason = "Image médicale détectée mais non relative au cancer du sein. Veuillez uploader une image de mammographie ou d'échographie mammaire"
-            else:  # breast_cancer
-                reason = "Image relative au cancer du sein détectée"
-            
-            result = {
-                "accepted": accepted,
-                "reason": reason,
-                "confidence": confidence * 100,
-                "category": category,
-                "category_name": category_name,
-                "probabilities": {
-                    name: float(prob) * 100 
-                    for name, prob in zip(category_names, probabilities)
-                }
-            }
+        except Exception as e:
+            logger.error(f"Erreur lors du filtrage: {e}")
+            return self._error_result(f"Erreur de filtrage: {str(e)}")
+    
+    def filter_batch(self, images: List, batch_size: int = 8) -> List[Dict]:
+        """
+        Filtre plusieurs images en regroupant les inférences par lots
+        
+        Args:
+            images: Liste d'images (chemins, octets, images PIL ou tableaux numpy)
+            batch_size: Nombre maximal d'images par inférence
             
-            logger.info(f"Filtrage: {category_name} ({confidence*100:.2f}%) - {'Accepté' if accepted else 'Rejeté'}")
+        Returns:
+            Liste de résultats de filtrage, dans l'ordre d'entrée
+        """
+        if not self.is_loaded:
+            logger.warning("Modèle de filtrage non disponible - images acceptées par défaut")
+            return [self._disabled_result() for _ in images]
+        
+        results: List[Dict] = [self._error_result("Erreur de prétraitement") for _ in images]
+        
+        # Respecter une dimension batch fixe (ex: 1) imposée par le modèle
+        batch_size = max(1, min(batch_size, self._max_batch_size()))
+        
+        for batch_start in range(0, len(images), batch_size):
+            batch_indices = []
+            tensors = []
+            for index in range(batch_start, min(batch_start + batch_size, len(images))):
+                input_tensor = self.preprocess_image(images[index])
+                if input_tensor is not None:
+                    batch_indices.append(index)
+                    tensors.append(input_tensor)
+            
+            if not tensors:
+                continue
+            
+            try:
+                output = self._run_inference(tensors)
+                for index, logits in zip(batch_indices, output):
+                    results[index] = self._interpret_logits(logits)
+            except Exception as e:
+                logger.error(f"Erreur lors du filtrage par lot: {e}")
+                for index in batch_indices:
+                    results[index] = self._error_result(f"Erreur de filtrage: {str(e)}")
+        
+        return results
+    
+    def _run_inference(self, inputs: List[np.ndarray]) -> np.ndarray:
+        """
+        Exécute le filtre sur un lot d'entrées prétraitées
+        
+        Args:
+            inputs: Entrées [1, ...] de même forme
             
-            return result
+        Returns:
+            Première sortie du modèle [batch, 3] ; avec IOBinding, vue sur les
+            tampons du thread à exploiter avant l'inférence suivante
+        """
+        if self.io_runner is not None and len(inputs) <= self.io_runner.max_batch_size:
+            return self.io_runner.run(inputs)[0]
+        
+        batch = inputs[0] if len(inputs) == 1 else np.concatenate(inputs, axis=0)
+        return self.session.run(self.output_names, {self.input_name: batch})[0]
+    
+    def _max_batch_size(self) -> int:
+        """Taille de lot maximale acceptée par le modèle (dimension batch fixe ou illimitée)"""
+        if self.input_shape and isinstance(self.input_shape[0], int) and self.input_shape[0] > 0:
+            return self.input_shape[0]
+        return 2 ** 31 - 1
+    
+    def _disabled_result(self) -> Dict:
+        """Résultat renvoyé lorsque le filtrage est désactivé"""
+        return {
+            "accepted": True,
+            "reason": "Filtrage désactivé",
+            "confidence": 1.0,
+            "category": "unknown",
+            "category_name": "Filtrage désactivé"
+        }
+    
+    def _error_result(self, reason: str) -> Dict:
+        """Résultat renvoyé lorsque le filtrage a échoué"""
+        return {
+            "accepted": False,
+            "reason": reason,
+            "confidence": 0.0,
+            "category": "error"
+        }
+    
+    def _interpret_logits(self, logits: np.ndarray) -> Dict:
+        """
+        Convertit les logits du filtre en résultat de filtrage
+        
+        Args:
+            logits: Sorties brutes du modèle pour une image
             
-        except Exception as e:
-            logger.error(f"Erreur lors du filtrage: {e}")
-            return {
-                "accepted": False,
-                "reason": f"Erreur de filtrage: {str(e)}",
-                "confidence": 0.0,
-                "category": "error"
+        Returns:
+            Dictionnaire avec le résultat du filtrage
+        """
+        # Appliquer softmax pour obtenir des probabilités
+        exp_logits = np.exp(logits - np.max(logits))  # Stabilité numérique
+        probabilities = exp_logits / np.sum(exp_logits)
+        
+        logger.info(f"Probabilités de filtrage: {probabilities}")
+        
+        # Classes de filtrage - Vérifier l'ordre
+        categories = ["non_medical", "medical_other", "breast_cancer"]
+        category_names = ["Non-médical", "Médical autre", "Cancer du sein"]
+        
+        # Debug : Afficher les probabilités par classe
+        logger.info(f"Probabilités par classe:")
+        for i, (cat, name) in enumerate(zip(categories, category_names)):
+            logger.info(f"  {name}: {probabilities[i]*100:.2f}%")
+        
+        # Trouver la catégorie prédite
+        category_id = int(np.argmax(probabilities))
+        category = categories[category_id]
+        category_name = category_names[category_id]
+        confidence = float(probabilities[category_id])
+        
+        # Déterminer si l'image est acceptée
+        # Seules les images de cancer du sein sont acceptées
+        # Ajuster le seuil de confiance pour être plus permissif
+        accepted = (category == "breast_cancer") or (category == "medical_other" and confidence > 0.3)
+        
+        # Messages selon la catégorie
+        if category == "non_medical":
+            reason = "Image non-médicale détectée. Veuillez uploader une image médicale (mammographie, échographie mammaire, etc.)"
+        elif category == "medical_other":
+            reason = "Image médicale détectée mais non relative au cancer du sein. Veuillez uploader une image de mammographie ou d'échographie mammaire"
+        else:  # breast_cancer
+            reason = "Image relative au cancer du sein détectée"
+        
+        result = {
+            "accepted": accepted,
+            "reason": reason,
+            "confidence": confidence * 100,
+            "category": category,
+            "category_name": category_name,
+            "probabilities": {
+                name: float(prob) * 100 
+                for name, prob in zip(category_names, probabilities)
             }
+        }
+        
+        logger.info(f"Filtrage: {category_name} ({confidence*100:.2f}%) - {'Accepté' if accepted else 'Rejeté'}")
+        
+        return result
     
     def unload_model(self):
         """Décharge le modèle de filtrage de la mémoire"""
         self.session = None
+        self.io_runner = None
         self.is_loaded = False
+        self.model_version = "disabled"
         logger.info("Modèle de filtrage déchargé")
     
     def get_model_info(self) -> Dict:
@@ -252,8 +374,12 @@ class ImageFilter:
             "model_exists": self.model_path.exists(),
             "input_name": self.input_name,
             "input_shape": self.input_shape,
+            "input_type": self.input_type,
             "output_names": self.output_names,
-            "providers": self.session.get_providers() if self.session else []
+            "providers": self.session.get_providers() if self.session else [],
+            "session_profile": self.session_profile,
+            "session_options": get_profile_settings(self.session_profile),
+            "io_binding": self.io_runner is not None
         }
 
 
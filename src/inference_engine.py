@@ -4,23 +4,59 @@ Exécution des prédictions avec le modèle ONNX
 """
 
 import logging
+import hashlib
 import io
+import time
 from pathlib import Path
-from typing import Optional, Dict, Tuple, List
+from typing import Optional, Dict, Tuple, List, Union
 import numpy as np
-from PIL import Image
 import cv2
 import onnxruntime as ort
 
 import config
+from src.preprocessing import ImageSource, PreparedImage, prepare_image
 from src.encryption_manager import get_model_decryptor
-from src.quota_manager import get_quota_manager
+from src.ort_session import IOBindingRunner, create_session, get_profile_settings, warmup_session
+from src.quota_manager import QUOTA_EXCEEDED_MESSAGE, get_quota_manager
 from src.auth_manager import get_auth_manager
 from src.image_filter import get_image_filter
+from src.result_cache import ResultCache, get_result_cache, make_cache_key
+from src.single_flight import SingleFlight
+from src.metrics import get_service_metrics, get_stage_histograms
+from src.timing import StageTimings
+from src.worker_pool import InferenceWorkerPool
 
 logger = logging.getLogger(__name__)
 
 
+def _preprocessing_version() -> str:
+    """
+    Réglages de prétraitement qui modifient les résultats (partie de la clé de cache)
+    
+    Le décodage rapide (FAST_IMAGE_DECODE) et l'entrée uint8 (ORT_UINT8_INPUT)
+    changent les pixels vus par le modèle : un résultat mis en cache sur disque
+    avec d'autres réglages ne doit pas être resservi après un redémarrage.
+    """
+    return f"d{int(config.FAST_IMAGE_DECODE)}u{int(config.ORT_UINT8_INPUT)}"
+
+
+def get_class_names(num_classes: int) -> List[str]:
+    """
+    Noms des classes selon le nombre de sorties du modèle
+    
+    Args:
+        num_classes: Nombre de classes en sortie
+        
+    Returns:
+        Liste des noms de classes, dans l'ordre des sorties
+    """
+    if num_classes == 2:
+        return ["Bénin", "Malin"]
+    if num_classes == 3:
+        return ["Bénin", "Malin", "Normal"]
+    return [f"Classe {i}" for i in range(num_classes)]
+
+
 class InferenceEngine:
     """Moteur d'inférence pour la détection du cancer du sein"""
     
@@ -29,27 +65,45 @@ class InferenceEngine:
         self.input_name: Optional[str] = None
         self.output_names: Optional[List[str]] = None
         self.input_shape: Optional[Tuple] = None
+        self.input_type: Optional[str] = None
+        self.io_runner: Optional[IOBindingRunner] = None
+        self.worker_pool: Optional[InferenceWorkerPool] = None
         self.is_loaded = False
+        self.session_profile = config.ORT_PROFILE
+        self.precision = config.MODEL_PRECISION
+        self.loaded_precision: Optional[str] = None
+        self.model_version: Optional[str] = None
+        self.load_time_ms: Optional[float] = None
+        self.result_cache: Optional[ResultCache] = get_result_cache() if config.RESULT_CACHE_ENABLED else None
+        self._in_flight = SingleFlight()
     
-    def load_model(self, force_reload: bool = False) -> bool:
+    def load_model(self, force_reload: bool = False, precision: Optional[str] = None) -> bool:
         """
         Charge le modèle ONNX en mémoire
         
         Args:
             force_reload: Force le rechargement même si déjà chargé
+            precision: Précision à charger ("fp32" ou "int8"), défaut: config.MODEL_PRECISION
             
         Returns:
             True si chargement réussi
         """
+        if precision is not None and precision != self.precision:
+            self.precision = precision
+            force_reload = True
+        
         if self.is_loaded and not force_reload:
             logger.info("Modèle déjà chargé")
             return True
         
+        load_start = time.perf_counter()
         try:
-            # Vérifier que le modèle chiffré existe
+            # Vérifier que le modèle chiffré existe (repli sur FP32 si la variante manque)
             model_decryptor = get_model_decryptor()
-            if not model_decryptor.encrypted_model_path.exists():
-                logger.error(f"Modèle chiffré introuvable: {model_decryptor.encrypted_model_path}")
+            precision = self._resolve_precision()
+            encrypted_model_path = model_decryptor.get_encrypted_model_path(precision)
+            if not encrypted_model_path.exists():
+                logger.error(f"Modèle chiffré introuvable: {encrypted_model_path}")
                 return False
             
             # Vérifier les autorisations
@@ -64,33 +118,64 @@ class InferenceEngine:
                 return False
             
             # Déchiffrer le modèle
-            model_data = model_decryptor.get_model_in_memory(is_premium, has_quota)
+            model_data = model_decryptor.get_model_in_memory(is_premium, has_quota, precision)
             
             if model_data is None:
                 logger.error("Échec du déchiffrement du modèle")
                 return False
             
             # Charger le modèle en mémoire
-            logger.info("Chargement du modèle ONNX...")
-            
-            # Configurer les providers (GPU si disponible, sinon CPU)
-            providers = ['CPUExecutionProvider']
-            if 'CUDAExecutionProvider' in ort.get_available_providers():
-                providers.insert(0, 'CUDAExecutionProvider')
-                logger.info("GPU CUDA détecté, utilisation du GPU")
-            
-            self.session = ort.InferenceSession(
-                model_data,
-                providers=providers
-            )
-            
-            # Récupérer les métadonnées du modèle
-            self.input_name = self.session.get_inputs()[0].name
-            self.output_names = [output.name for output in self.session.get_outputs()]
-            self.input_shape = self.session.get_inputs()[0].shape
-            
+            logger.info(f"Chargement du modèle ONNX ({precision.upper()})...")
+            
+            # Empreinte du modèle (invalide le cache de résultats à chaque nouveau modèle)
+            self.model_version = hashlib.sha256(model_data).hexdigest()[:16]
+            
+            self._stop_worker_pool()
+            if config.INFERENCE_WORKERS > 0:
+                # Inférence dans des processus dédiés partageant ce modèle déchiffré
+                self.worker_pool = InferenceWorkerPool(
+                    model_data,
+                    config.INFERENCE_WORKERS,
+                    self.session_profile,
+                    uint8_input=config.ORT_UINT8_INPUT
+                )
+                del model_data
+                metadata = self.worker_pool.start()
+                self.session = None
+                self.io_runner = None
+                self.input_name = metadata["input_name"]
+                self.output_names = metadata["output_names"]
+                self.input_shape = metadata["input_shape"]
+                self.input_type = metadata["input_type"]
+            else:
+                # Session configurée selon le profil de performance (GPU si disponible)
+                self.session = create_session(
+                    model_data,
+                    self.session_profile,
+                    use_optimized_cache=config.ORT_OPTIMIZED_MODEL_CACHE,
+                    uint8_input=config.ORT_UINT8_INPUT
+                )
+                
+                # Récupérer les métadonnées du modèle
+                self.input_name = self.session.get_inputs()[0].name
+                self.output_names = [output.name for output in self.session.get_outputs()]
+                self.input_shape = self.session.get_inputs()[0].shape
+                self.input_type = self.session.get_inputs()[0].type
+                
+                # Tampons préalloués réutilisés d'une inférence à l'autre (optionnel)
+                self.io_runner = IOBindingRunner(
+                    self.session,
+                    min(config.BATCH_MAX_SIZE, self._max_batch_size())
+                ) if config.ORT_IO_BINDING else None
+            
+            self.loaded_precision = precision
             self.is_loaded = True
-            logger.info(f"Modèle chargé avec succès. Input: {self.input_name}, Shape: {self.input_shape}")
+            # Déchiffrement compris : c'est le coût payé par le premier utilisateur
+            self.load_time_ms = (time.perf_counter() - load_start) * 1000
+            logger.info(
+                f"Modèle chargé avec succès en {self.load_time_ms:.0f} ms. "
+                f"Input: {self.input_name}, Shape: {self.input_shape}"
+            )
             
             return True
             
@@ -99,47 +184,88 @@ class InferenceEngine:
             self.is_loaded = False
             return False
     
-    def preprocess_image(self, image_path: Path) -> Optional[np.ndarray]:
+    def warmup(self, iterations: int = config.WARMUP_ITERATIONS) -> bool:
+        """
+        Charge le modèle et exécute des inférences factices
+        
+        Le premier utilisateur ne paie ainsi ni le déchiffrement ni les
+        allocations du premier appel. Le quota n'est pas décompté.
+        
+        Args:
+            iterations: Nombre d'inférences factices
+            
+        Returns:
+            True si le modèle est chargé et préchauffé
+        """
+        if not self.is_loaded and not self.load_model():
+            return False
+        
+        if self.worker_pool is not None:
+            # Les processus d'inférence se préchauffent à leur démarrage
+            return True
+        
+        try:
+            warmup_time = warmup_session(self.session, iterations)
+            logger.info(f"Modèle préchauffé ({iterations} inférences, {warmup_time:.2f} ms)")
+            return True
+        except Exception as e:
+            logger.error(f"Erreur lors du préchauffage du modèle: {e}")
+            return False
+    
+    def _get_target_size(self) -> Tuple[int, int]:
+        """
+        Détermine la taille (largeur, hauteur) attendue par le modèle
+        
+        Returns:
+            Taille cible pour le redimensionnement
+        """
+        # Par défaut: 224x224 pour la plupart des modèles de vision
+        target_size = (224, 224)
+        if self.input_shape and len(self.input_shape) >= 3:
+            # Format typique: [batch, channels, height, width] ou [batch, height, width, channels]
+            if self.input_shape[1] in [1, 3]:  # Channels first
+                target_size = (self.input_shape[2], self.input_shape[3])
+            else:  # Channels last
+                target_size = (self.input_shape[1], self.input_shape[2])
+        return target_size
+    
+    def get_input_size(self) -> Optional[Tuple[int, int]]:
+        """
+        Taille (largeur, hauteur) d'entrée du classifieur
+        
+        Sert d'indication de taille au décodage : le filtre décode alors une
+        seule fois une résolution qui couvre aussi le classifieur.
+        
+        Returns:
+            Taille cible, ou None si le modèle n'est pas chargé
+        """
+        return self._get_target_size() if self.is_loaded else None
+    
+    def _model_input(self, image: PreparedImage) -> np.ndarray:
+        """
+        Entrée du modèle pour une image préparée
+        
+        Returns:
+            Pixels uint8 NHWC si la normalisation est intégrée au graphe,
+            sinon tenseur float32 NCHW normalisé
+        """
+        if self.input_type == "tensor(uint8)":
+            return image.pixels(self._get_target_size())
+        return image.tensor(self._get_target_size())
+    
+    def preprocess_image(self, image_path: Union[ImageSource, PreparedImage]) -> Optional[np.ndarray]:
         """
         Prétraite une image pour l'inférence
         
         Args:
-            image_path: Chemin de l'image
+            image_path: Chemin, octets, image PIL, tableau numpy (HWC) ou PreparedImage
             
         Returns:
             Tensor numpy prétraité ou None si erreur
         """
         try:
-            # Charger l'image
-            image = Image.open(image_path)
-            
-            # Convertir en RGB si nécessaire
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Redimensionner selon la forme d'entrée du modèle
-            # Par défaut: 224x224 pour la plupart des modèles de vision
-            target_size = (224, 224)
-            if self.input_shape and len(self.input_shape) >= 3:
-                # Format typique: [batch, channels, height, width] ou [batch, height, width, channels]
-                if self.input_shape[1] in [1, 3]:  # Channels first
-                    target_size = (self.input_shape[2], self.input_shape[3])
-                else:  # Channels last
-                    target_size = (self.input_shape[1], self.input_shape[2])
-            
-            image = image.resize(target_size, Image.Resampling.LANCZOS)
-            
-            # Convertir en array numpy
-            img_array = np.array(image, dtype=np.float32)
-            
-            # Normaliser (0-255 -> 0-1)
-            img_array = img_array / 255.0
-            
-            # Ajouter la dimension batch et réorganiser (HWC -> CHW)
-            if len(img_array.shape) == 3:
-                img_array = np.transpose(img_array, (2, 0, 1))  # HWC -> CHW
-            
-            img_array = np.expand_dims(img_array, axis=0)  # Ajouter batch dimension
+            # Décodage et redimensionnement partagés (mis en cache par taille)
+            img_array = self._model_input(prepare_image(image_path))
             
             logger.info(f"Image prétraitée: {img_array.shape}")
             return img_array
@@ -148,12 +274,12 @@ class InferenceEngine:
             logger.error(f"Erreur lors du prétraitement: {e}")
             return None
     
-    def predict(self, image_path: Path) -> Optional[Dict]:
+    def predict(self, image_path: Union[ImageSource, PreparedImage]) -> Optional[Dict]:
         """
         Effectue une prédiction sur une image
         
         Args:
-            image_path: Chemin de l'image à analyser
+            image_path: Image à analyser (chemin, octets, image PIL ou tableau numpy)
             
         Returns:
             Dictionnaire avec les résultats ou None si erreur
@@ -162,108 +288,438 @@ class InferenceEngine:
         start_time = time.time()
         
         try:
-            # FILTRAGE D'IMAGE - Vérifier si l'image est relative au cancer du sein
-            image_filter = get_image_filter()
-            filter_result = image_filter.filter_image(image_path)
-            
-            if not filter_result["accepted"]:
-                logger.warning(f"Image rejetée par le filtre: {filter_result['reason']}")
-                return {
-                    "error": True,
-                    "message": f"Image rejetée: {filter_result['reason']}",
-                    "filter_result": filter_result,
-                    "prediction": None
-                }
-            
-            logger.info(f"Image acceptée par le filtre: {filter_result.get('category_name', 'Filtrage désactivé')} ({filter_result['confidence']:.2f}%)")
+            # Décodage unique partagé entre le filtre et le classifieur
+            image = prepare_image(image_path, self.get_input_size())
+            
+            # Image déjà analysée avec les mêmes modèles : résultat en cache
+            cache_key = self._cache_key(image)
+            cached_result = self._cached_result(cache_key)
+            if cached_result is not None:
+                logger.info(f"Prédiction servie depuis le cache: {cached_result['prediction']}")
+                return cached_result
+            
+            # Image identique déjà en cours d'analyse : partager son calcul
+            flight_key = self._flight_key(image)
+            if flight_key is None:
+                return self._run_prediction(image, cache_key, start_time)
+            
+            result, shared = self._in_flight.do(
+                flight_key,
+                lambda: self._run_prediction(image, cache_key, start_time)
+            )
+            if shared:
+                return self.mark_shared_result(result)
+            return result
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de la prédiction: {e}")
+            return None
+    
+    def _run_prediction(self, image: PreparedImage, cache_key: Optional[str], start_time: float) -> Optional[Dict]:
+        """
+        Filtre, classifie et met en cache une image absente du cache
+        
+        Args:
+            image: Image préparée
+            cache_key: Clé de cache de l'image (None si le modèle n'était pas chargé)
+            start_time: Début de la requête (time.time())
+            
+        Returns:
+            Résultat de prédiction (avec ses durées par étape) ou None si erreur
+        """
+        import time
+        timings = StageTimings()
+        
+        # FILTRAGE D'IMAGE - Vérifier si l'image est relative au cancer du sein
+        image_filter = get_image_filter()
+        with timings.measure("filter"):
+            filter_result = image_filter.filter_image(image)
+        get_service_metrics().observe_filter([filter_result])
+        
+        if not filter_result["accepted"]:
+            logger.warning(f"Image rejetée par le filtre: {filter_result['reason']}")
+            return self._with_timings(self._rejection_result(filter_result), timings)
+        
+        logger.info(f"Image acceptée par le filtre: {filter_result.get('category_name', 'Filtrage désactivé')} ({filter_result['confidence']:.2f}%)")
+        with timings.measure("model_load"):
             # Vérifier que le modèle chiffré existe
-            model_decryptor = get_model_decryptor()
-            if not model_decryptor.encrypted_model_path.exists():
-                logger.error(f"❌ Modèle ONNX introuvable: {model_decryptor.encrypted_model_path}")
-                raise FileNotFoundError(
-                    f"Modèle ONNX chiffré introuvable.\n\n"
-                    f"Veuillez placer votre modèle dans:\n"
-                    f"{model_decryptor.encrypted_model_path}\n\n"
-                    f"Ou chiffrez votre modèle avec:\n"
-                    f"python scripts/encrypt_model.py"
-                )
+            self._ensure_model_file()
             
             # Charger le modèle si nécessaire
             if not self.is_loaded:
                 if not self.load_model():
                     return None
+        
+        # Prétraiter l'image (réutilise le tenseur du filtre si même taille)
+        with timings.measure("preprocess"):
+            input_tensor = self.preprocess_image(image)
+        if input_tensor is None:
+            return None
+        
+        # Effectuer l'inférence
+        logger.info("Exécution de l'inférence...")
+        with timings.measure("inference"):
+            output = self._run_inference([input_tensor])
+        inference_time = timings.get("inference")
+        logger.info(f"Temps d'inférence: {inference_time:.2f} ms")
+        
+        # Traiter les résultats
+        # Format typique: [batch, num_classes]
+        logits = output[0]  # Première sortie, premier batch
+        
+        # Log des valeurs brutes du modèle (preuve qu'il est utilisé)
+        logger.info(f"Logits bruts du modèle: {logits}")
+        
+        with timings.measure("softmax"):
+            result = self._build_result(logits)
+        
+        total_time = (time.time() - start_time) * 1000  # En millisecondes
+        
+        logger.info(f"Prédiction: {result['prediction']} ({result['confidence']:.2f}%)")
+        logger.info(f"Temps total: {total_time:.2f} ms (inférence: {inference_time:.2f} ms)")
+        
+        self._store_result(cache_key or self._cache_key(image), result)
+        
+        # Incrémenter le compteur d'utilisation
+        with timings.measure("quota_write"):
+            quota_manager = get_quota_manager()
+            quota_manager.increment_usage()
+        
+        return self._with_timings(result, timings)
+    
+    def predict_batch(self, images: List, batch_size: int = 8) -> List[Optional[Dict]]:
+        """
+        Effectue des prédictions sur plusieurs images en regroupant les inférences
+        
+        Les tenseurs prétraités sont empilés pour n'exécuter qu'un seul
+        session.run par lot. Si le modèle impose une dimension batch fixe
+        de 1, les images sont traitées une par une.
+        
+        Args:
+            images: Liste d'images (chemins, octets, images PIL ou tableaux numpy)
+            batch_size: Nombre maximal d'images par inférence
             
-            # Prétraiter l'image
-            input_tensor = self.preprocess_image(image_path)
-            if input_tensor is None:
-                return None
-            
-            # Effectuer l'inférence
-            inference_start = time.time()
-            logger.info("Exécution de l'inférence...")
-            outputs = self.session.run(
-                self.output_names,
-                {self.input_name: input_tensor}
-            )
-            inference_time = (time.time() - inference_start) * 1000  # En millisecondes
-            logger.info(f"Temps d'inférence: {inference_time:.2f} ms")
-            
-            # Traiter les résultats
-            # Format typique: [batch, num_classes]
-            logits = outputs[0][0]  # Première sortie, premier batch
-            
-            # Log des valeurs brutes du modèle (preuve qu'il est utilisé)
-            logger.info(f"Logits bruts du modèle: {logits}")
+        Returns:
+            Liste de résultats (même format que predict), dans l'ordre d'entrée ;
+            les durées par étape sont celles de l'appel, communes aux images
+        """
+        import time
+        start_time = time.time()
+        timings = StageTimings()
+        
+        results: List[Optional[Dict]] = [None] * len(images)
+        if not images:
+            return results
+        
+        pending: List[int] = []
+        try:
+            # Décodage unique partagé entre le filtre et le classifieur
+            size_hint = self.get_input_size()
+            images = [prepare_image(image, size_hint) for image in images]
             
-            # Appliquer softmax pour obtenir des probabilités
-            exp_logits = np.exp(logits - np.max(logits))  # Stabilité numérique
-            probabilities = exp_logits / np.sum(exp_logits)
+            # Images déjà analysées avec les mêmes modèles : résultats en cache
+            cache_keys = [self._cache_key(image) for image in images]
+            for index, cache_key in enumerate(cache_keys):
+                results[index] = self._cached_result(cache_key)
+                if results[index] is None:
+                    pending.append(index)
             
-            logger.info(f"Probabilités après softmax: {probabilities}")
+            if not pending:
+                return results
             
-            # Noms des classes
-            if len(probabilities) == 2:
-                class_names = ["Bénin", "Malin"]
-            elif len(probabilities) == 3:
-                class_names = ["Bénin", "Malin", "Normal"]
-            else:
-                class_names = [f"Classe {i}" for i in range(len(probabilities))]
-            
-            # Trouver la classe prédite
-            class_id = int(np.argmax(probabilities))
-            prediction_name = class_names[class_id]
-            confidence = float(probabilities[class_id])
-            
-            # Créer le résultat
-            result = {
-                "prediction": prediction_name,
-                "confidence": confidence * 100,
-                "class_id": class_id,
-                "probabilities": {
-                    name: float(prob) * 100 
-                    for name, prob in zip(class_names, probabilities)
-                }
-            }
+            # FILTRAGE D'IMAGE - Rejeter les images hors sujet avant l'inférence
+            image_filter = get_image_filter()
+            with timings.measure("filter"):
+                filter_results = image_filter.filter_batch(
+                    [images[index] for index in pending],
+                    batch_size=batch_size
+                )
+            get_service_metrics().observe_filter(filter_results)
+            
+            accepted = []
+            for index, filter_result in zip(pending, filter_results):
+                if filter_result["accepted"]:
+                    accepted.append(index)
+                else:
+                    logger.warning(f"Image {index} rejetée par le filtre: {filter_result['reason']}")
+                    results[index] = self._rejection_result(filter_result)
+            
+            if not accepted:
+                return results
+            
+            with timings.measure("model_load"):
+                self._ensure_model_file()
+                
+                # Charger le modèle si nécessaire
+                if not self.is_loaded:
+                    if not self.load_model():
+                        return results
+            
+            batch_size = max(1, min(batch_size, self._max_batch_size()))
+            quota_manager = get_quota_manager()
             
-            # Calculer le risque si on a bénin/malin
-            if len(probabilities) >= 2:
-                malignant_prob = float(probabilities[1])  # Index 1 = Malin
-                result["risk_level"] = self._calculate_risk_level(malignant_prob)
+            for batch_start in range(0, len(accepted), batch_size):
+                # Quota vérifié avant chaque lot : aucune inférence au-delà de la limite
+                if not quota_manager.can_analyze():
+                    logger.warning(f"Quota épuisé: {len(accepted) - batch_start} images non analysées")
+                    for index in accepted[batch_start:]:
+                        results[index] = self._quota_result()
+                    break
+                
+                batch_indices = []
+                tensors = []
+                with timings.measure("preprocess"):
+                    for index in accepted[batch_start:batch_start + batch_size]:
+                        input_tensor = self.preprocess_image(images[index])
+                        if input_tensor is not None:
+                            batch_indices.append(index)
+                            tensors.append(input_tensor)
+                
+                if not tensors:
+                    continue
+                
+                # Une seule inférence pour tout le lot
+                with timings.measure("inference"):
+                    output = self._run_inference(tensors)
+                
+                for index, logits in zip(batch_indices, output):
+                    with timings.measure("quota_write"):
+                        counted = quota_manager.increment_usage()
+                    if not counted:
+                        # Limite atteinte au milieu du lot : score ni renvoyé ni mis en cache
+                        results[index] = self._quota_result()
+                        continue
+                    with timings.measure("softmax"):
+                        results[index] = self._build_result(logits)
+                    self._store_result(cache_keys[index] or self._cache_key(images[index]), results[index])
+            
+            total_time = (time.time() - start_time) * 1000
+            logger.info(
+                f"Lot de {len(images)} images traité en {total_time:.2f} ms "
+                f"(inférence: {timings.get('inference'):.2f} ms, batch_size: {batch_size})"
+            )
             
-            total_time = (time.time() - start_time) * 1000  # En millisecondes
+            return results
             
-            logger.info(f"Prédiction: {result['prediction']} ({result['confidence']:.2f}%)")
-            logger.info(f"Temps total: {total_time:.2f} ms (inférence: {inference_time:.2f} ms)")
+        except Exception as e:
+            logger.error(f"Erreur lors de la prédiction par lot: {e}")
+            return results
+        
+        finally:
+            # Durées de l'appel jointes aux images analysées (pas à celles servies depuis le cache)
+            analyzed = [index for index in pending if results[index] is not None]
+            for index in analyzed:
+                results[index]["timings"] = timings.as_dict()
+            if analyzed:
+                get_stage_histograms().observe(timings, count=len(analyzed))
+    
+    def _run_inference(self, inputs: List[np.ndarray]) -> np.ndarray:
+        """
+        Exécute le classifieur sur un lot d'entrées prétraitées
+        
+        Args:
+            inputs: Entrées [1, ...] de même forme
             
-            # Incrémenter le compteur d'utilisation
-            quota_manager = get_quota_manager()
-            quota_manager.increment_usage()
+        Returns:
+            Première sortie du modèle [batch, num_classes] ; avec IOBinding,
+            vue sur les tampons du thread à exploiter avant l'inférence suivante
+        """
+        if self.worker_pool is not None:
+            return self.worker_pool.run(inputs)
+        
+        if self.io_runner is not None and len(inputs) <= self.io_runner.max_batch_size:
+            return self.io_runner.run(inputs)[0]
+        
+        batch = inputs[0] if len(inputs) == 1 else np.concatenate(inputs, axis=0)
+        return self.session.run(self.output_names, {self.input_name: batch})[0]
+    
+    def _max_batch_size(self) -> int:
+        """
+        Retourne la taille de lot maximale acceptée par le modèle
+        
+        Returns:
+            1 si la dimension batch est fixée à 1, sinon une taille illimitée
+        """
+        if self.input_shape and isinstance(self.input_shape[0], int) and self.input_shape[0] > 0:
+            return self.input_shape[0]
+        return 2 ** 31 - 1
+    
+    def _resolve_precision(self) -> str:
+        """
+        Précision effectivement chargée
+        
+        Returns:
+            self.precision, ou "fp32" si la variante INT8 n'a pas été générée
+        """
+        # Lève ValueError si la précision est inconnue
+        encrypted_model_path = get_model_decryptor().get_encrypted_model_path(self.precision)
+        
+        if self.precision != "fp32" and not encrypted_model_path.exists():
+            logger.warning(
+                f"Modèle {self.precision.upper()} introuvable, repli sur FP32 "
+                f"(générez-le avec: python scripts/quantize_model.py)"
+            )
+            return "fp32"
+        return self.precision
+    
+    def _ensure_model_file(self):
+        """Lève FileNotFoundError si le modèle chiffré est absent"""
+        encrypted_model_path = get_model_decryptor().get_encrypted_model_path(
+            self.loaded_precision or self._resolve_precision()
+        )
+        if not encrypted_model_path.exists():
+            logger.error(f"❌ Modèle ONNX introuvable: {encrypted_model_path}")
+            raise FileNotFoundError(
+                f"Modèle ONNX chiffré introuvable.\n\n"
+                f"Veuillez placer votre modèle dans:\n"
+                f"{encrypted_model_path}\n\n"
+                f"Ou chiffrez votre modèle avec:\n"
+                f"python scripts/encrypt_model.py"
+            )
+    
+    def _cache_key(self, image: PreparedImage) -> Optional[str]:
+        """
+        Clé de cache d'une image pour les modèles actuellement chargés
+        
+        Args:
+            image: Image préparée
             
-            return result
+        Returns:
+            Clé de cache, ou None si le cache est désactivé ou le modèle non chargé
+        """
+        if self.result_cache is None or not self.is_loaded:
+            return None
+        
+        try:
+            model_version = (
+                f"{self.model_version}.{get_image_filter().model_version}.{_preprocessing_version()}"
+            )
+            return make_cache_key(image.content_hash, model_version)
+        except Exception as e:
+            logger.warning(f"Empreinte de l'image impossible, cache ignoré: {e}")
+            return None
+    
+    def _cached_result(self, cache_key: Optional[str]) -> Optional[Dict]:
+        """
+        Retourne le résultat en cache pour une clé (quota décompté selon la configuration)
+        
+        Args:
+            cache_key: Clé de cache ou None
             
+        Returns:
+            Résultat marqué "cached", ou None si absent ; résultat "quota
+            épuisé" si le cache est décompté et la limite atteinte
+        """
+        if cache_key is None:
+            return None
+        
+        result = self.result_cache.get(cache_key)
+        if result is None:
+            return None
+        
+        if config.RESULT_CACHE_COUNT_QUOTA and not get_quota_manager().increment_usage():
+            return self._quota_result()
+        result["cached"] = True
+        return result
+    
+    def _flight_key(self, image: PreparedImage) -> Optional[str]:
+        """Clé de coalescence d'une image (empreinte du contenu), ou None si indisponible"""
+        try:
+            return image.content_hash
         except Exception as e:
-            logger.error(f"Erreur lors de la prédiction: {e}")
+            logger.warning(f"Empreinte de l'image impossible, coalescence ignorée: {e}")
+            return None
+    
+    def mark_shared_result(self, result: Optional[Dict]) -> Optional[Dict]:
+        """
+        Marque un résultat partagé avec une requête identique concurrente
+        
+        Le quota est décompté selon la même règle que pour le cache.
+        
+        Args:
+            result: Copie du résultat calculé pour une autre requête
+            
+        Returns:
+            Résultat marqué "coalesced", ou None
+        """
+        if result is None:
             return None
+        
+        result["coalesced"] = True
+        if config.RESULT_CACHE_COUNT_QUOTA and not result.get("error"):
+            get_quota_manager().increment_usage()
+        return result
+    
+    def _with_timings(self, result: Dict, timings: StageTimings) -> Dict:
+        """Joint les durées par étape au résultat et les agrège dans les histogrammes"""
+        result["timings"] = timings.as_dict()
+        get_stage_histograms().observe(timings)
+        return result
+    
+    def _store_result(self, cache_key: Optional[str], result: Dict):
+        """Enregistre un résultat de prédiction dans le cache"""
+        if cache_key is not None:
+            self.result_cache.set(cache_key, result)
+    
+    def _rejection_result(self, filter_result: Dict) -> Dict:
+        """Construit le résultat renvoyé pour une image rejetée par le filtre"""
+        return {
+            "error": True,
+            "message": f"Image rejetée: {filter_result['reason']}",
+            "filter_result": filter_result,
+            "prediction": None
+        }
+    
+    def _quota_result(self) -> Dict:
+        """Construit le résultat renvoyé pour une image refusée faute de quota"""
+        return {
+            "error": True,
+            "quota_exceeded": True,
+            "message": QUOTA_EXCEEDED_MESSAGE,
+            "prediction": None
+        }
+    
+    def _build_result(self, logits: np.ndarray) -> Dict:
+        """
+        Convertit les logits d'une image en dictionnaire de résultat
+        
+        Args:
+            logits: Sorties brutes du modèle pour une image
+            
+        Returns:
+            Dictionnaire avec la prédiction, la confiance et les probabilités
+        """
+        # Appliquer softmax pour obtenir des probabilités
+        exp_logits = np.exp(logits - np.max(logits))  # Stabilité numérique
+        probabilities = exp_logits / np.sum(exp_logits)
+        
+        logger.info(f"Probabilités après softmax: {probabilities}")
+        
+        # Noms des classes
+        class_names = get_class_names(len(probabilities))
+        
+        # Trouver la classe prédite
+        class_id = int(np.argmax(probabilities))
+        prediction_name = class_names[class_id]
+        confidence = float(probabilities[class_id])
+        
+        # Créer le résultat
+        result = {
+            "prediction": prediction_name,
+            "confidence": confidence * 100,
+            "class_id": class_id,
+            "probabilities": {
+                name: float(prob) * 100 
+                for name, prob in zip(class_names, probabilities)
+            }
+        }
+        
+        # Calculer le risque si on a bénin/malin
+        if len(probabilities) >= 2:
+            malignant_prob = float(probabilities[1])  # Index 1 = Malin
+            result["risk_level"] = self._calculate_risk_level(malignant_prob)
+        
+        return result
     
     def _calculate_risk_level(self, malignant_probability: float) -> str:
         """
@@ -282,10 +738,20 @@ class InferenceEngine:
         else:
             return "Élevé"
     
+    def _stop_worker_pool(self):
+        """Arrête les processus d'inférence éventuels"""
+        if self.worker_pool is not None:
+            self.worker_pool.stop()
+            self.worker_pool = None
+    
     def unload_model(self):
         """Décharge le modèle de la mémoire"""
+        self._stop_worker_pool()
         self.session = None
+        self.io_runner = None
         self.is_loaded = False
+        self.model_version = None
+        self.loaded_precision = None
         logger.info("Modèle déchargé de la mémoire")
     
     def get_model_info(self) -> Dict:
@@ -302,8 +768,18 @@ class InferenceEngine:
             "loaded": True,
             "input_name": self.input_name,
             "input_shape": self.input_shape,
+            "input_type": self.input_type,
             "output_names": self.output_names,
-            "providers": self.session.get_providers() if self.session else []
+            "providers": self.session.get_providers() if self.session else (
+                self.worker_pool.metadata["providers"] if self.worker_pool else []
+            ),
+            "session_profile": self.session_profile,
+            "session_options": get_profile_settings(self.session_profile),
+            "precision": self.loaded_precision,
+            "io_binding": self.io_runner is not None or (self.worker_pool is not None and config.ORT_IO_BINDING),
+            "workers": self.worker_pool.get_stats() if self.worker_pool else None,
+            "model_version": self.model_version,
+            "result_cache": self.result_cache.get_stats() if self.result_cache else None
         }
 
 
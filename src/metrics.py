@@ -0,0 +1,326 @@
+"""
+DIANA - Métriques de performance
+Histogrammes des durées par étape, compteurs du service et exposition au
+format texte Prometheus, agrégés sur toutes les prédictions du processus
+"""
+
+import bisect
+import math
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.timing import StageTimings
+
+# Bornes supérieures des seaux (ms), de la milliseconde à 10 secondes
+DEFAULT_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Bornes des seaux de taille de lot du micro-batcher
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+# Type MIME du format texte d'exposition Prometheus
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Histogramme à seaux fixes (compatible avec le modèle Prometheus), thread-safe"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS_MS):
+        self.buckets = tuple(sorted(buckets))
+        # Un compteur par seau, plus le seau +Inf
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, count: int = 1):
+        """
+        Enregistre une valeur
+
+        Args:
+            value: Valeur observée (ms)
+            count: Nombre d'observations de cette valeur (ex: images d'un lot)
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += count
+            self._sum += value * count
+            self._count += count
+
+    def cumulative_counts(self) -> Dict[str, int]:
+        """Comptes cumulés par borne supérieure ("le"), "+Inf" inclus"""
+        with self._lock:
+            counts = list(self._counts)
+        result, total = {}, 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], counts):
+            total += count
+            result[str(bound)] = total
+        return result
+
+    @property
+    def count(self) -> int:
+        """Nombre d'observations"""
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        """Somme des valeurs observées"""
+        return self._sum
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estime un quantile par interpolation linéaire dans son seau
+
+        Args:
+            q: Quantile entre 0 et 1
+
+        Returns:
+            Estimation, ou None sans observation ; borne du dernier seau
+            fini si le quantile tombe dans le seau +Inf
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+        if total == 0:
+            return None
+
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                if index == len(self.buckets):
+                    return float(self.buckets[-1])
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return float(self.buckets[-1])
+
+    def snapshot(self) -> Dict:
+        """
+        Résumé de l'histogramme
+
+        Returns:
+            Nombre, somme, moyenne, quantiles estimés et seaux cumulés
+        """
+        count = self._count
+        quantiles = {f"p{int(q * 100)}_ms": self.quantile(q) for q in (0.50, 0.95, 0.99)}
+        return {
+            "count": count,
+            "sum_ms": round(self._sum, 3),
+            "mean_ms": round(self._sum / count, 3) if count else None,
+            **{key: round(value, 3) if value is not None else None for key, value in quantiles.items()},
+            "buckets": self.cumulative_counts(),
+        }
+
+
+class StageHistograms:
+    """Un histogramme de durée par étape de prédiction"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS_MS):
+        self._buckets = tuple(buckets)
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str) -> Histogram:
+        """Histogramme d'une étape (créé à la première observation)"""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self._buckets)
+            return histogram
+
+    def observe(self, timings: StageTimings, count: int = 1):
+        """
+        Enregistre les durées d'une prédiction
+
+        Args:
+            timings: Durées mesurées
+            count: Nombre d'images concernées (durées d'un lot partagées par ses images)
+        """
+        for stage, duration_ms in timings.items():
+            self.histogram(stage).observe(duration_ms, count)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Résumé de chaque étape observée"""
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {stage: histogram.snapshot() for stage, histogram in histograms.items()}
+
+    def items(self) -> List[Tuple[str, Histogram]]:
+        """(étape, histogramme) dans l'ordre d'apparition"""
+        with self._lock:
+            return list(self._histograms.items())
+
+
+class ServiceMetrics:
+    """Compteurs du service web : requêtes, lots et décisions du filtre"""
+
+    def __init__(self):
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self._requests: Counter = Counter()
+        self._filter_decisions: Counter = Counter()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def request_started(self):
+        """Une requête HTTP commence"""
+        with self._lock:
+            self._in_flight += 1
+
+    def request_finished(self, handler: str, status: int):
+        """
+        Une requête HTTP se termine
+
+        Args:
+            handler: Route appelée (gabarit de chemin, pas l'URL brute)
+            status: Code de statut HTTP renvoyé
+        """
+        with self._lock:
+            self._in_flight -= 1
+            self._requests[(handler, str(status))] += 1
+
+    def observe_batch(self, size: int):
+        """Enregistre la taille d'un lot exécuté par le micro-batcher"""
+        self.batch_sizes.observe(size)
+
+    def observe_filter(self, results: Iterable[Dict]):
+        """Enregistre les décisions du filtre (acceptée/rejetée, par catégorie)"""
+        with self._lock:
+            for result in results:
+                decision = "accepted" if result.get("accepted") else "rejected"
+                self._filter_decisions[(result.get("category", "unknown"), decision)] += 1
+
+    @property
+    def in_flight(self) -> int:
+        """Requêtes HTTP en cours"""
+        return self._in_flight
+
+    def request_counts(self) -> Dict[Tuple[str, str], int]:
+        """Nombre de requêtes par (route, statut)"""
+        with self._lock:
+            return dict(self._requests)
+
+    def filter_decisions(self) -> Dict[Tuple[str, str], int]:
+        """Nombre d'images par (catégorie, décision)"""
+        with self._lock:
+            return dict(self._filter_decisions)
+
+
+def _format_value(value: float) -> str:
+    """Valeur numérique au format d'exposition ("+Inf", "NaN"...)"""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """Étiquettes au format {nom="valeur",...} (vide sans étiquette)"""
+    if not labels:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        for value in labels.values()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+class PrometheusExposition:
+    """
+    Construit une page au format texte d'exposition Prometheus
+
+    Chaque famille de métriques est écrite une seule fois (HELP, TYPE puis
+    ses échantillons), ce qui suffit à un serveur Prometheus local pour la
+    collecter sans bibliothèque cliente.
+    """
+
+    def __init__(self):
+        self._lines: List[str] = []
+
+    def _family(self, name: str, kind: str, help_text: str):
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {kind}")
+
+    def _sample(self, name: str, labels: Dict[str, str], value: float):
+        self._lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    def gauge(self, name: str, help_text: str, samples: Iterable[Tuple[Dict[str, str], float]]):
+        """
+        Ajoute une jauge
+
+        Args:
+            name: Nom de la métrique
+            help_text: Description
+            samples: Couples (étiquettes, valeur)
+        """
+        self._family(name, "gauge", help_text)
+        for labels, value in samples:
+            self._sample(name, labels, value)
+
+    def counter(self, name: str, help_text: str, samples: Iterable[Tuple[Dict[str, str], float]]):
+        """
+        Ajoute un compteur (le nom doit se terminer par "_total")
+
+        Args:
+            name: Nom de la métrique
+            help_text: Description
+            samples: Couples (étiquettes, valeur)
+        """
+        self._family(name, "counter", help_text)
+        for labels, value in samples:
+            self._sample(name, labels, value)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        histograms: Iterable[Tuple[Dict[str, str], Histogram]],
+        scale: float = 1.0
+    ):
+        """
+        Ajoute une famille d'histogrammes
+
+        Args:
+            name: Nom de la métrique
+            help_text: Description
+            histograms: Couples (étiquettes, histogramme)
+            scale: Facteur appliqué aux bornes et à la somme (ex: 0.001 pour
+                exposer en secondes des durées mesurées en millisecondes)
+        """
+        self._family(name, "histogram", help_text)
+        for labels, histogram in histograms:
+            cumulative = list(histogram.cumulative_counts().values())
+            bounds = [round(bound * scale, 9) for bound in histogram.buckets] + [math.inf]
+            for bound, count in zip(bounds, cumulative):
+                self._sample(f"{name}_bucket", {**labels, "le": _format_value(bound)}, count)
+            self._sample(f"{name}_sum", labels, histogram.sum * scale)
+            # Le compte est celui du seau +Inf : cohérent même si une observation arrive entre-temps
+            self._sample(f"{name}_count", labels, cumulative[-1])
+
+    def render(self) -> str:
+        """Page complète, terminée par un saut de ligne"""
+        return "\n".join(self._lines) + "\n"
+
+
+# Singletons globaux
+_stage_histograms_instance: Optional[StageHistograms] = None
+_service_metrics_instance: Optional[ServiceMetrics] = None
+
+
+def get_stage_histograms() -> StageHistograms:
+    """Retourne l'instance singleton des histogrammes par étape"""
+    global _stage_histograms_instance
+    if _stage_histograms_instance is None:
+        _stage_histograms_instance = StageHistograms()
+    return _stage_histograms_instance
+
+
+def get_service_metrics() -> ServiceMetrics:
+    """Retourne l'instance singleton des compteurs du service"""
+    global _service_metrics_instance
+    if _service_metrics_instance is None:
+        _service_metrics_instance = ServiceMetrics()
+    return _service_metrics_instance
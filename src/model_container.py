@@ -0,0 +1,627 @@
+"""
+DIANA - Conteneur chiffré par blocs
+Format versionné des modèles chiffrés : AES-256-GCM par bloc, en-tête et index,
+déchiffrable en flux (ou en parallèle) dans un seul tampon préalloué, depuis
+une projection mémoire du fichier
+
+Disposition du fichier (entiers little-endian) :
+
+    en-tête    magic "DIANAENC", version, drapeaux, taille de bloc, taille en clair,
+               nombre de blocs, sel (16 octets), préfixe de nonce (8 octets)
+    index      (position, taille chiffrée) de chaque bloc
+    manifeste  tag GCM de chaque bloc (16 octets chacun, version 2)
+    MAC        HMAC-SHA256 de l'en-tête, de l'index et du manifeste (version 2)
+    blocs      texte chiffré du bloc suivi de son tag GCM (16 octets)
+
+Les clés de chiffrement et de MAC de chaque fichier sont dérivées de la clé
+maître et du sel par HKDF. Le nonce d'un bloc est le préfixe suivi du numéro
+du bloc, et l'en-tête et l'index sont authentifiés avec chaque bloc : un bloc
+déplacé, remplacé ou retiré fait échouer le déchiffrement. Le manifeste
+authentifié permet de contrôler la structure du fichier sans rien déchiffrer,
+puis de n'authentifier qu'un échantillon de blocs (voir verify_container).
+Les fichiers de version 1 (sans manifeste) restent lisibles.
+"""
+
+import hashlib
+import hmac
+import io
+import math
+import mmap
+import os
+import random
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import BinaryIO, Callable, Dict, Optional, Sequence, Tuple
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+MAGIC = b"DIANAENC"
+FORMAT_VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+TAG_SIZE = 16
+SALT_SIZE = 16
+NONCE_PREFIX_SIZE = 8
+MAC_SIZE = 32
+
+# Fraction de blocs altérés supposée pour la confiance d'une vérification par échantillon
+DEFAULT_ASSUMED_CORRUPTION = 0.01
+
+# Marge exigée par Cipher.update_into après les données écrites (taille de bloc AES - 1)
+_UPDATE_INTO_SLACK = 15
+
+_HEADER = struct.Struct(f"<8sHHIQI{SALT_SIZE}s{NONCE_PREFIX_SIZE}s")
+_INDEX_ENTRY = struct.Struct("<QI")
+_HKDF_INFO = b"diana-model-container-v1"
+_HKDF_MAC_INFO = b"diana-model-container-v2-mac"
+
+
+def is_chunked_container(prefix: bytes) -> bool:
+    """
+    Indique si le début d'un fichier est celui d'un conteneur par blocs
+
+    Args:
+        prefix: Premiers octets du fichier (au moins len(MAGIC))
+
+    Returns:
+        True pour un conteneur par blocs, False sinon (ex: jeton Fernet "gAAAAA...")
+    """
+    return prefix[:len(MAGIC)] == MAGIC
+
+
+def derive_file_key(master_key: bytes, salt: bytes) -> bytes:
+    """
+    Dérive la clé AES-256 d'un fichier
+
+    Args:
+        master_key: Clé maître (32 octets)
+        salt: Sel propre au fichier
+
+    Returns:
+        Clé de 32 octets
+    """
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=salt, info=_HKDF_INFO).derive(master_key)
+
+
+def derive_mac_key(master_key: bytes, salt: bytes) -> bytes:
+    """
+    Dérive la clé HMAC de l'en-tête d'un fichier (distincte de la clé AES)
+
+    Args:
+        master_key: Clé maître (32 octets)
+        salt: Sel propre au fichier
+
+    Returns:
+        Clé de 32 octets
+    """
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=salt, info=_HKDF_MAC_INFO).derive(master_key)
+
+
+def detection_confidence(
+    chunk_count: int,
+    chunks_checked: int,
+    assumed_corruption: float = DEFAULT_ASSUMED_CORRUPTION
+) -> float:
+    """
+    Probabilité qu'un échantillon de blocs contienne au moins un bloc altéré
+
+    Tirage sans remise (loi hypergéométrique), en supposant qu'une fraction
+    assumed_corruption des blocs (au moins un) est altérée.
+
+    Args:
+        chunk_count: Nombre de blocs du fichier
+        chunks_checked: Nombre de blocs tirés et authentifiés
+        assumed_corruption: Fraction de blocs supposée altérée (entre 0 et 1)
+
+    Returns:
+        Probabilité entre 0 et 1 (1 si tous les blocs sont vérifiés)
+    """
+    if chunks_checked >= chunk_count:
+        return 1.0
+    corrupted = max(1, math.ceil(assumed_corruption * chunk_count))
+    missed = 1.0
+    for drawn in range(chunks_checked):
+        missed *= (chunk_count - corrupted - drawn) / (chunk_count - drawn)
+        if missed <= 0:
+            return 1.0
+    return 1.0 - missed
+
+
+@dataclass(frozen=True)
+class ContainerHeader:
+    """En-tête et index d'un conteneur par blocs"""
+    chunk_size: int
+    plaintext_size: int
+    salt: bytes
+    nonce_prefix: bytes
+    chunks: Tuple[Tuple[int, int], ...]  # (position, taille chiffrée tag compris)
+    version: int = FORMAT_VERSION
+    tags: Tuple[bytes, ...] = ()  # manifeste : tag GCM de chaque bloc (version 2)
+    mac: bytes = b""  # HMAC de l'en-tête, de l'index et du manifeste (version 2)
+
+    @property
+    def chunk_count(self) -> int:
+        """Nombre de blocs"""
+        return len(self.chunks)
+
+    @property
+    def has_manifest(self) -> bool:
+        """Le fichier contient un manifeste authentifié (version 2)"""
+        return self.version >= 2
+
+    @property
+    def size(self) -> int:
+        """Taille de l'en-tête, de l'index et du manifeste en octets"""
+        return _metadata_size(len(self.chunks), self.version)
+
+    @classmethod
+    def create(cls, plaintext_size: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> "ContainerHeader":
+        """
+        Prépare l'en-tête d'un nouveau fichier (sel et préfixe de nonce aléatoires)
+
+        Les tailles chiffrées étant connues d'avance (bloc + tag), l'index peut
+        être écrit avant les blocs.
+
+        Args:
+            plaintext_size: Taille des données en clair
+            chunk_size: Taille des blocs en clair
+        """
+        if chunk_size <= 0:
+            raise ValueError(f"Taille de bloc invalide: {chunk_size}")
+
+        chunk_count = -(-plaintext_size // chunk_size)
+        offset = _metadata_size(chunk_count, FORMAT_VERSION)
+        chunks = []
+        for index in range(chunk_count):
+            length = min(chunk_size, plaintext_size - index * chunk_size) + TAG_SIZE
+            chunks.append((offset, length))
+            offset += length
+        return cls(chunk_size, plaintext_size, os.urandom(SALT_SIZE), os.urandom(NONCE_PREFIX_SIZE), tuple(chunks))
+
+    def pack(self) -> bytes:
+        """En-tête et index sérialisés (également données associées de chaque bloc)"""
+        header = _HEADER.pack(
+            MAGIC, self.version, 0, self.chunk_size, self.plaintext_size,
+            len(self.chunks), self.salt, self.nonce_prefix
+        )
+        return header + b"".join(_INDEX_ENTRY.pack(offset, length) for offset, length in self.chunks)
+
+    def compute_mac(self, mac_key: bytes) -> bytes:
+        """HMAC-SHA256 de l'en-tête, de l'index et du manifeste"""
+        return hmac.new(mac_key, self.pack() + b"".join(self.tags), hashlib.sha256).digest()
+
+    @classmethod
+    def read(cls, f: BinaryIO) -> "ContainerHeader":
+        """
+        Lit et valide l'en-tête et l'index en début de fichier
+
+        Raises:
+            ValueError: Si le fichier n'est pas un conteneur valide
+        """
+        data = f.read(_HEADER.size)
+        if len(data) < _HEADER.size or not is_chunked_container(data):
+            raise ValueError("Conteneur chiffré invalide: en-tête absent ou tronqué")
+
+        _, version, _, chunk_size, plaintext_size, chunk_count, salt, nonce_prefix = _HEADER.unpack(data)
+        if version not in SUPPORTED_VERSIONS:
+            raise ValueError(f"Version de conteneur non supportée: {version} (attendues: {SUPPORTED_VERSIONS})")
+        if chunk_size <= 0 or chunk_count != -(-plaintext_size // chunk_size):
+            raise ValueError("Conteneur chiffré invalide: taille de bloc incohérente")
+
+        index = f.read(_INDEX_ENTRY.size * chunk_count)
+        if len(index) < _INDEX_ENTRY.size * chunk_count:
+            raise ValueError("Conteneur chiffré invalide: index tronqué")
+        chunks = tuple(_INDEX_ENTRY.iter_unpack(index))
+
+        for number, (_, length) in enumerate(chunks):
+            expected = min(chunk_size, plaintext_size - number * chunk_size) + TAG_SIZE
+            if length != expected:
+                raise ValueError(f"Conteneur chiffré invalide: bloc {number} de taille incohérente")
+
+        if version < 2:
+            return cls(chunk_size, plaintext_size, salt, nonce_prefix, chunks, version)
+
+        manifest = f.read(TAG_SIZE * chunk_count + MAC_SIZE)
+        if len(manifest) < TAG_SIZE * chunk_count + MAC_SIZE:
+            raise ValueError("Conteneur chiffré invalide: manifeste tronqué")
+        tags = tuple(manifest[i:i + TAG_SIZE] for i in range(0, TAG_SIZE * chunk_count, TAG_SIZE))
+        return cls(chunk_size, plaintext_size, salt, nonce_prefix, chunks, version, tags, manifest[-MAC_SIZE:])
+
+    def nonce(self, number: int) -> bytes:
+        """Nonce GCM d'un bloc : préfixe du fichier + numéro du bloc"""
+        return self.nonce_prefix + struct.pack("<I", number)
+
+
+def _metadata_size(chunk_count: int, version: int) -> int:
+    """Taille de l'en-tête, de l'index et (version 2) du manifeste et du MAC"""
+    size = _HEADER.size + _INDEX_ENTRY.size * chunk_count
+    if version >= 2:
+        size += TAG_SIZE * chunk_count + MAC_SIZE
+    return size
+
+
+def write_container(
+    source: BinaryIO,
+    plaintext_size: int,
+    output: BinaryIO,
+    master_key: bytes,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+):
+    """
+    Chiffre un flux bloc par bloc vers un conteneur
+
+    Seul un bloc est en mémoire à la fois : le modèle n'est jamais lu en entier.
+    Les tags n'étant connus qu'après le chiffrement, le manifeste et le MAC
+    sont écrits en dernier, à leur place réservée après l'index.
+
+    Args:
+        source: Flux des données en clair (lu jusqu'à plaintext_size)
+        plaintext_size: Taille des données en clair
+        output: Flux de sortie binaire, positionnable (fichier, BytesIO)
+        master_key: Clé maître (32 octets)
+        chunk_size: Taille des blocs en clair
+
+    Raises:
+        ValueError: Si la source est plus courte que plaintext_size
+    """
+    header = ContainerHeader.create(plaintext_size, chunk_size)
+    associated_data = header.pack()
+    aesgcm = AESGCM(derive_file_key(master_key, header.salt))
+
+    start = output.tell()
+    output.write(associated_data)
+    output.write(bytes(header.size - len(associated_data)))
+
+    tags = []
+    for number, (_, length) in enumerate(header.chunks):
+        chunk = source.read(length - TAG_SIZE)
+        if len(chunk) != length - TAG_SIZE:
+            raise ValueError("Données source plus courtes que la taille annoncée")
+        encrypted = aesgcm.encrypt(header.nonce(number), chunk, associated_data)
+        tags.append(encrypted[-TAG_SIZE:])
+        output.write(encrypted)
+
+    header = replace(header, tags=tuple(tags))
+    end = output.tell()
+    output.seek(start + len(associated_data))
+    output.write(b"".join(tags) + header.compute_mac(derive_mac_key(master_key, header.salt)))
+    output.seek(end)
+
+
+class _ChunkReader:
+    """
+    Accès aux blocs chiffrés, utilisable depuis plusieurs threads
+
+    Le fichier est projeté en mémoire (mmap) : chaque bloc est une vue sur le
+    cache de pages, déchiffrée sans copie intermédiaire. À défaut (flux en
+    mémoire, mmap désactivé ou impossible), les blocs sont lus par lecture
+    positionnelle dans un tampon propre à chaque thread.
+    """
+
+    def __init__(self, f: BinaryIO, buffer_size: int, use_mmap: bool = True):
+        self._f = f
+        self._buffer_size = buffer_size
+        self._buffers = threading.local()
+        self._lock = threading.Lock()
+        self._mapping: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+        self._fd: Optional[int] = None
+
+        try:
+            fd = f.fileno()
+        except (OSError, io.UnsupportedOperation):
+            fd = None
+
+        if use_mmap and fd is not None:
+            try:
+                self._mapping = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._mapping)
+            except (OSError, ValueError):
+                self._mapping = None
+        # pread ne déplace pas la position du fichier : lectures concurrentes sans verrou
+        if self._mapping is None and fd is not None and hasattr(os, "preadv"):
+            self._fd = fd
+
+    def read(self, number: int, offset: int, length: int) -> memoryview:
+        """
+        Texte chiffré d'un bloc
+
+        Returns:
+            Vue valable jusqu'à la lecture suivante du même thread
+
+        Raises:
+            ValueError: Si le bloc est tronqué
+        """
+        if self._view is not None:
+            chunk = self._view[offset:offset + length]
+            read = len(chunk)
+        else:
+            if getattr(self._buffers, "chunk", None) is None:
+                self._buffers.chunk = bytearray(self._buffer_size)
+            chunk = memoryview(self._buffers.chunk)[:length]
+            if self._fd is not None:
+                read = os.preadv(self._fd, [chunk], offset)
+            else:
+                with self._lock:
+                    self._f.seek(offset)
+                    read = self._f.readinto(chunk)
+
+        if read != length:
+            raise ValueError(f"Conteneur chiffré tronqué au bloc {number}")
+        return chunk
+
+    def close(self):
+        """Libère la projection mémoire"""
+        if self._mapping is None:
+            return
+        self._view.release()
+        try:
+            self._mapping.close()
+        except BufferError:
+            # Vues encore référencées (ex: trace d'une exception) : libérée par le ramasse-miettes
+            pass
+
+
+def _decrypt_chunk(key: bytes, nonce: bytes, associated_data: bytes, ciphertext: memoryview, output: memoryview):
+    """
+    Déchiffre un bloc (texte chiffré + tag) vers sa plage du tampon final
+
+    Cipher.update_into exige une marge de 15 octets après les données écrites :
+    les derniers octets passent par update() pour que l'écriture ne déborde
+    jamais sur la plage du bloc suivant, peut-être en cours dans un autre thread.
+
+    Raises:
+        InvalidTag: Si la clé est fausse ou le bloc altéré
+    """
+    size = len(ciphertext) - TAG_SIZE
+    decryptor = Cipher(algorithms.AES(key), modes.GCM(nonce, bytes(ciphertext[size:]))).decryptor()
+    decryptor.authenticate_additional_data(associated_data)
+    head = max(0, size - _UPDATE_INTO_SLACK - 1)
+    if head:
+        decryptor.update_into(ciphertext[:head], output[:head + _UPDATE_INTO_SLACK])
+    output[head:size] = decryptor.update(ciphertext[head:size])
+    decryptor.finalize()
+
+
+def _open_container(f: BinaryIO, master_key: bytes) -> Tuple[ContainerHeader, bytes, bytes]:
+    """
+    Lit l'en-tête, vérifie que le fichier contient tous les blocs annoncés
+    et, en version 2, contrôle le MAC de l'en-tête, de l'index et du manifeste
+
+    Le MAC est contrôlé à chaque ouverture : une clé fausse est détectée même
+    si aucun bloc n'est ensuite déchiffré (conteneur vide, contrôle structurel).
+
+    Returns:
+        (en-tête, données associées, clé du fichier)
+
+    Raises:
+        ValueError: Si le fichier est tronqué, prolongé, ou si le MAC est invalide
+    """
+    header = ContainerHeader.read(f)
+
+    # Taille exacte vérifiée avant d'allouer le tampon : fichier tronqué (ou
+    # en-tête corrompu), ou données ajoutées après le dernier bloc
+    offset, length = header.chunks[-1] if header.chunks else (header.size, 0)
+    file_size = f.seek(0, io.SEEK_END)
+    if file_size < offset + length:
+        raise ValueError("Conteneur chiffré tronqué")
+    if file_size > offset + length:
+        raise ValueError(f"Conteneur chiffré invalide: {file_size - offset - length} octets après le dernier bloc")
+
+    if header.has_manifest and not hmac.compare_digest(
+        header.compute_mac(derive_mac_key(master_key, header.salt)), header.mac
+    ):
+        raise ValueError("MAC de l'en-tête invalide (clé invalide ou en-tête altéré)")
+
+    return header, header.pack(), derive_file_key(master_key, header.salt)
+
+
+def _process_chunks(
+    f: BinaryIO,
+    header: ContainerHeader,
+    threads: int,
+    use_mmap: bool,
+    task: Callable[[int, memoryview], None],
+    numbers: Optional[Sequence[int]] = None
+):
+    """
+    Applique une tâche à chaque bloc chiffré, en parallèle si demandé
+
+    Args:
+        f: Fichier du conteneur
+        header: En-tête lu
+        threads: Nombre de threads (1 = séquentiel)
+        use_mmap: Lire les blocs par projection mémoire
+        task: Fonction (numéro, texte chiffré du bloc)
+        numbers: Numéros des blocs à traiter (défaut: tous)
+    """
+    if numbers is None:
+        numbers = range(header.chunk_count)
+    reader = _ChunkReader(f, min(header.chunk_size, header.plaintext_size) + TAG_SIZE, use_mmap)
+
+    def process(number: int):
+        offset, length = header.chunks[number]
+        task(number, reader.read(number, offset, length))
+
+    try:
+        threads = max(1, min(threads, len(numbers)))
+        if threads == 1:
+            for number in numbers:
+                process(number)
+        else:
+            with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="diana-decrypt") as executor:
+                # Propage la première erreur rencontrée
+                list(executor.map(process, numbers))
+    finally:
+        reader.close()
+
+
+def decrypt_container(f: BinaryIO, master_key: bytes, threads: int = 1, use_mmap: bool = True) -> bytes:
+    """
+    Déchiffre un conteneur dans un tampon préalloué, en parallèle si demandé
+
+    Chaque bloc est lu depuis la projection mémoire du fichier (ou un tampon
+    de bloc par thread) puis déchiffré directement à sa place dans le tampon
+    final, et son tag est vérifié. Les blocs étant authentifiés
+    indépendamment, ils peuvent être déchiffrés simultanément : les
+    primitives de cryptography relâchent le GIL. Le fichier chiffré n'est
+    jamais copié en entier ; le pic mémoire est d'un modèle en clair, puis
+    brièvement de deux lors de la conversion finale en bytes (exigée par
+    ONNX Runtime).
+
+    Args:
+        f: Fichier ouvert en lecture binaire, positionné au début
+        master_key: Clé maître (32 octets)
+        threads: Nombre de threads de déchiffrement (1 = séquentiel)
+        use_mmap: Lire les blocs par projection mémoire (repli automatique sur des lectures)
+
+    Returns:
+        Données en clair
+
+    Raises:
+        ValueError: Si le conteneur est invalide, tronqué ou altéré, ou si la clé est fausse
+    """
+    header, associated_data, key = _open_container(f, master_key)
+    plaintext = bytearray(header.plaintext_size)
+    output = memoryview(plaintext)
+
+    def decrypt(number: int, ciphertext: memoryview):
+        start = number * header.chunk_size
+        try:
+            _decrypt_chunk(
+                key, header.nonce(number), associated_data,
+                ciphertext, output[start:start + len(ciphertext) - TAG_SIZE]
+            )
+        except InvalidTag as e:
+            raise ValueError(f"Déchiffrement du bloc {number} impossible (clé invalide ou fichier altéré)") from e
+
+    _process_chunks(f, header, threads, use_mmap, decrypt)
+    return bytes(plaintext)
+
+
+@dataclass(frozen=True)
+class VerificationResult:
+    """Bilan d'une vérification d'intégrité réussie"""
+    chunk_count: int
+    chunks_checked: int  # blocs dont le tag GCM a été vérifié
+    manifest_checked: bool  # MAC et manifeste contrôlés (version 2)
+    assumed_corruption: float
+    confidence: float  # probabilité de détecter l'altération supposée (1 = vérification complète)
+
+    @property
+    def complete(self) -> bool:
+        """Tous les blocs ont été authentifiés"""
+        return self.chunks_checked == self.chunk_count
+
+    def as_dict(self) -> Dict:
+        """Représentation JSON-sérialisable"""
+        return {
+            "chunk_count": self.chunk_count,
+            "chunks_checked": self.chunks_checked,
+            "complete": self.complete,
+            "manifest_checked": self.manifest_checked,
+            "assumed_corruption": self.assumed_corruption,
+            "confidence": round(self.confidence, 6),
+        }
+
+
+def _check_manifest(f: BinaryIO, header: ContainerHeader):
+    """
+    Compare le tag stocké de chaque bloc au manifeste (MAC déjà contrôlé par _open_container)
+
+    Seuls les 16 derniers octets de chaque bloc sont lus : un bloc déplacé,
+    remplacé, dupliqué ou tronqué est détecté sans rien déchiffrer.
+
+    Raises:
+        ValueError: Si un tag diffère
+    """
+    for number, ((offset, length), tag) in enumerate(zip(header.chunks, header.tags)):
+        f.seek(offset + length - TAG_SIZE)
+        if f.read(TAG_SIZE) != tag:
+            raise ValueError(f"Bloc {number} invalide (tag différent du manifeste)")
+
+
+def verify_container(
+    f: BinaryIO,
+    master_key: bytes,
+    threads: int = 1,
+    use_mmap: bool = True,
+    sample: Optional[int] = None,
+    assumed_corruption: float = DEFAULT_ASSUMED_CORRUPTION,
+    rng: Optional[random.Random] = None
+) -> VerificationResult:
+    """
+    Vérifie l'intégrité d'un conteneur sans conserver les données en clair
+
+    Pour un fichier de version 2, le MAC de l'en-tête, de l'index et du
+    manifeste est contrôlé, puis le tag stocké de chaque bloc est comparé au
+    manifeste : la structure du fichier est validée en lisant quelques
+    octets par bloc. Les tags GCM sont ensuite vérifiés sur tous les blocs,
+    ou sur un échantillon tiré au hasard si sample est donné ; une
+    altération à l'intérieur d'un bloc non tiré passe alors inaperçue, d'où
+    la confiance rapportée (voir detection_confidence). Avec sample=0, seul
+    le contrôle structurel est fait, sans aucun déchiffrement : la confiance
+    sur le contenu des blocs est alors nulle.
+
+    Vérifier un tag GCM suppose de parcourir tout le bloc : chaque bloc tiré
+    est déchiffré dans un tampon de travail réutilisé, la mémoire utilisée
+    est d'un bloc par thread, quelle que soit la taille du modèle.
+
+    Args:
+        f: Fichier ouvert en lecture binaire, positionné au début
+        master_key: Clé maître (32 octets)
+        threads: Nombre de threads de vérification
+        use_mmap: Lire les blocs par projection mémoire
+        sample: Nombre de blocs à authentifier (défaut: tous, 0 : contrôle structurel seul)
+        assumed_corruption: Fraction de blocs altérés supposée pour la confiance
+        rng: Générateur du tirage (défaut: aléatoire du système)
+
+    Returns:
+        Bilan de la vérification
+
+    Raises:
+        ValueError: Si le conteneur est invalide, tronqué ou altéré, si la clé
+            est fausse, ou si sample=0 pour un fichier sans manifeste (version 1)
+    """
+    if sample is not None and sample < 0:
+        raise ValueError(f"Taille d'échantillon invalide: {sample}")
+
+    header, associated_data, key = _open_container(f, master_key)
+    if header.has_manifest:
+        _check_manifest(f, header)
+    elif sample == 0:
+        raise ValueError("Contrôle structurel impossible sans manifeste (conteneur de version 1)")
+
+    numbers = range(header.chunk_count)
+    if sample is not None and sample < header.chunk_count:
+        # Tirage trié : lectures dans l'ordre du fichier
+        numbers = sorted((rng or random.SystemRandom()).sample(numbers, sample))
+
+    scratch = threading.local()
+
+    def verify(number: int, ciphertext: memoryview):
+        if getattr(scratch, "buffer", None) is None:
+            scratch.buffer = bytearray(header.chunk_size)
+        try:
+            _decrypt_chunk(
+                key, header.nonce(number), associated_data,
+                ciphertext, memoryview(scratch.buffer)[:len(ciphertext) - TAG_SIZE]
+            )
+        except InvalidTag as e:
+            raise ValueError(f"Bloc {number} invalide (clé invalide ou fichier altéré)") from e
+
+    if numbers:
+        _process_chunks(f, header, threads, use_mmap, verify, numbers)
+    return VerificationResult(
+        chunk_count=header.chunk_count,
+        chunks_checked=len(numbers),
+        manifest_checked=header.has_manifest,
+        assumed_corruption=assumed_corruption,
+        confidence=detection_confidence(header.chunk_count, len(numbers), assumed_corruption),
+    )
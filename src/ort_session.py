@@ -0,0 +1,472 @@
+"""
+DIANA - Sessions ONNX Runtime
+Création des sessions d'inférence selon les profils de performance configurés
+"""
+
+import hashlib
+import json
+import logging
+import os
+import platform
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+import numpy as np
+import onnxruntime as ort
+
+try:
+    import onnx
+    from onnx import TensorProto, helper
+except ImportError:  # Optionnel : uniquement pour ORT_UINT8_INPUT
+    onnx = None
+
+import config
+from src.encryption_manager import get_model_decryptor
+
+logger = logging.getLogger(__name__)
+
+_GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+_ONNX_DTYPES = {
+    "tensor(float)": np.float32,
+    "tensor(float16)": np.float16,
+    "tensor(double)": np.float64,
+    "tensor(uint8)": np.uint8,
+}
+
+_EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+def get_profile_settings(profile_name: str) -> Dict:
+    """
+    Retourne les réglages d'un profil, surcharges d'environnement incluses
+
+    Args:
+        profile_name: Nom du profil (clé de config.ORT_PROFILES)
+
+    Returns:
+        Dictionnaire des réglages SessionOptions
+
+    Raises:
+        ValueError: Si le profil est inconnu
+    """
+    if profile_name not in config.ORT_PROFILES:
+        raise ValueError(
+            f"Profil ONNX Runtime inconnu: {profile_name} "
+            f"(disponibles: {', '.join(config.ORT_PROFILES)})"
+        )
+
+    settings = dict(config.ORT_PROFILES[profile_name])
+    if config.ORT_INTRA_OP_THREADS:
+        settings["intra_op_num_threads"] = int(config.ORT_INTRA_OP_THREADS)
+    if config.ORT_INTER_OP_THREADS:
+        settings["inter_op_num_threads"] = int(config.ORT_INTER_OP_THREADS)
+    return settings
+
+
+def build_session_options(profile_name: str, intra_op_threads: Optional[int] = None) -> ort.SessionOptions:
+    """
+    Construit les SessionOptions correspondant à un profil
+
+    Args:
+        profile_name: Nom du profil (latency, throughput, low_memory...)
+        intra_op_threads: Nombre de threads intra-op imposé (ex: cœurs
+            attribués à un processus d'inférence), sinon celui du profil
+
+    Returns:
+        SessionOptions configurées
+    """
+    settings = get_profile_settings(profile_name)
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = settings["intra_op_num_threads"] if intra_op_threads is None else intra_op_threads
+    options.inter_op_num_threads = settings["inter_op_num_threads"]
+    options.execution_mode = _EXECUTION_MODES[settings["execution_mode"]]
+    options.graph_optimization_level = _GRAPH_OPTIMIZATION_LEVELS[settings["graph_optimization_level"]]
+    options.enable_cpu_mem_arena = settings["enable_cpu_mem_arena"]
+    options.enable_mem_pattern = settings["enable_mem_pattern"]
+    return options
+
+
+def get_providers() -> List[str]:
+    """Retourne les providers d'exécution (GPU si disponible, sinon CPU)"""
+    providers = ['CPUExecutionProvider']
+    if 'CUDAExecutionProvider' in ort.get_available_providers():
+        providers.insert(0, 'CUDAExecutionProvider')
+        logger.info("GPU CUDA détecté, utilisation du GPU")
+    return providers
+
+
+def wrap_uint8_input(model_data: bytes) -> bytes:
+    """
+    Intègre la conversion de l'entrée au graphe ONNX
+
+    L'entrée float32 NCHW normalisée [0, 1] est remplacée par une entrée
+    uint8 NHWC du même nom, suivie des nœuds Transpose -> Cast -> Div(255).
+    ONNX Runtime peut ainsi fusionner ces opérations et Python n'alloue
+    plus de tableau float.
+
+    Args:
+        model_data: Modèle ONNX (octets) à entrée float NCHW
+
+    Returns:
+        Modèle modifié (octets), inchangé si l'entrée est déjà en uint8
+
+    Raises:
+        ImportError: Si le paquet onnx n'est pas installé
+        ValueError: Si l'entrée du modèle n'est pas au format NCHW
+    """
+    if onnx is None:
+        raise ImportError("Le paquet onnx est requis pour l'entrée uint8 (pip install onnx)")
+
+    model = onnx.load_from_string(model_data)
+    graph = model.graph
+    initializer_names = {initializer.name for initializer in graph.initializer}
+    graph_input = next(item for item in graph.input if item.name not in initializer_names)
+    tensor_type = graph_input.type.tensor_type
+
+    if tensor_type.elem_type == TensorProto.UINT8:
+        return model_data
+    dims = list(tensor_type.shape.dim)
+    if len(dims) != 4 or dims[1].dim_value not in (1, 3):
+        raise ValueError(f"Entrée NCHW attendue pour {graph_input.name}")
+
+    name = graph_input.name
+    nchw_name = f"{name}_nchw"
+    for node in graph.node:
+        node.input[:] = [nchw_name if value == name else value for value in node.input]
+
+    def dim_value(dim):
+        return dim.dim_param or (dim.dim_value if dim.HasField("dim_value") else None)
+
+    uint8_input = helper.make_tensor_value_info(
+        name,
+        TensorProto.UINT8,
+        [dim_value(dims[0]), dim_value(dims[2]), dim_value(dims[3]), dim_value(dims[1])]
+    )
+    scale_name = f"{name}_scale"
+    graph.initializer.append(helper.make_tensor(scale_name, TensorProto.FLOAT, [], [255.0]))
+    preprocessing_nodes = [
+        helper.make_node("Transpose", [name], [f"{name}_chw_uint8"], perm=[0, 3, 1, 2]),
+        helper.make_node("Cast", [f"{name}_chw_uint8"], [f"{name}_float"], to=TensorProto.FLOAT),
+        helper.make_node("Div", [f"{name}_float", scale_name], [nchw_name]),
+    ]
+
+    input_index = list(graph.input).index(graph_input)
+    graph.input.remove(graph_input)
+    graph.input.insert(input_index, uint8_input)
+    nodes = preprocessing_nodes + list(graph.node)
+    del graph.node[:]
+    graph.node.extend(nodes)
+
+    return model.SerializeToString()
+
+
+def create_session(
+    model: Union[bytes, str, Path],
+    profile_name: str,
+    use_optimized_cache: bool = False,
+    uint8_input: bool = False,
+    intra_op_threads: Optional[int] = None
+) -> ort.InferenceSession:
+    """
+    Crée une session d'inférence avec le profil de performance demandé
+
+    Args:
+        model: Modèle ONNX en mémoire ou chemin du fichier
+        profile_name: Nom du profil de performance
+        use_optimized_cache: Réutilise (ou crée) le graphe optimisé chiffré
+            sur disque ; uniquement pour un modèle en mémoire
+        uint8_input: Intègre la normalisation au graphe (entrée uint8 NHWC),
+            voir wrap_uint8_input ; entrée float conservée en cas d'échec
+        intra_op_threads: Nombre de threads intra-op imposé (voir build_session_options)
+
+    Returns:
+        Session ONNX Runtime prête à l'emploi
+    """
+    if uint8_input:
+        try:
+            model_data = model if isinstance(model, bytes) else Path(model).read_bytes()
+            model = wrap_uint8_input(model_data)
+        except Exception as e:
+            logger.warning(f"Entrée uint8 indisponible, entrée float conservée: {e}")
+
+    if isinstance(model, Path):
+        model = str(model)
+
+    providers = get_providers()
+
+    if use_optimized_cache and isinstance(model, bytes):
+        session = _create_session_from_optimized_cache(model, profile_name, providers, intra_op_threads)
+        if session is not None:
+            return session
+
+    logger.info(f"Création de la session ONNX Runtime (profil: {profile_name})")
+    return ort.InferenceSession(
+        model,
+        sess_options=build_session_options(profile_name, intra_op_threads),
+        providers=providers
+    )
+
+
+class _ThreadBuffers:
+    """Tampons et liaisons IOBinding d'un thread"""
+
+    def __init__(self, input_buffer: np.ndarray):
+        self.input_buffer = input_buffer
+        self.output_buffers: Optional[List[np.ndarray]] = None
+        self.bindings: Dict[int, tuple] = {}
+
+
+class IOBindingRunner:
+    """
+    Exécution par IOBinding avec tampons d'entrée et de sortie préalloués
+
+    Chaque thread dispose de ses propres tampons, dimensionnés pour
+    max_batch_size et réutilisés d'un appel à l'autre ; une liaison
+    IOBinding est créée une fois par taille de lot. En régime établi,
+    une inférence n'alloue plus de tableau.
+
+    Les sorties renvoyées sont des vues sur les tampons du thread : elles
+    restent valides jusqu'à l'inférence suivante dans ce même thread.
+    """
+
+    def __init__(self, session: ort.InferenceSession, max_batch_size: int):
+        self.session = session
+        self.max_batch_size = max(1, max_batch_size)
+        model_input = session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_dtype = _ONNX_DTYPES.get(model_input.type, np.float32)
+        self.output_names = [output.name for output in session.get_outputs()]
+        self._local = threading.local()
+
+    def run(self, samples: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """
+        Exécute une inférence sur un lot d'entrées individuelles
+
+        Args:
+            samples: Entrées [1, ...] de même forme (au plus max_batch_size)
+
+        Returns:
+            Sorties du modèle pour le lot (vues sur les tampons du thread)
+        """
+        batch_size = len(samples)
+        if not 0 < batch_size <= self.max_batch_size:
+            raise ValueError(f"Taille de lot invalide: {batch_size} (max: {self.max_batch_size})")
+
+        buffers = self._thread_buffers(tuple(samples[0].shape[1:]))
+        for index, sample in enumerate(samples):
+            np.copyto(buffers.input_buffer[index], sample[0])
+
+        binding = buffers.bindings.get(batch_size)
+        if binding is None:
+            binding = self._bind(buffers, batch_size)
+        io_binding, outputs = binding
+
+        self.session.run_with_iobinding(io_binding)
+        return outputs
+
+    def _thread_buffers(self, sample_shape: tuple) -> _ThreadBuffers:
+        """Tampons du thread courant, (ré)alloués si la forme d'entrée change"""
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None or buffers.input_buffer.shape[1:] != sample_shape:
+            buffers = _ThreadBuffers(
+                np.empty((self.max_batch_size,) + sample_shape, dtype=self.input_dtype)
+            )
+            self._local.buffers = buffers
+        return buffers
+
+    def _bind(self, buffers: _ThreadBuffers, batch_size: int) -> tuple:
+        """Crée la liaison IOBinding d'une taille de lot sur les tampons du thread"""
+        inputs = buffers.input_buffer[:batch_size]
+
+        if buffers.output_buffers is None:
+            # Première inférence du thread : découvrir la forme des sorties
+            # (dimension batch en tête) puis les allouer pour max_batch_size
+            results = self.session.run(self.output_names, {self.input_name: inputs})
+            buffers.output_buffers = [
+                np.empty((self.max_batch_size,) + result.shape[1:], dtype=result.dtype)
+                for result in results
+            ]
+
+        io_binding = self.session.io_binding()
+        io_binding.bind_input(
+            self.input_name, 'cpu', 0, self.input_dtype, inputs.shape, inputs.ctypes.data
+        )
+        outputs = [output_buffer[:batch_size] for output_buffer in buffers.output_buffers]
+        for name, output in zip(self.output_names, outputs):
+            io_binding.bind_output(name, 'cpu', 0, output.dtype, output.shape, output.ctypes.data)
+
+        buffers.bindings[batch_size] = (io_binding, outputs)
+        return buffers.bindings[batch_size]
+
+
+def make_dummy_input(session: ort.InferenceSession) -> np.ndarray:
+    """
+    Construit une entrée factice à la forme de l'entrée du modèle
+
+    Les dimensions symboliques sont résolues à 1 pour le batch et à 224
+    pour les autres axes.
+
+    Args:
+        session: Session ONNX Runtime
+
+    Returns:
+        Tenseur de zéros au type et à la forme attendus
+    """
+    model_input = session.get_inputs()[0]
+    shape = [
+        dim if isinstance(dim, int) and dim > 0 else (1 if axis == 0 else 224)
+        for axis, dim in enumerate(model_input.shape)
+    ]
+    return np.zeros(shape, dtype=_ONNX_DTYPES.get(model_input.type, np.float32))
+
+
+def warmup_session(session: ort.InferenceSession, iterations: int) -> float:
+    """
+    Exécute des inférences factices pour absorber le coût du premier appel
+
+    Args:
+        session: Session ONNX Runtime
+        iterations: Nombre d'inférences factices
+
+    Returns:
+        Durée totale du préchauffage en millisecondes
+    """
+    dummy_input = make_dummy_input(session)
+    feeds = {session.get_inputs()[0].name: dummy_input}
+
+    start_time = time.perf_counter()
+    for _ in range(max(0, iterations)):
+        session.run(None, feeds)
+    return (time.perf_counter() - start_time) * 1000
+
+
+@lru_cache(maxsize=1)
+def _cpu_fingerprint() -> str:
+    """
+    Empreinte du processeur hôte pour la clé du cache de graphes optimisés
+
+    Un graphe enregistré en ORT_ENABLE_ALL contient des transformations
+    propres au matériel (noyaux choisis selon les jeux d'instructions) : il
+    ne doit pas être rechargé sur un autre processeur (image de conteneur ou
+    volume partagé entre machines).
+
+    Returns:
+        Architecture, nom du processeur et ligne des jeux d'instructions de
+        /proc/cpuinfo (si disponible)
+    """
+    flags = ""
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                # "flags" sur x86, "Features" sur ARM
+                if line.split(":", 1)[0].strip() in ("flags", "Features"):
+                    flags = " ".join(sorted(line.split(":", 1)[1].split()))
+                    break
+    except OSError:
+        pass
+    return f"{platform.machine()}|{platform.processor()}|{flags}"
+
+
+def get_optimized_cache_path(model_data: bytes, profile_name: str, providers: List[str]) -> Path:
+    """
+    Chemin du graphe optimisé en cache pour un modèle donné
+
+    La clé combine le hash du modèle, la version d'ONNX Runtime, les providers,
+    les réglages du profil et l'empreinte du processeur hôte : toute
+    modification invalide le cache.
+
+    Args:
+        model_data: Modèle ONNX d'origine
+        profile_name: Nom du profil de performance
+        providers: Providers d'exécution de la session
+
+    Returns:
+        Chemin du fichier chiffré du graphe optimisé
+    """
+    key = hashlib.sha256()
+    key.update(hashlib.sha256(model_data).digest())
+    key.update(ort.__version__.encode())
+    key.update(",".join(providers).encode())
+    key.update(json.dumps(get_profile_settings(profile_name), sort_keys=True).encode())
+    key.update(_cpu_fingerprint().encode())
+    return config.ORT_CACHE_DIR / f"{key.hexdigest()[:32]}.optimized.onnx.enc"
+
+
+def _create_session_from_optimized_cache(
+    model_data: bytes,
+    profile_name: str,
+    providers: List[str],
+    intra_op_threads: Optional[int] = None
+) -> Optional[ort.InferenceSession]:
+    """
+    Charge le graphe optimisé depuis le cache, ou le crée s'il est absent
+
+    Args:
+        model_data: Modèle ONNX d'origine
+        profile_name: Nom du profil de performance
+        providers: Providers d'exécution de la session
+        intra_op_threads: Nombre de threads intra-op imposé
+
+    Returns:
+        Session prête, ou None pour revenir au chargement standard
+    """
+    encryption_manager = get_model_decryptor().encryption_manager
+    cache_path = get_optimized_cache_path(model_data, profile_name, providers)
+
+    # Cache présent : charger le graphe déjà optimisé sans ré-optimisation
+    if cache_path.exists():
+        optimized_data = encryption_manager.decrypt_to_memory(cache_path)
+        if optimized_data is not None:
+            try:
+                options = build_session_options(profile_name, intra_op_threads)
+                options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+                session = ort.InferenceSession(optimized_data, sess_options=options, providers=providers)
+                logger.info(f"Graphe optimisé chargé depuis le cache: {cache_path.name}")
+                return session
+            except Exception as e:
+                logger.warning(f"Cache du graphe optimisé invalide, reconstruction: {e}")
+        cache_path.unlink(missing_ok=True)
+
+    # Cache absent : optimiser une fois et enregistrer le résultat chiffré
+    config.ORT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(suffix='.onnx', dir=config.ORT_CACHE_DIR)
+    os.close(fd)
+    temp_path = Path(temp_name)
+
+    try:
+        options = build_session_options(profile_name, intra_op_threads)
+        options.optimized_model_filepath = str(temp_path)
+        logger.info(f"Création de la session ONNX Runtime avec mise en cache du graphe optimisé (profil: {profile_name})")
+        session = ort.InferenceSession(model_data, sess_options=options, providers=providers)
+
+        with open(temp_path, 'rb') as f:
+            optimized_data = f.read()
+
+        # Écriture atomique : un autre processus ne lit jamais un cache partiel
+        partial_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        if optimized_data and encryption_manager.encrypt_to_file(optimized_data, partial_path):
+            os.replace(partial_path, cache_path)
+            logger.info(f"Graphe optimisé mis en cache: {cache_path.name}")
+
+        return session
+
+    except Exception as e:
+        logger.warning(f"Mise en cache du graphe optimisé impossible: {e}")
+        return None
+
+    finally:
+        # Le graphe optimisé en clair ne doit pas rester sur le disque
+        encryption_manager.cleanup_decrypted_file(temp_path)
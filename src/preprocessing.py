@@ -0,0 +1,256 @@
+"""
+DIANA - Prétraitement des images
+Chargement des images en mémoire et prétraitement partagé entre le filtre
+et le classifieur
+"""
+
+import hashlib
+import io
+import logging
+from pathlib import Path
+from typing import Optional, Dict, Tuple, Union
+import numpy as np
+from PIL import Image
+
+import config
+from src.dicom import is_dicom, load_dicom
+
+logger = logging.getLogger(__name__)
+
+# Formats d'entrée acceptés par le filtre et le moteur d'inférence
+ImageSource = Union[str, Path, bytes, bytearray, memoryview, Image.Image, np.ndarray]
+
+# Marge du décodage rapide : l'image décodée (draft JPEG) ou pré-réduite
+# (Image.reduce) reste au moins deux fois plus grande que la taille cible
+# avant le LANCZOS final, comme Image.thumbnail
+_FAST_DECODE_GAP = 2.0
+
+
+def load_image(source: ImageSource) -> Image.Image:
+    """
+    Charge une image depuis un chemin, des octets, une image PIL ou un tableau numpy
+
+    Args:
+        source: Chemin de fichier, contenu encodé (JPEG, PNG, DICOM...),
+            image PIL ou tableau numpy (HW ou HWC)
+
+    Returns:
+        Image PIL
+
+    Raises:
+        TypeError: Si le type de source n'est pas supporté
+    """
+    if isinstance(source, Image.Image):
+        return source
+
+    if isinstance(source, np.ndarray):
+        return Image.fromarray(source)
+
+    # DICOM : pixels fenêtrés directement, sans PNG intermédiaire
+    if is_dicom(source):
+        return load_dicom(source)
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(source))
+
+    if isinstance(source, (str, Path)):
+        return Image.open(source)
+
+    raise TypeError(f"Type d'image non supporté: {type(source).__name__}")
+
+
+class PreparedImage:
+    """
+    Image décodée une seule fois et partagée entre le filtre et le classifieur
+
+    La conversion RGB est faite au premier accès et chaque tenseur redimensionné
+    est mis en cache par taille cible : si les deux modèles attendent la même
+    taille, le redimensionnement n'est effectué qu'une fois.
+
+    Avec config.FAST_IMAGE_DECODE, un JPEG est décodé directement à une
+    résolution réduite proche de la taille cible (mise à l'échelle DCT de
+    draft()), puis pré-réduit par Image.reduce avant le LANCZOS final.
+    """
+
+    def __init__(self, source: ImageSource, size_hint: Optional[Tuple[int, int]] = None):
+        self.source = source
+        self.size_hint = size_hint
+        self._image: Optional[Image.Image] = None
+        self._reduced = False
+        self._original_size: Optional[Tuple[int, int]] = None
+        self._tensors: Dict[Tuple[int, int], np.ndarray] = {}
+        self._pixels: Dict[Tuple[int, int], np.ndarray] = {}
+        self._content_hash: Optional[str] = None
+
+    @property
+    def content_hash(self) -> str:
+        """
+        Empreinte SHA-256 du contenu de l'image
+
+        Calculée sur les octets encodés pour un fichier ou un upload, et sur
+        les pixels pour une image PIL ou un tableau numpy.
+        """
+        if self._content_hash is None:
+            digest = hashlib.sha256()
+            source = self.source
+            if isinstance(source, (str, Path)):
+                with open(source, 'rb') as f:
+                    while chunk := f.read(1024 * 1024):
+                        digest.update(chunk)
+            elif isinstance(source, (bytes, bytearray, memoryview)):
+                digest.update(source)
+            else:
+                array = np.ascontiguousarray(np.asarray(source))
+                digest.update(f"{array.dtype}:{array.shape}".encode())
+                digest.update(array.data)
+            self._content_hash = digest.hexdigest()
+        return self._content_hash
+
+    @property
+    def image(self) -> Image.Image:
+        """Image PIL décodée en pleine résolution et convertie en RGB"""
+        return self.decode()
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """Taille (largeur, hauteur) de l'image d'origine"""
+        if self._original_size is None:
+            self.decode(self.size_hint)
+        return self._original_size
+
+    def decode(self, min_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+        """
+        Décode l'image (une seule fois si possible) et la convertit en RGB
+
+        Args:
+            min_size: Taille (largeur, hauteur) minimale utile ; avec
+                config.FAST_IMAGE_DECODE, un JPEG est décodé à une résolution
+                réduite couvrant cette taille. None = pleine résolution
+
+        Returns:
+            Image PIL RGB
+        """
+        if not config.FAST_IMAGE_DECODE:
+            min_size = None
+
+        if self._image is not None:
+            if not self._reduced:
+                return self._image
+            if min_size is not None and _covers(self._image.size, _scaled(min_size)):
+                return self._image
+
+        image = load_image(self.source)
+        self._original_size = image.size
+
+        # Mise à l'échelle DCT du décodeur JPEG (1/2, 1/4 ou 1/8), uniquement
+        # sur une image ouverte ici (jamais sur une image PIL fournie)
+        if (
+            min_size is not None
+            and isinstance(self.source, (str, Path, bytes, bytearray, memoryview))
+            and image.format == 'JPEG'
+        ):
+            image.draft(None, _scaled(min_size))
+
+        image.load()
+        self._reduced = image.size != self._original_size
+        if self._reduced:
+            logger.debug(f"Décodage réduit: {self._original_size} -> {image.size}")
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        self._image = image
+        return image
+
+    def pixels(self, target_size: Tuple[int, int]) -> np.ndarray:
+        """
+        Retourne les pixels bruts [1, H, W, C] pour une taille cible
+
+        Entrée des modèles dont le graphe intègre la normalisation
+        (voir ORT_UINT8_INPUT) : aucun tableau float n'est alloué.
+
+        Args:
+            target_size: Taille (largeur, hauteur) attendue par le modèle
+
+        Returns:
+            Tableau uint8 contigu en lecture seule, mis en cache pour cette taille
+        """
+        target_size = (int(target_size[0]), int(target_size[1]))
+        cached = self._pixels.get(target_size)
+        if cached is not None:
+            return cached
+
+        image = self.decode(_largest(target_size, self.size_hint))
+        if image.size != target_size:
+            reducing_gap = _FAST_DECODE_GAP if config.FAST_IMAGE_DECODE else None
+            image = image.resize(target_size, Image.Resampling.LANCZOS, reducing_gap=reducing_gap)
+
+        pixels = np.asarray(image, dtype=np.uint8)[np.newaxis]
+        if not pixels.flags.c_contiguous:
+            pixels = np.ascontiguousarray(pixels)
+
+        # Partagé entre modèles : interdire toute modification en place
+        pixels.flags.writeable = False
+        self._pixels[target_size] = pixels
+        return pixels
+
+    def tensor(self, target_size: Tuple[int, int]) -> np.ndarray:
+        """
+        Retourne le tenseur normalisé [1, C, H, W] pour une taille cible
+
+        Args:
+            target_size: Taille (largeur, hauteur) attendue par le modèle
+
+        Returns:
+            Tensor float32 en lecture seule, mis en cache pour cette taille
+        """
+        target_size = (int(target_size[0]), int(target_size[1]))
+        cached = self._tensors.get(target_size)
+        if cached is not None:
+            return cached
+
+        # Convertir en float et normaliser (0-255 -> 0-1)
+        img_array = self.pixels(target_size)[0].astype(np.float32) / 255.0
+
+        # Réorganiser (HWC -> CHW) et ajouter la dimension batch
+        img_array = np.ascontiguousarray(np.transpose(img_array, (2, 0, 1)))[np.newaxis]
+
+        # Partagé entre modèles : interdire toute modification en place
+        img_array.flags.writeable = False
+        self._tensors[target_size] = img_array
+        return img_array
+
+
+def prepare_image(
+    source: Union[ImageSource, PreparedImage],
+    size_hint: Optional[Tuple[int, int]] = None
+) -> PreparedImage:
+    """
+    Enveloppe une source d'image dans un PreparedImage (sans décodage immédiat)
+
+    Args:
+        source: Source d'image ou PreparedImage déjà construit
+        size_hint: Plus grande taille cible des modèles, pour un seul
+            décodage réduit couvrant le filtre et le classifieur
+
+    Returns:
+        PreparedImage partageable entre le filtre et le classifieur
+    """
+    if isinstance(source, PreparedImage):
+        return source
+    return PreparedImage(source, size_hint)
+
+
+def _scaled(size: Tuple[int, int]) -> Tuple[int, int]:
+    """Taille minimale de décodage pour une taille cible (marge _FAST_DECODE_GAP)"""
+    return int(size[0] * _FAST_DECODE_GAP), int(size[1] * _FAST_DECODE_GAP)
+
+
+def _covers(size: Tuple[int, int], min_size: Tuple[int, int]) -> bool:
+    """Vérifie qu'une taille couvre une taille minimale"""
+    return size[0] >= min_size[0] and size[1] >= min_size[1]
+
+
+def _largest(size: Tuple[int, int], other: Optional[Tuple[int, int]]) -> Tuple[int, int]:
+    """Plus grande des deux tailles, axe par axe"""
+    if other is None:
+        return size
+    return max(size[0], other[0]), max(size[1], other[1])
@@ -0,0 +1,269 @@
+"""
+DIANA - Quantification INT8 du modèle
+Construction d'une variante INT8 et comparaison précision/latence avec le modèle FP32
+"""
+
+import logging
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import onnxruntime as ort
+from onnxruntime.quantization import (
+    CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType,
+    quantize_dynamic, quantize_static
+)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+import config
+from src.encryption_manager import EncryptionManager
+from src.inference_engine import get_class_names
+from src.ort_session import create_session, make_dummy_input
+from src.preprocessing import prepare_image
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ("dynamic", "static")
+
+
+def list_calibration_images(folder: Path) -> List[Path]:
+    """
+    Liste les images d'un dossier de calibration (sous-dossiers inclus)
+
+    Args:
+        folder: Dossier de calibration
+
+    Returns:
+        Chemins des images, triés
+    """
+    return sorted(
+        path for path in Path(folder).rglob("*")
+        if path.is_file() and path.suffix.lower() in config.SUPPORTED_IMAGE_FORMATS
+    )
+
+
+def label_from_path(image_path: Path, folder: Path, class_names: List[str]) -> Optional[str]:
+    """
+    Étiquette d'une image rangée dans un sous-dossier nommé d'après sa classe
+
+    Args:
+        image_path: Chemin de l'image
+        folder: Dossier de calibration
+        class_names: Noms des classes du modèle
+
+    Returns:
+        Nom de la classe, ou None si le sous-dossier ne correspond à aucune classe
+    """
+    relative = Path(image_path).relative_to(folder)
+    if len(relative.parts) < 2:
+        return None
+    names = {name.lower(): name for name in class_names}
+    return names.get(relative.parts[0].lower())
+
+
+def _input_size(session: ort.InferenceSession) -> Tuple[int, int]:
+    """Taille (largeur, hauteur) attendue par un modèle NCHW"""
+    _, _, height, width = make_dummy_input(session).shape
+    return width, height
+
+
+class CalibrationImageReader(CalibrationDataReader):
+    """Fournit les images de calibration prétraitées à quantize_static"""
+
+    def __init__(self, image_paths: List[Path], input_name: str, target_size: Tuple[int, int]):
+        self.image_paths = list(image_paths)
+        self.input_name = input_name
+        self.target_size = target_size
+        self._position = 0
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        """Retourne l'entrée suivante, ou None à la fin du jeu de calibration"""
+        while self._position < len(self.image_paths):
+            image_path = self.image_paths[self._position]
+            self._position += 1
+            try:
+                return {self.input_name: prepare_image(image_path).tensor(self.target_size)}
+            except Exception as e:
+                logger.warning(f"Image de calibration ignorée ({image_path}): {e}")
+        return None
+
+    def rewind(self):
+        """Revient au début du jeu de calibration"""
+        self._position = 0
+
+
+def quantize_model(
+    model_data: bytes,
+    mode: str = "dynamic",
+    calibration_images: Optional[List[Path]] = None,
+    per_channel: bool = False
+) -> bytes:
+    """
+    Construit la variante INT8 d'un modèle ONNX FP32
+
+    Les fichiers intermédiaires en clair sont écrasés puis supprimés.
+
+    Args:
+        model_data: Modèle FP32 (octets)
+        mode: "dynamic" (poids INT8, activations quantifiées à la volée)
+              ou "static" (activations calibrées sur calibration_images)
+        calibration_images: Images de calibration (obligatoires en mode statique)
+        per_channel: Quantification des poids par canal
+
+    Returns:
+        Modèle INT8 (octets)
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Mode de quantification inconnu: {mode} (disponibles: {', '.join(QUANTIZATION_MODES)})")
+    if mode == "static" and not calibration_images:
+        raise ValueError("La quantification statique nécessite des images de calibration")
+
+    encryption_manager = EncryptionManager()
+    with tempfile.TemporaryDirectory(prefix="diana-quant-") as temp_dir:
+        fp32_path = Path(temp_dir) / "model.fp32.onnx"
+        prepared_path = Path(temp_dir) / "model.prepared.onnx"
+        int8_path = Path(temp_dir) / "model.int8.onnx"
+        try:
+            fp32_path.write_bytes(model_data)
+
+            # Inférence de formes et fusions préalables recommandées par ONNX Runtime
+            try:
+                quant_pre_process(fp32_path, prepared_path)
+                fp32_path = prepared_path
+            except Exception as e:
+                logger.warning(f"Pré-traitement du graphe impossible, quantification directe: {e}")
+
+            if mode == "dynamic":
+                quantize_dynamic(
+                    fp32_path,
+                    int8_path,
+                    per_channel=per_channel,
+                    weight_type=QuantType.QInt8
+                )
+            else:
+                session = create_session(model_data, "latency")
+                reader = CalibrationImageReader(
+                    calibration_images,
+                    session.get_inputs()[0].name,
+                    _input_size(session)
+                )
+                quantize_static(
+                    fp32_path,
+                    int8_path,
+                    reader,
+                    quant_format=QuantFormat.QDQ,
+                    per_channel=per_channel,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8,
+                    calibrate_method=CalibrationMethod.MinMax
+                )
+
+            return int8_path.read_bytes()
+        finally:
+            for path in Path(temp_dir).iterdir():
+                encryption_manager.cleanup_decrypted_file(path)
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    """Softmax sur le dernier axe"""
+    exp_logits = np.exp(logits - np.max(logits, axis=-1, keepdims=True))
+    return exp_logits / np.sum(exp_logits, axis=-1, keepdims=True)
+
+
+def _latency_stats(latencies_ms: List[float]) -> Dict:
+    """Statistiques de latence (ms)"""
+    return {
+        "mean": float(np.mean(latencies_ms)),
+        "p50": float(np.percentile(latencies_ms, 50)),
+        "p95": float(np.percentile(latencies_ms, 95))
+    }
+
+
+def compare_models(
+    fp32_model: bytes,
+    int8_model: bytes,
+    image_paths: List[Path],
+    labels_root: Optional[Path] = None,
+    profile: str = config.ORT_PROFILE
+) -> Dict:
+    """
+    Compare précision et latence des modèles FP32 et INT8 sur les mêmes images
+
+    Args:
+        fp32_model: Modèle FP32 (octets)
+        int8_model: Modèle INT8 (octets)
+        image_paths: Images d'évaluation (ex: le jeu de calibration)
+        labels_root: Dossier dont les sous-dossiers portent le nom de la classe
+                     attendue (Bénin/Malin/Normal) pour mesurer l'exactitude
+        profile: Profil SessionOptions utilisé pour les deux sessions
+
+    Returns:
+        Rapport : latences, exactitude, accord top-1 et écarts de probabilités
+    """
+    sessions = {
+        "fp32": create_session(fp32_model, profile),
+        "int8": create_session(int8_model, profile)
+    }
+    input_name = sessions["fp32"].get_inputs()[0].name
+    target_size = _input_size(sessions["fp32"])
+
+    # Une inférence à vide par session pour exclure l'initialisation des mesures
+    for session in sessions.values():
+        session.run(None, {input_name: make_dummy_input(session)})
+
+    latencies = {precision: [] for precision in sessions}
+    probabilities = {precision: [] for precision in sessions}
+    evaluated_paths = []
+
+    for image_path in image_paths:
+        try:
+            input_tensor = prepare_image(image_path).tensor(target_size)
+        except Exception as e:
+            logger.warning(f"Image d'évaluation ignorée ({image_path}): {e}")
+            continue
+
+        for precision, session in sessions.items():
+            start = time.perf_counter()
+            logits = session.run(None, {input_name: input_tensor})[0][0]
+            latencies[precision].append((time.perf_counter() - start) * 1000)
+            probabilities[precision].append(_softmax(logits))
+        evaluated_paths.append(image_path)
+
+    if not evaluated_paths:
+        raise ValueError("Aucune image d'évaluation lisible")
+
+    fp32_probs = np.stack(probabilities["fp32"])
+    int8_probs = np.stack(probabilities["int8"])
+    class_names = get_class_names(fp32_probs.shape[1])
+    labels = [
+        label_from_path(image_path, labels_root, class_names) if labels_root else None
+        for image_path in evaluated_paths
+    ]
+    probability_delta = np.abs(fp32_probs - int8_probs) * 100
+
+    report = {
+        "images": len(evaluated_paths),
+        "profile": profile,
+        "top1_agreement": float(np.mean(fp32_probs.argmax(axis=1) == int8_probs.argmax(axis=1))),
+        "probability_delta_percent": {
+            "mean": float(probability_delta.mean()),
+            "max": float(probability_delta.max())
+        }
+    }
+
+    labeled = [index for index, label in enumerate(labels) if label is not None]
+    for precision, model_data in (("fp32", fp32_model), ("int8", int8_model)):
+        predictions = np.stack(probabilities[precision]).argmax(axis=1)
+        report[precision] = {
+            "size_mb": len(model_data) / (1024 * 1024),
+            "latency_ms": _latency_stats(latencies[precision]),
+            "accuracy": float(np.mean([
+                class_names[predictions[index]] == labels[index] for index in labeled
+            ])) if labeled else None
+        }
+
+    report["labeled_images"] = len(labeled)
+    report["speedup"] = report["fp32"]["latency_ms"]["p50"] / report["int8"]["latency_ms"]["p50"]
+    return report
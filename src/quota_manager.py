@@ -5,6 +5,8 @@ Gestion du système freemium avec quota de 500 analyses gratuites
 
 import json
 import logging
+import os
+import threading
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, Dict
@@ -12,6 +14,9 @@ import config
 
 logger = logging.getLogger(__name__)
 
+# Message des analyses refusées faute de quota
+QUOTA_EXCEEDED_MESSAGE = "Quota épuisé. Connectez-vous avec un compte Premium."
+
 
 class QuotaManager:
     """Gestion du quota d'analyses pour la version gratuite"""
@@ -19,6 +24,8 @@ class QuotaManager:
     def __init__(self, quota_file: Path = config.QUOTA_FILE):
         self.quota_file = quota_file
         self.free_limit = config.FREE_TIER_LIMIT
+        # Lecture-modification-écriture du fichier depuis la boucle et les threads d'inférence
+        self._lock = threading.RLock()
         self._ensure_quota_file()
     
     def _ensure_quota_file(self):
@@ -48,12 +55,15 @@ class QuotaManager:
             }
     
     def _save_quota(self, data: Dict):
-        """Sauvegarde les données de quota"""
+        """Sauvegarde les données de quota (écriture atomique : jamais de fichier à moitié écrit)"""
+        temp_path = self.quota_file.with_name(f"{self.quota_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
         try:
-            with open(self.quota_file, 'w', encoding='utf-8') as f:
+            with open(temp_path, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, self.quota_file)
         except Exception as e:
             logger.error(f"Erreur lors de la sauvegarde du quota: {e}")
+            temp_path.unlink(missing_ok=True)
     
     def get_remaining_analyses(self) -> int:
         """Retourne le nombre d'analyses restantes"""
@@ -83,7 +93,12 @@ class QuotaManager:
         return used < self.free_limit
     
     def increment_usage(self) -> bool:
-        """Incrémente le compteur d'utilisation"""
+        """Incrémente le compteur d'utilisation (thread-safe)"""
+        with self._lock:
+            return self._increment_usage()
+    
+    def _increment_usage(self) -> bool:
+        """Incrémente le compteur d'utilisation (verrou tenu)"""
         data = self._load_quota()
         
         # Si premium, incrémenter sans limite
@@ -111,9 +126,10 @@ class QuotaManager:
     
     def set_premium(self, is_premium: bool):
         """Active ou désactive le mode premium"""
-        data = self._load_quota()
-        data["is_premium"] = is_premium
-        self._save_quota(data)
+        with self._lock:
+            data = self._load_quota()
+            data["is_premium"] = is_premium
+            self._save_quota(data)
         logger.info(f"Mode premium {'activé' if is_premium else 'désactivé'}")
     
     def is_premium(self) -> bool:
@@ -129,7 +145,8 @@ class QuotaManager:
             "last_analysis_date": None,
             "is_premium": False
         }
-        self._save_quota(initial_data)
+        with self._lock:
+            self._save_quota(initial_data)
         logger.info("Quota réinitialisé")
     
     def get_stats(self) -> Dict:
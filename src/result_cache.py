@@ -0,0 +1,204 @@
+"""
+DIANA - Cache des résultats de prédiction
+Évite de relancer le filtre et le classifieur sur une image déjà analysée
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(content_hash: str, model_version: str) -> str:
+    """
+    Construit la clé de cache d'un résultat
+
+    Args:
+        content_hash: Empreinte du contenu de l'image
+        model_version: Version des modèles ayant produit le résultat
+
+    Returns:
+        Clé de cache (utilisable comme nom de fichier)
+    """
+    return f"{model_version}-{content_hash}"
+
+
+class ResultCache:
+    """
+    Cache LRU avec expiration (TTL) des résultats de prédiction
+
+    La mémoire est bornée par un nombre maximal d'entrées. Un niveau disque
+    optionnel (un fichier JSON par résultat) permet de conserver le cache
+    après un redémarrage.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = config.RESULT_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = config.RESULT_CACHE_TTL_SECONDS,
+        disk_dir: Optional[Path] = None,
+        max_disk_entries: int = config.RESULT_CACHE_DISK_MAX_ENTRIES
+    ):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max(1, max_disk_entries)
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Retourne une copie du résultat en cache, ou None si absent/expiré
+
+        Args:
+            key: Clé de cache
+
+        Returns:
+            Résultat de prédiction ou None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, result = entry
+                if not self._is_expired(created_at, now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(result)
+                del self._entries[key]
+
+        # Niveau disque (hors verrou : lecture de fichier)
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self._store(key, *entry)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def set(self, key: str, result: Dict):
+        """
+        Enregistre une copie d'un résultat
+
+        Args:
+            key: Clé de cache
+            result: Résultat de prédiction
+        """
+        created_at = time.time()
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._store(key, created_at, result)
+        self._write_disk(key, created_at, result)
+
+    def clear(self):
+        """Vide le cache (mémoire et disque)"""
+        with self._lock:
+            self._entries.clear()
+        if self.disk_dir is not None:
+            for path in self.disk_dir.glob("*.json"):
+                path.unlink(missing_ok=True)
+
+    def get_stats(self) -> Dict:
+        """Retourne les compteurs du cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk": self.disk_dir is not None
+            }
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        """Vérifie si une entrée a dépassé sa durée de vie"""
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def _store(self, key: str, created_at: float, result: Dict):
+        """Insère une entrée en mémoire et évince la plus ancienne si besoin (verrou requis)"""
+        self._entries[key] = (created_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, key: str, now: float) -> Optional[Tuple[float, Dict]]:
+        """Lit une entrée du niveau disque"""
+        if self.disk_dir is None:
+            return None
+
+        path = self.disk_dir / f"{key}.json"
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Entrée de cache illisible, suppression: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        if self._is_expired(data["created_at"], now):
+            path.unlink(missing_ok=True)
+            return None
+        return data["created_at"], data["result"]
+
+    def _write_disk(self, key: str, created_at: float, result: Dict):
+        """Écrit une entrée sur le niveau disque (écriture atomique)"""
+        if self.disk_dir is None:
+            return
+
+        path = self.disk_dir / f"{key}.json"
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"created_at": created_at, "result": result}, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.warning(f"Écriture du cache sur disque impossible: {e}")
+            temp_path.unlink(missing_ok=True)
+            return
+
+        self._disk_writes += 1
+        if self._disk_writes % 100 == 0:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Supprime les entrées disque les plus anciennes au-delà de la limite"""
+        try:
+            paths = sorted(self.disk_dir.glob("*.json"), key=lambda path: path.stat().st_mtime)
+            for path in paths[:max(0, len(paths) - self.max_disk_entries)]:
+                path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Nettoyage du cache disque impossible: {e}")
+
+
+# Singleton global
+_result_cache_instance: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """Retourne l'instance singleton du cache de résultats"""
+    global _result_cache_instance
+    if _result_cache_instance is None:
+        _result_cache_instance = ResultCache(
+            disk_dir=config.RESULT_CACHE_DIR if config.RESULT_CACHE_DISK else None
+        )
+    return _result_cache_instance
@@ -0,0 +1,127 @@
+"""
+DIANA - Coalescence des requêtes identiques (single-flight)
+Les appels concurrents avec la même clé partagent un seul calcul en cours
+"""
+
+import asyncio
+import copy
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """Calcul en cours partagé par plusieurs appelants (threads)"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Single-flight pour du code synchrone multi-thread
+
+    Le premier appelant d'une clé exécute la fonction ; les appelants
+    concurrents avec la même clé attendent et reçoivent une copie du résultat.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Exécute func une seule fois pour tous les appels concurrents de même clé
+
+        Args:
+            key: Clé identifiant le calcul (ex: empreinte de l'image)
+            func: Fonction sans argument à exécuter
+
+        Returns:
+            (copie du résultat, partagé) où partagé vaut True pour les
+            appelants qui ont attendu le calcul d'un autre thread
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result), True
+
+        try:
+            call.result = func()
+            # Copie pour l'appelant : call.result reste intact pour les autres
+            return copy.deepcopy(call.result), False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            if call.waiters:
+                logger.info(f"Calcul partagé avec {call.waiters} requête(s) identique(s)")
+            call.done.set()
+
+    @property
+    def in_flight(self) -> int:
+        """Nombre de calculs en cours"""
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """Single-flight pour des coroutines sur une même boucle asyncio"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Attend func une seule fois pour toutes les coroutines concurrentes de même clé
+
+        Le calcul s'exécute dans sa propre tâche : l'annulation d'un appelant
+        (client déconnecté) n'interrompt pas les autres.
+
+        Args:
+            key: Clé identifiant le calcul
+            func: Fonction sans argument renvoyant une coroutine
+
+        Returns:
+            (copie du résultat, partagé) comme SingleFlight.do
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result), shared
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        """Retire un calcul terminé"""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Évite l'avertissement "exception never retrieved" sans appelant
+            task.exception()
+
+    @property
+    def in_flight(self) -> int:
+        """Nombre de calculs en cours"""
+        return len(self._calls)
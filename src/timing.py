@@ -0,0 +1,103 @@
+"""
+DIANA - Mesure des durées par étape
+Chronométrage structuré d'une prédiction (lecture, décodage, filtre, inférence...)
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+# Étapes d'une prédiction, dans l'ordre du pipeline
+STAGES = (
+    "upload_read",   # Lecture de l'upload (web)
+    "decode",        # Décodage de l'image
+    "queue",         # Attente dans le micro-batcher (web)
+    "filter",        # Filtrage (prétraitement et inférence du filtre)
+    "model_load",    # Vérification et chargement du modèle
+    "preprocess",    # Prétraitement pour le classifieur
+    "inference",     # Inférence du classifieur
+    "softmax",       # Softmax et construction du résultat
+    "quota_write",   # Décompte du quota
+)
+
+
+class StageTimings:
+    """
+    Durées (ms) des étapes d'une prédiction
+
+    Une étape mesurée plusieurs fois (ex: prétraitement de chaque image d'un
+    lot) cumule ses durées.
+    """
+
+    def __init__(self):
+        self._durations: Dict[str, float] = {}
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """
+        Chronomètre le bloc et ajoute sa durée à une étape
+
+        Args:
+            stage: Nom de l'étape (voir STAGES)
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, (time.perf_counter() - start) * 1000)
+
+    def add(self, stage: str, duration_ms: float):
+        """Ajoute une durée (ms) à une étape"""
+        self._durations[stage] = self._durations.get(stage, 0.0) + duration_ms
+
+    def get(self, stage: str) -> float:
+        """Durée cumulée d'une étape (0 si non mesurée)"""
+        return self._durations.get(stage, 0.0)
+
+    def update(self, other: "StageTimings"):
+        """Ajoute les durées d'une autre mesure"""
+        for stage, duration_ms in other.items():
+            self.add(stage, duration_ms)
+
+    def items(self) -> Iterator[Tuple[str, float]]:
+        """Étapes mesurées dans l'ordre du pipeline, puis les autres"""
+        order = {stage: index for index, stage in enumerate(STAGES)}
+        return iter(sorted(self._durations.items(), key=lambda item: order.get(item[0], len(order))))
+
+    @property
+    def total_ms(self) -> float:
+        """Somme des durées mesurées"""
+        return sum(self._durations.values())
+
+    def as_dict(self) -> Dict[str, float]:
+        """
+        Durées au format du résultat de prédiction
+
+        Returns:
+            {"<étape>_ms": durée} arrondi au centième de milliseconde
+        """
+        return {f"{stage}_ms": round(duration_ms, 2) for stage, duration_ms in self.items()}
+
+    @classmethod
+    def from_dict(cls, durations: Optional[Dict[str, float]]) -> "StageTimings":
+        """Reconstruit une mesure depuis as_dict (clés "<étape>_ms")"""
+        timings = cls()
+        for key, duration_ms in (durations or {}).items():
+            if key.endswith("_ms") and key != "total_ms":
+                timings.add(key[:-3], float(duration_ms))
+        return timings
+
+    def server_timing(self, total_ms: Optional[float] = None) -> str:
+        """
+        Valeur de l'en-tête HTTP Server-Timing
+
+        Args:
+            total_ms: Durée totale de la requête à ajouter (métrique "total")
+
+        Returns:
+            Ex: "decode;dur=3.21, inference;dur=12.50, total;dur=17.02"
+        """
+        entries = list(self.items())
+        if total_ms is not None:
+            entries.append(("total", total_ms))
+        return ", ".join(f"{stage};dur={duration_ms:.2f}" for stage, duration_ms in entries)
@@ -0,0 +1,523 @@
+"""
+DIANA - Processus d'inférence partageant un seul modèle déchiffré
+Un superviseur déchiffre le modèle une fois, le partage avec N processus
+épinglés sur des cœurs et leur distribue les inférences par une file locale
+"""
+
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection, wait
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:  # Optionnel : épinglage CPU hors Linux
+    psutil = None
+
+import config
+from src.ort_session import IOBindingRunner, create_session, warmup_session
+
+logger = logging.getLogger(__name__)
+
+# Modèle transmis aux processus : octets hérités par fork, ou (nom, taille)
+# d'un segment de mémoire partagée avec "spawn" et "forkserver"
+ModelSource = Union[bytes, Tuple[str, int]]
+
+_STARTUP_TIMEOUT = 120.0  # Secondes
+_MONITOR_INTERVAL = 1.0  # Secondes
+_RESTART_BACKOFF = 1.0  # Secondes, doublé à chaque échec consécutif
+_MAX_RESTART_BACKOFF = 30.0  # Secondes
+_STABLE_AFTER = 60.0  # Secondes de fonctionnement qui remettent à zéro les échecs consécutifs
+
+
+def available_cpus() -> List[int]:
+    """Cœurs utilisables par le processus courant"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def split_cpus(num_workers: int, cpus: Optional[Sequence[int]] = None) -> List[List[int]]:
+    """
+    Répartit les cœurs disponibles entre les processus d'inférence
+
+    Args:
+        num_workers: Nombre de processus
+        cpus: Cœurs à répartir (défaut: cœurs disponibles)
+
+    Returns:
+        Groupe de cœurs de chaque processus, disjoints tant qu'il y a au
+        moins autant de cœurs que de processus
+    """
+    cpus = list(cpus) if cpus is not None else available_cpus()
+    if num_workers >= len(cpus):
+        return [[cpus[index % len(cpus)]] for index in range(num_workers)]
+
+    size, extra = divmod(len(cpus), num_workers)
+    groups, start = [], 0
+    for index in range(num_workers):
+        end = start + size + (1 if index < extra else 0)
+        groups.append(cpus[start:end])
+        start = end
+    return groups
+
+
+def _pin_to_cpus(cpus: List[int]):
+    """Épingle le processus courant sur des cœurs"""
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    elif psutil is not None:
+        psutil.Process().cpu_affinity(cpus)
+
+
+def _attach_model(model: ModelSource) -> bytes:
+    """Récupère le modèle hérité du superviseur"""
+    if isinstance(model, bytes):
+        return model
+
+    name, size = model
+    segment = shared_memory.SharedMemory(name=name)
+    try:
+        return bytes(segment.buf[:size])
+    finally:
+        segment.close()
+
+
+def _worker_main(
+    worker_id: int,
+    model: ModelSource,
+    profile_name: str,
+    uint8_input: bool,
+    cpus: Optional[List[int]],
+    conn: Connection
+):
+    """
+    Boucle d'un processus d'inférence
+
+    Crée sa propre session à partir du modèle partagé, puis exécute les lots
+    reçus sur son canal jusqu'au message d'arrêt (None).
+    """
+    # Ctrl+C est géré par le superviseur, qui arrête les processus proprement
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    try:
+        if cpus:
+            _pin_to_cpus(cpus)
+        session = create_session(
+            _attach_model(model),
+            profile_name,
+            uint8_input=uint8_input,
+            intra_op_threads=len(cpus) if cpus else None
+        )
+        del model
+
+        model_input = session.get_inputs()[0]
+        input_name = model_input.name
+        output_names = [output.name for output in session.get_outputs()]
+        fixed_batch = model_input.shape[0] if isinstance(model_input.shape[0], int) and model_input.shape[0] > 0 else None
+        io_runner = IOBindingRunner(
+            session, min(config.BATCH_MAX_SIZE, fixed_batch or config.BATCH_MAX_SIZE)
+        ) if config.ORT_IO_BINDING else None
+
+        if config.WARMUP_ON_STARTUP:
+            warmup_session(session, config.WARMUP_ITERATIONS)
+
+        metadata = {
+            "input_name": input_name,
+            "input_shape": model_input.shape,
+            "input_type": model_input.type,
+            "output_names": output_names,
+            "providers": session.get_providers(),
+            "pid": os.getpid(),
+            "cpus": cpus
+        }
+    except Exception as e:
+        conn.send(("failed", str(e)))
+        return
+
+    conn.send(("ready", metadata))
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            # Superviseur arrêté
+            break
+        if task is None:
+            break
+
+        task_id, inputs = task
+        try:
+            if io_runner is not None and len(inputs) <= io_runner.max_batch_size:
+                # Copie : les sorties IOBinding sont des vues sur les tampons réutilisés
+                output = io_runner.run(inputs)[0].copy()
+            else:
+                batch = inputs[0] if len(inputs) == 1 else np.concatenate(inputs, axis=0)
+                output = session.run(output_names, {input_name: batch})[0]
+            conn.send(("result", task_id, output, None))
+        except Exception as e:
+            conn.send(("result", task_id, None, str(e)))
+
+
+class _Worker:
+    """Processus d'inférence vu du superviseur"""
+
+    def __init__(self, process: mp.Process, conn: Connection):
+        self.process = process
+        self.conn = conn
+        self.send_lock = threading.Lock()
+        self.tasks: Set[int] = set()
+        self.ready = False
+        self.ready_at: Optional[float] = None
+
+
+class InferenceWorkerPool:
+    """
+    Pool de processus d'inférence partageant un modèle déchiffré une seule fois
+
+    Avec "spawn" (défaut) ou "forkserver", le modèle est placé dans un
+    segment de mémoire partagée lu par chaque processus au démarrage. Avec
+    "fork", les processus héritent des octets du modèle en copy-on-write
+    (aucune copie) ; un fork ne copie que le thread appelant, un verrou tenu
+    par un autre thread (ONNX Runtime, exécuteurs) reste verrouillé dans
+    l'enfant : "fork" n'est sûr que dans un processus sans autre thread, et
+    les processus de remplacement sont toujours créés par "spawn".
+    Chaque processus construit sa session ONNX Runtime, épinglée sur ses
+    cœurs. Chaque lot est envoyé au processus le moins chargé, par un canal
+    propre à chaque processus : l'arrêt brutal de l'un n'affecte pas les autres.
+
+    Un processus arrêté est remplacé, immédiatement la première fois puis
+    avec un délai doublé à chaque échec consécutif ; au-delà de max_restarts
+    échecs consécutifs (ex: modèle illisible), son emplacement est abandonné.
+    """
+
+    def __init__(
+        self,
+        model_data: bytes,
+        num_workers: int,
+        profile_name: str = config.ORT_PROFILE,
+        uint8_input: bool = False,
+        start_method: str = config.INFERENCE_WORKER_START_METHOD,
+        pin_cpus: bool = config.INFERENCE_WORKER_AFFINITY,
+        timeout: float = config.INFERENCE_WORKER_TIMEOUT,
+        max_restarts: int = config.INFERENCE_WORKER_MAX_RESTARTS,
+        restart_backoff: float = _RESTART_BACKOFF
+    ):
+        self.num_workers = max(1, num_workers)
+        self.profile_name = profile_name
+        self.uint8_input = uint8_input
+        self.start_method = start_method if start_method in mp.get_all_start_methods() else "spawn"
+        self.timeout = timeout
+        self.cpu_groups: List[Optional[List[int]]] = (
+            split_cpus(self.num_workers) if pin_cpus else [None] * self.num_workers
+        )
+        self.max_restarts = max_restarts
+        self.restart_backoff = restart_backoff
+        self.metadata: Optional[Dict] = None
+        self.restarts = 0
+        # Emplacements abandonnés : numéro -> dernière erreur
+        self.dead: Dict[int, str] = {}
+
+        self._model_data: Optional[bytes] = model_data
+        self._model: Optional[ModelSource] = None
+        self._segment: Optional[shared_memory.SharedMemory] = None
+        self._context = mp.get_context(self.start_method)
+        # Remplacements créés depuis le thread de collecte, d'autres threads tournant
+        self._restart_context = mp.get_context("spawn") if self.start_method == "fork" else self._context
+        self._workers: List[Optional[_Worker]] = [None] * self.num_workers
+        self._pending: Dict[int, Future] = {}
+        self._task_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._collector: Optional[threading.Thread] = None
+        self._failures = [0] * self.num_workers
+        self._last_errors: Dict[int, str] = {}
+        self._respawn_at: Dict[int, float] = {}
+
+    def start(self) -> Dict:
+        """
+        Démarre les processus et attend qu'ils soient prêts
+
+        Avec "fork", à appeler avant que le processus ne démarre d'autres
+        threads (sessions ONNX Runtime comprises).
+
+        Returns:
+            Métadonnées de la session (entrée, sorties, providers)
+
+        Raises:
+            RuntimeError: Si un processus n'a pas pu charger le modèle
+        """
+        if self.start_method == "fork":
+            self._model = self._model_data
+        else:
+            size = len(self._model_data)
+            self._segment = shared_memory.SharedMemory(create=True, size=size)
+            self._segment.buf[:size] = self._model_data
+            self._model = (self._segment.name, size)
+            # Le segment partagé est désormais la seule copie du modèle
+            self._model_data = None
+
+        for worker_id in range(self.num_workers):
+            self._spawn(worker_id)
+
+        # Attente des processus avant de démarrer le thread de collecte
+        failures = []
+        deadline = time.monotonic() + _STARTUP_TIMEOUT
+        for worker_id, worker in enumerate(self._workers):
+            try:
+                if not worker.conn.poll(max(0.0, deadline - time.monotonic())):
+                    failures.append(f"processus {worker_id}: délai de démarrage dépassé")
+                    continue
+                kind, payload = worker.conn.recv()
+            except EOFError:
+                kind, payload = "failed", f"arrêté (code {worker.process.exitcode})"
+            if kind == "ready":
+                self._mark_ready(worker_id, payload)
+            else:
+                failures.append(f"processus {worker_id}: {payload}")
+
+        if failures:
+            self.stop()
+            raise RuntimeError(f"Échec du démarrage des processus d'inférence: {'; '.join(failures)}")
+
+        self._collector = threading.Thread(target=self._collect, name="diana-worker-results", daemon=True)
+        self._collector.start()
+        logger.info(f"{self.num_workers} processus d'inférence démarrés ({self.start_method})")
+        return self.metadata
+
+    def _spawn(self, worker_id: int, context=None):
+        """Démarre (ou redémarre, dans le contexte donné) un processus d'inférence"""
+        context = context or self._context
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(
+            target=_worker_main,
+            args=(
+                worker_id, self._model, self.profile_name, self.uint8_input,
+                self.cpu_groups[worker_id], child_conn
+            ),
+            name=f"diana-inference-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        # Seul le processus enfant garde son extrémité : EOF à sa mort
+        child_conn.close()
+        self._workers[worker_id] = _Worker(process, parent_conn)
+
+    def _mark_ready(self, worker_id: int, metadata: Dict):
+        """Enregistre un processus prêt à recevoir des lots"""
+        self._workers[worker_id].ready = True
+        self._workers[worker_id].ready_at = time.monotonic()
+        self.metadata = self.metadata or metadata
+        logger.info(f"Processus d'inférence {worker_id} prêt (pid {metadata['pid']}, cœurs {metadata['cpus']})")
+
+    def run(self, inputs: List[np.ndarray]) -> np.ndarray:
+        """
+        Exécute une inférence dans le processus le moins chargé
+
+        Args:
+            inputs: Entrées [1, ...] de même forme
+
+        Returns:
+            Première sortie du modèle [batch, num_classes]
+
+        Raises:
+            RuntimeError: Si le pool est arrêté, si aucun processus n'est
+                disponible ou si l'inférence échoue
+            TimeoutError: Si aucun résultat n'arrive dans le délai configuré
+        """
+        if self._collector is None or self._stopping.is_set():
+            raise RuntimeError("Pool de processus d'inférence arrêté")
+
+        task_id = next(self._task_ids)
+        future: Future = Future()
+        with self._lock:
+            candidates = [worker for worker in self._workers if worker is not None and worker.ready]
+            if not candidates:
+                raise RuntimeError(self.error or "Aucun processus d'inférence disponible")
+            worker = min(candidates, key=lambda candidate: len(candidate.tasks))
+            worker.tasks.add(task_id)
+            self._pending[task_id] = future
+
+        try:
+            with worker.send_lock:
+                worker.conn.send((task_id, list(inputs)))
+        except (OSError, ValueError) as e:
+            # Processus arrêté entre-temps : le thread de collecte le redémarre
+            self._finish(worker, task_id)
+            raise RuntimeError(f"Processus d'inférence indisponible: {e}")
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self._finish(worker, task_id)
+            raise TimeoutError(f"Aucune réponse des processus d'inférence en {self.timeout:.0f} s")
+
+    def _finish(self, worker: _Worker, task_id: int) -> Optional[Future]:
+        """Retire un lot terminé (ou abandonné) et renvoie son Future"""
+        with self._lock:
+            worker.tasks.discard(task_id)
+            return self._pending.pop(task_id, None)
+
+    def _collect(self):
+        """Transmet les résultats aux appelants et redémarre les processus arrêtés"""
+        while not self._stopping.is_set():
+            self._respawn_due()
+            timeout = _MONITOR_INTERVAL
+            if self._respawn_at:
+                timeout = max(0.0, min(timeout, min(self._respawn_at.values()) - time.monotonic()))
+
+            connections = {
+                worker.conn: worker_id for worker_id, worker in enumerate(self._workers) if worker is not None
+            }
+            if not connections:
+                self._stopping.wait(timeout)
+                continue
+            for conn in wait(list(connections), timeout=timeout):
+                worker_id = connections[conn]
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    self._restart(worker_id)
+                    continue
+                self._dispatch(worker_id, message)
+
+    def _dispatch(self, worker_id: int, message: tuple):
+        """Traite un message d'un processus d'inférence"""
+        kind = message[0]
+        if kind == "result":
+            _, task_id, output, error = message
+            future = self._finish(self._workers[worker_id], task_id)
+            if future is None:
+                return
+            if error is not None:
+                future.set_exception(RuntimeError(f"Erreur d'inférence: {error}"))
+            else:
+                future.set_result(output)
+        elif kind == "ready":
+            self._mark_ready(worker_id, message[1])
+        elif kind == "failed":
+            self._last_errors[worker_id] = message[1]
+            logger.error(f"Processus d'inférence {worker_id} en échec: {message[1]}")
+
+    def _restart(self, worker_id: int):
+        """
+        Remplace un processus arrêté de façon inattendue
+
+        Les lots qu'il traitait échouent immédiatement (RuntimeError). Le
+        remplaçant est démarré après un délai qui double à chaque échec
+        consécutif ; l'emplacement est abandonné au-delà de max_restarts.
+        """
+        if self._stopping.is_set():
+            return
+
+        worker = self._workers[worker_id]
+        worker.process.join(1.0)
+        reason = self._last_errors.pop(worker_id, None) or f"arrêté (code {worker.process.exitcode})"
+        with self._lock:
+            self._workers[worker_id] = None
+            lost = [self._pending.pop(task_id, None) for task_id in worker.tasks]
+            worker.tasks.clear()
+        for future in lost:
+            if future is not None:
+                future.set_exception(RuntimeError(f"Processus d'inférence {worker_id} arrêté pendant l'inférence"))
+        worker.conn.close()
+
+        # Arrêt isolé d'un processus resté longtemps prêt : les échecs repartent de zéro
+        if worker.ready_at is not None and time.monotonic() - worker.ready_at >= _STABLE_AFTER:
+            self._failures[worker_id] = 0
+        self._failures[worker_id] += 1
+        failures = self._failures[worker_id]
+
+        if failures > self.max_restarts:
+            self.dead[worker_id] = reason
+            logger.error(
+                f"Processus d'inférence {worker_id} abandonné après {self.max_restarts} redémarrages: {reason}"
+            )
+            return
+
+        delay = 0.0 if failures == 1 else min(_MAX_RESTART_BACKOFF, self.restart_backoff * 2 ** (failures - 2))
+        logger.warning(f"Processus d'inférence {worker_id} {reason}, redémarrage dans {delay:.1f} s")
+        self._respawn_at[worker_id] = time.monotonic() + delay
+        self._respawn_due()
+
+    def _respawn_due(self):
+        """Démarre les remplaçants dont le délai est écoulé"""
+        now = time.monotonic()
+        for worker_id, due in list(self._respawn_at.items()):
+            if due <= now and not self._stopping.is_set():
+                del self._respawn_at[worker_id]
+                self._spawn(worker_id, self._restart_context)
+                self.restarts += 1
+
+    @property
+    def error(self) -> Optional[str]:
+        """Erreur du pool lorsque tous les emplacements sont abandonnés, sinon None"""
+        if len(self.dead) < self.num_workers:
+            return None
+        details = "; ".join(f"processus {worker_id}: {reason}" for worker_id, reason in sorted(self.dead.items()))
+        return f"Processus d'inférence hors service: {details}"
+
+    def stop(self, timeout: float = 5.0):
+        """Arrête les processus et libère le modèle partagé"""
+        self._stopping.set()
+        if self._collector is not None:
+            self._collector.join(timeout)
+            self._collector = None
+
+        for worker in self._workers:
+            if worker is None:
+                continue
+            try:
+                with worker.send_lock:
+                    worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for worker in self._workers:
+            if worker is None:
+                continue
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join(timeout)
+            worker.conn.close()
+        self._workers = [None] * self.num_workers
+        self._respawn_at.clear()
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(RuntimeError("Pool de processus d'inférence arrêté"))
+
+        if self._segment is not None:
+            self._segment.close()
+            self._segment.unlink()
+            self._segment = None
+        self._model = self._model_data = None
+        logger.info("Processus d'inférence arrêtés")
+
+    def get_stats(self) -> Dict:
+        """
+        Retourne l'état du pool
+
+        Returns:
+            Dictionnaire (processus actifs, méthode de démarrage, cœurs...)
+        """
+        return {
+            "workers": self.num_workers,
+            "alive": sum(1 for worker in self._workers if worker is not None and worker.process.is_alive()),
+            "start_method": self.start_method,
+            "cpu_groups": self.cpu_groups,
+            "pending": len(self._pending),
+            "restarts": self.restarts,
+            "dead": sorted(self.dead),
+            "providers": self.metadata["providers"] if self.metadata else []
+        }
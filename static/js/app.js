@@ -177,7 +177,7 @@ class DianaApp {
             const files = e.dataTransfer.files;
             if (files.length > 0) {
                 const file = files[0];
-                if (file.type.startsWith('image/')) {
+                if (file.type.startsWith('image/') || isDicomFile(file)) {
                     const dataTransfer = new DataTransfer();
                     dataTransfer.items.add(file);
                     fileInput.files = dataTransfer.files;
@@ -194,6 +194,14 @@ class DianaApp {
             const file = e.target.files[0];
             if (file) {
                 console.log('📄 Fichier sélectionné:', file.name);
+                if (isDicomFile(file)) {
+                    // Le navigateur ne sait pas afficher un DICOM : nom du fichier seulement
+                    preview.style.display = 'none';
+                    uploadText.style.display = 'block';
+                    uploadText.textContent = `🩻 ${file.name}`;
+                    analyzeBtn.disabled = false;
+                    return;
+                }
                 const reader = new FileReader();
                 reader.onload = (e) => {
                     preview.src = e.target.result;
@@ -225,7 +233,7 @@ class DianaApp {
             }
 
             const validTypes = ['image/jpeg', 'image/png', 'image/bmp', 'image/tiff', 'image/webp'];
-            if (!validTypes.includes(file.type)) {
+            if (!validTypes.includes(file.type) && !isDicomFile(file)) {
                 showNotification(`❌ Type de fichier non supporté: ${file.type}`, 'error');
                 return;
             }
@@ -405,6 +413,12 @@ class DianaApp {
     }
 }
 
+// ========== FICHIERS DICOM ==========
+
+function isDicomFile(file) {
+    return file.type === 'application/dicom' || /\.(dcm|dicom)$/i.test(file.name);
+}
+
 // ========== NAVIGATION MENU ==========
 
 function initMenu() {
@@ -15,7 +15,7 @@ const Pages = {
                     <div class="panel-title">📸 Sélectionner une image</div>
                     
                     <form id="uploadForm" enctype="multipart/form-data">
-                        <input type="file" id="fileInput" accept="image/*" style="display: none;">
+                        <input type="file" id="fileInput" accept="image/*,.dcm,.dicom,application/dicom" style="display: none;">
                         
                         <div class="upload-zone" id="uploadZone">
                             <div id="uploadText">
@@ -0,0 +1,234 @@
+"""
+Tests pour l'analyse par lots hors ligne
+"""
+
+import pytest
+import json
+from pathlib import Path
+import sys
+
+import numpy as np
+import onnxruntime as ort
+from PIL import Image
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config
+from scripts import batch_analyze
+from src import inference_engine as inference_module
+from src.batch_analysis import (
+    ResultWriter, analyze, collect_images, load_processed, output_format, result_row
+)
+from src.image_filter import ImageFilter
+from src.inference_engine import InferenceEngine
+from src.quota_manager import QUOTA_EXCEEDED_MESSAGE, QuotaManager
+from src.result_cache import ResultCache
+
+# Le modèle de filtrage (3 classes, batch dynamique) sert de modèle de test
+TEST_MODEL_PATH = Path(__file__).parent.parent / config.FILTER_MODEL_PATH
+
+
+class FakeEngine:
+    """Moteur factice : prédiction "Malin" pour toutes les images décodées"""
+
+    def __init__(self):
+        self.batches = []
+
+    def get_input_size(self):
+        return (32, 32)
+
+    def predict_batch(self, images, batch_size=8):
+        self.batches.append(len(images))
+        return [
+            {"prediction": "Malin", "confidence": 0.9, "risk_level": "Élevé",
+             "probabilities": {"Bénin": 0.1, "Malin": 0.9}}
+            for _ in images
+        ]
+
+
+def make_images(folder: Path, count: int):
+    """Crée des images PNG de test"""
+    folder.mkdir(parents=True, exist_ok=True)
+    for index in range(count):
+        Image.new("RGB", (40, 40), (index, 0, 0)).save(folder / f"image_{index}.png")
+
+
+class TestCollectImages:
+    """Tests pour la liste des images à analyser"""
+
+    def test_directory_is_walked_recursively(self, tmp_path):
+        """Les images des sous-dossiers sont trouvées, les autres fichiers ignorés"""
+        make_images(tmp_path / "a", 2)
+        make_images(tmp_path / "b" / "c", 1)
+        (tmp_path / "notes.txt").write_text("pas une image")
+
+        paths = collect_images(tmp_path)
+        assert len(paths) == 3
+        assert all(path.is_absolute() for path in paths)
+
+    def test_manifests(self, tmp_path):
+        """Manifeste texte et CSV, chemins relatifs au manifeste"""
+        (tmp_path / "list.txt").write_text("# commentaire\nx.png\n\ny.png\n")
+        (tmp_path / "list.csv").write_text("path,label\nx.png,Malin\n")
+
+        assert collect_images(tmp_path / "list.txt") == [tmp_path / "x.png", tmp_path / "y.png"]
+        assert collect_images(tmp_path / "list.csv") == [tmp_path / "x.png"]
+
+
+class TestResume:
+    """Tests pour l'écriture incrémentale et la reprise"""
+
+    @pytest.mark.parametrize("name", ["results.csv", "results.jsonl"])
+    def test_written_results_are_skipped(self, tmp_path, name):
+        """Les images déjà écrites sont reconnues comme traitées"""
+        output = tmp_path / name
+        fmt = output_format(output)
+        with ResultWriter(output, fmt) as writer:
+            writer.write(result_row(Path("/img/ok.png"), {"prediction": "Bénin", "confidence": 0.8}))
+            writer.write(result_row(Path("/img/bad.png"), None, "illisible"))
+
+        assert load_processed(output, fmt) == {"/img/ok.png", "/img/bad.png"}
+        assert load_processed(output, fmt, retry_errors=True) == {"/img/ok.png"}
+
+    def test_truncated_last_line_is_ignored(self, tmp_path):
+        """Une ligne JSONL tronquée par une interruption n'empêche pas la reprise"""
+        output = tmp_path / "results.jsonl"
+        output.write_text(json.dumps({"path": "/img/a.png", "status": "ok"}) + '\n{"path": "/img/b')
+
+        assert load_processed(output, "jsonl") == {"/img/a.png"}
+
+    @pytest.mark.parametrize("name", ["results.csv", "results.jsonl"])
+    def test_interrupted_twice(self, tmp_path, name):
+        """Interruption, reprise puis nouvelle reprise : aucune ligne perdue ni dupliquée"""
+        output = tmp_path / name
+        fmt = output_format(output)
+        result = {"prediction": "Malin", "confidence": 0.9, "probabilities": {"Bénin": 0.1, "Malin": 0.9}}
+
+        def run(names, interrupt_after=None):
+            """Écrit les résultats puis, si demandé, coupe la dernière ligne en son milieu"""
+            with ResultWriter(output, fmt) as writer:
+                for name in names:
+                    writer.write(result_row(Path(f"/img/{name}.png"), result))
+            if interrupt_after is not None:
+                data = output.read_bytes()
+                output.write_bytes(data[:len(data) - 20])
+
+        run(["a", "b", "c"], interrupt_after=True)
+        assert load_processed(output, fmt) == {"/img/a.png", "/img/b.png"}
+
+        run(["c", "d", "e"], interrupt_after=True)
+        assert load_processed(output, fmt) == {f"/img/{name}.png" for name in "abcd"}
+
+        run(["e", "f"])
+        assert load_processed(output, fmt) == {f"/img/{name}.png" for name in "abcdef"}
+
+        lines = output.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 6 + (fmt == "csv")
+
+    def test_unreadable_line_does_not_hide_later_rows(self, tmp_path):
+        """Une ligne illisible au milieu du fichier n'empêche pas de lire les suivantes"""
+        output = tmp_path / "results.jsonl"
+        rows = [json.dumps({"path": f"/img/{name}.png", "status": "ok"}) for name in "abdef"]
+        output.write_text("\n".join(rows[:2] + ['{"path": "/img/c' + rows[2]] + rows[3:]) + "\n")
+
+        assert load_processed(output, "jsonl") == {f"/img/{name}.png" for name in "abef"}
+
+    def test_csv_header_written_once(self, tmp_path):
+        """Une reprise ajoute des lignes sans répéter l'en-tête"""
+        output = tmp_path / "results.csv"
+        for name in ("a.png", "b.png"):
+            with ResultWriter(output, "csv") as writer:
+                writer.write(result_row(Path(name), None, "erreur"))
+
+        lines = output.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 3
+        assert lines[0].startswith("path,status")
+
+
+class TestAnalyze:
+    """Tests pour la boucle d'analyse par lots"""
+
+    def test_images_are_batched_and_written(self, tmp_path):
+        """Les images sont regroupées par lots et chaque résultat est écrit"""
+        make_images(tmp_path / "images", 5)
+        (tmp_path / "images" / "broken.png").write_bytes(b"pas une image")
+        paths = collect_images(tmp_path / "images")
+        engine = FakeEngine()
+        progress = []
+
+        output = tmp_path / "results.jsonl"
+        with ResultWriter(output, "jsonl") as writer:
+            counts = analyze(paths, engine, writer, batch_size=2, workers=2, on_batch=progress.append)
+
+        assert counts == {"ok": 5, "rejected": 0, "error": 1, "quota_exceeded": 0}
+        assert sum(engine.batches) == 5
+        assert max(engine.batches) == 2
+        assert sum(progress) == 6
+
+        rows = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+        assert sorted(row["path"] for row in rows) == sorted(str(path) for path in paths)
+        assert {row["status"] for row in rows} == {"ok", "error"}
+
+
+class TestQuota:
+    """Tests pour l'arrêt de l'analyse par lots au quota gratuit"""
+
+    @pytest.fixture
+    def engine(self, tmp_path, monkeypatch):
+        """Moteur chargé avec le modèle de test et un quota gratuit de 3 analyses"""
+        quota_manager = QuotaManager(tmp_path / "quota.json")
+        quota_manager.free_limit = 3
+
+        monkeypatch.setattr(config, "RESULT_CACHE_COUNT_QUOTA", True)
+        monkeypatch.setattr(inference_module, "get_quota_manager", lambda: quota_manager)
+        monkeypatch.setattr(batch_analyze, "get_quota_manager", lambda: quota_manager)
+        monkeypatch.setattr(inference_module, "get_image_filter", lambda: ImageFilter())
+        monkeypatch.setattr(InferenceEngine, "_ensure_model_file", lambda self: None)
+
+        session = ort.InferenceSession(str(TEST_MODEL_PATH), providers=['CPUExecutionProvider'])
+        engine = InferenceEngine()
+        engine.session = session
+        engine.input_name = session.get_inputs()[0].name
+        engine.output_names = [output.name for output in session.get_outputs()]
+        engine.input_shape = session.get_inputs()[0].shape
+        engine.model_version = "test"
+        engine.result_cache = ResultCache(max_entries=16, ttl_seconds=60)
+        engine.is_loaded = True
+        engine.load_model = lambda: True
+        monkeypatch.setattr(batch_analyze, "get_inference_engine", lambda: engine)
+        return engine
+
+    def run_cli(self, monkeypatch, *args) -> int:
+        """Exécute scripts/batch_analyze.py avec les arguments donnés"""
+        monkeypatch.setattr(sys, "argv", ["batch_analyze.py", *map(str, args)])
+        return batch_analyze.main()
+
+    def test_cli_stops_at_quota(self, engine, tmp_path, monkeypatch, capsys):
+        """Au-delà du quota : pas de score, pas de mise en cache, reprise des images refusées"""
+        folder = tmp_path / "images"
+        folder.mkdir()
+        rng = np.random.default_rng(0)
+        for index in range(7):
+            Image.fromarray(rng.integers(0, 256, size=(64, 64, 3), dtype=np.uint8)).save(folder / f"image_{index}.png")
+        output = tmp_path / "results.jsonl"
+
+        assert self.run_cli(monkeypatch, folder, "--output", output, "--batch-size", 2, "--workers", 1) == 1
+        assert QUOTA_EXCEEDED_MESSAGE in capsys.readouterr().out
+
+        rows = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+        scored = [row for row in rows if row["status"] == "ok"]
+        refused = [row for row in rows if row["error"] == QUOTA_EXCEEDED_MESSAGE]
+        assert len(scored) == 3
+        assert len(refused) == 1 and refused[0]["status"] == "error" and refused[0]["prediction"] is None
+        assert len(rows) == 4  # analyse arrêtée au lot refusé
+        assert engine.result_cache.get_stats()["size"] == 3
+
+        # Reprise : les images refusées restent à analyser, toujours refusées sans quota
+        assert len(load_processed(output, "jsonl")) == 3
+        assert self.run_cli(monkeypatch, folder, "--output", output) == 1
+        assert len(output.read_text(encoding="utf-8").splitlines()) == 4
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
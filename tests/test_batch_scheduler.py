@@ -0,0 +1,120 @@
+"""
+Tests pour le micro-batcher
+"""
+
+import pytest
+import asyncio
+import threading
+from pathlib import Path
+import sys
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.batch_scheduler import MicroBatcher
+
+
+class FakeEngine:
+    """Moteur factice qui enregistre la taille des lots reçus"""
+
+    def __init__(self, delay: float = 0.0):
+        self.batches = []
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def predict_batch(self, images, batch_size=8):
+        with self.lock:
+            self.batches.append(list(images))
+        if self.delay:
+            threading.Event().wait(self.delay)
+        return [{"prediction": f"image-{image}"} for image in images]
+
+    def mark_shared_result(self, result):
+        result["coalesced"] = True
+        return result
+
+
+class FakeImage:
+    """Image préparée factice exposant une empreinte de contenu"""
+
+    def __init__(self, content_hash):
+        self.content_hash = content_hash
+
+    def __repr__(self):
+        return self.content_hash
+
+
+class TestMicroBatcher:
+    """Tests pour MicroBatcher"""
+
+    def test_concurrent_requests_are_batched(self):
+        """Les requêtes concurrentes sont regroupées en un seul lot"""
+        engine = FakeEngine()
+
+        async def scenario():
+            batcher = MicroBatcher(engine, max_batch_size=8, max_wait_ms=50)
+            results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+            await batcher.stop()
+            return results
+
+        results = asyncio.run(scenario())
+
+        assert engine.batches == [[0, 1, 2, 3, 4]]
+        for i, result in enumerate(results):
+            assert result["prediction"] == f"image-{i}"
+            assert result["batching"]["batch_size"] == 5
+            assert result["batching"]["queue_time_ms"] >= 0
+
+    def test_batch_size_limit(self):
+        """Un lot ne dépasse jamais max_batch_size"""
+        engine = FakeEngine()
+
+        async def scenario():
+            batcher = MicroBatcher(engine, max_batch_size=3, max_wait_ms=50)
+            await asyncio.gather(*(batcher.submit(i) for i in range(7)))
+            await batcher.stop()
+
+        asyncio.run(scenario())
+
+        assert [len(batch) for batch in engine.batches] == [3, 3, 1]
+        assert sum(engine.batches, []) == list(range(7))
+
+    def test_requests_arriving_during_inference_form_next_batch(self):
+        """Les requêtes arrivées pendant une inférence sont regroupées ensuite"""
+        engine = FakeEngine(delay=0.1)
+
+        async def scenario():
+            batcher = MicroBatcher(engine, max_batch_size=8, max_wait_ms=0)
+            first = asyncio.create_task(batcher.submit("a"))
+            await asyncio.sleep(0.02)
+            others = [asyncio.create_task(batcher.submit(name)) for name in "bcd"]
+            await asyncio.gather(first, *others)
+            await batcher.stop()
+
+        asyncio.run(scenario())
+
+        assert engine.batches == [["a"], ["b", "c", "d"]]
+
+    def test_identical_images_are_coalesced(self):
+        """Les soumissions concurrentes d'une même image ne sont inférées qu'une fois"""
+        engine = FakeEngine()
+
+        async def scenario():
+            batcher = MicroBatcher(engine, max_batch_size=8, max_wait_ms=50)
+            images = [FakeImage("x"), FakeImage("x"), FakeImage("y"), FakeImage("x")]
+            results = await asyncio.gather(*(batcher.submit(image) for image in images))
+            await batcher.stop()
+            return results
+
+        results = asyncio.run(scenario())
+
+        assert [[repr(image) for image in batch] for batch in engine.batches] == [["x", "y"]]
+        assert [result["prediction"] for result in results] == [
+            "image-x", "image-x", "image-y", "image-x"
+        ]
+        assert [result.get("coalesced", False) for result in results] == [False, True, False, True]
+        assert results[0] is not results[1]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,33 @@
+"""
+Tests pour le benchmark du déchiffrement du modèle
+"""
+
+import pytest
+import json
+from pathlib import Path
+import sys
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.bench_decryption import run_benchmark
+
+
+class TestDecryptionBenchmark:
+    """Tests pour bench_decryption"""
+
+    def test_report_structure(self):
+        """Fernet et chaque nombre de threads sont mesurés et comparés"""
+        report = run_benchmark(size_mb=1, threads=[1, 2], iterations=2, warmup=0, chunk_size=64 * 1024)
+
+        assert set(report["results"]) == {"fernet", "chunked_1", "chunked_2"}
+        for result in report["results"].values():
+            assert 0 < result["latency_ms"]["p50"] <= result["latency_ms"]["p99"]
+            assert result["throughput_mb_per_second"] > 0
+            assert result["peak_memory_mb"] > 0
+        assert report["results"]["fernet"]["speedup_vs_fernet"] == 1.0
+        json.dumps(report)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
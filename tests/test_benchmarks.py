@@ -0,0 +1,51 @@
+"""
+Tests pour le benchmark du pipeline de prédiction
+"""
+
+import pytest
+import copy
+import json
+from pathlib import Path
+import sys
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("onnx")
+
+from benchmarks.bench_pipeline import STAGES, compare_results, run_benchmark
+
+
+@pytest.fixture(scope="module")
+def report():
+    return run_benchmark(batch_sizes=[1, 2], iterations=3, warmup=1, image_size=(320, 240))
+
+
+class TestPipelineBenchmark:
+    """Tests pour bench_pipeline"""
+
+    def test_report_structure(self, report):
+        """Chaque taille de lot a ses étapes, ses percentiles et son débit"""
+        assert set(report["results"]) == {"1", "2"}
+        for result in report["results"].values():
+            assert list(result["stages"]) == STAGES
+            for stats in list(result["stages"].values()) + [result["total"]]:
+                assert set(stats) == {"mean", "p50", "p95", "p99"}
+                assert 0 <= stats["p50"] <= stats["p99"]
+            assert result["throughput_images_per_second"] > 0
+        json.dumps(report)
+
+    def test_regression_detection(self, report):
+        """Une étape nettement plus lente que la référence est signalée"""
+        assert compare_results(report, report, tolerance=0.15) == []
+
+        slower = copy.deepcopy(report)
+        stats = slower["results"]["1"]["stages"]["decode"]
+        stats["p50"] = stats["p50"] * 2 + 1
+        regressions = compare_results(slower, report, tolerance=0.15)
+        assert len(regressions) == 1
+        assert "decode" in regressions[0]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,135 @@
+"""
+Tests pour la lecture des images DICOM
+"""
+
+import pytest
+import io
+from pathlib import Path
+import sys
+
+import numpy as np
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pydicom = pytest.importorskip("pydicom")
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.sequence import Sequence
+from pydicom.uid import ExplicitVRLittleEndian, RLELossless, generate_uid
+
+from src.dicom import is_dicom, load_dicom
+from src.preprocessing import PreparedImage
+
+
+def make_dicom(pixels: np.ndarray, photometric: str = "MONOCHROME2", **attributes) -> bytes:
+    """Encode un tableau uint16 en fichier DICOM (Part 10) en mémoire"""
+    file_meta = FileMetaDataset()
+    file_meta.MediaStorageSOPClassUID = "1.2.840.10008.5.1.4.1.1.1.2"  # Mammographie numérique
+    file_meta.MediaStorageSOPInstanceUID = generate_uid()
+    file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+    dataset = Dataset()
+    dataset.file_meta = file_meta
+    dataset.PatientName = "Anonyme"
+    dataset.Rows, dataset.Columns = pixels.shape
+    dataset.SamplesPerPixel = 1
+    dataset.PhotometricInterpretation = photometric
+    dataset.BitsAllocated = 16
+    dataset.BitsStored = 12
+    dataset.HighBit = 11
+    dataset.PixelRepresentation = 0
+    dataset.PixelData = pixels.astype(np.uint16).tobytes()
+    for keyword, value in attributes.items():
+        setattr(dataset, keyword, value)
+
+    buffer = io.BytesIO()
+    dataset.save_as(buffer, enforce_file_format=True)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def ramp():
+    """Rampe horizontale 12 bits (0 à 4095)"""
+    return np.tile(np.linspace(0, 4095, 256).astype(np.uint16), (128, 1))
+
+
+class TestDicom:
+    """Tests pour is_dicom et load_dicom"""
+
+    def test_is_dicom(self, ramp, tmp_path):
+        """Détection par le préambule DICM ou l'extension"""
+        data = make_dicom(ramp)
+        path = tmp_path / "image"
+        path.write_bytes(data)
+
+        assert is_dicom(data)
+        assert is_dicom(path)
+        assert is_dicom(tmp_path / "absent.dcm")
+        assert not is_dicom(b"\x89PNG" + bytes(200))
+        assert not is_dicom(tmp_path / "image.png")
+
+    def test_window_linear(self, ramp):
+        """Fenêtre LINEAR : valeurs hors fenêtre saturées, rampe linéaire au centre"""
+        image = np.asarray(load_dicom(make_dicom(ramp, WindowCenter=2048, WindowWidth=1024)))
+
+        assert image.dtype == np.uint8 and image.shape == ramp.shape
+        row = image[0]
+        assert (row[ramp[0] <= 1536] == 0).all()
+        assert (row[ramp[0] >= 2560] == 255).all()
+        middle = ramp[0] == ramp[0][128]
+        assert abs(int(row[middle][0]) - 128) <= 2
+
+    def test_no_window_stretches_range(self, ramp):
+        """Sans fenêtre, la dynamique de l'image est étirée sur 0-255"""
+        image = np.asarray(load_dicom(make_dicom(ramp)))
+
+        assert image.min() == 0 and image.max() == 255
+
+    def test_monochrome1_is_inverted(self, ramp):
+        """MONOCHROME1 : valeurs élevées affichées en noir"""
+        normal = np.asarray(load_dicom(make_dicom(ramp)))
+        inverted = np.asarray(load_dicom(make_dicom(ramp, photometric="MONOCHROME1")))
+
+        assert np.array_equal(inverted, 255 - normal)
+
+    def test_voi_lut_sequence(self, ramp):
+        """Une VOI LUT Sequence a priorité sur la fenêtre"""
+        item = Dataset()
+        item.LUTDescriptor = [4096, 0, 8]
+        item.LUTData = np.array([255 - value // 16 for value in range(4096)], dtype="<u2").tobytes()
+
+        image = np.asarray(load_dicom(make_dicom(
+            ramp, WindowCenter=2048, WindowWidth=10, VOILUTSequence=Sequence([item])
+        )))
+
+        assert image[0, 0] == 255 and image[0, -1] == 0
+
+    def test_compressed_transfer_syntax(self, ramp):
+        """Les syntaxes de transfert compressées sont décodées"""
+        if not hasattr(pydicom, "pixels"):
+            pytest.skip("Encodeur RLE disponible à partir de pydicom 3")
+        dataset = pydicom.dcmread(io.BytesIO(make_dicom(ramp)))
+        dataset.compress(RLELossless)
+        buffer = io.BytesIO()
+        dataset.save_as(buffer)
+
+        compressed = np.asarray(load_dicom(buffer.getvalue()))
+
+        assert np.array_equal(compressed, np.asarray(load_dicom(make_dicom(ramp))))
+
+    def test_shared_preprocessing(self, ramp, tmp_path):
+        """Un fichier DICOM alimente directement le prétraitement partagé"""
+        path = tmp_path / "mammographie.dcm"
+        path.write_bytes(make_dicom(ramp, WindowCenter=2048, WindowWidth=4096))
+
+        prepared = PreparedImage(path)
+        tensor = prepared.tensor((224, 224))
+
+        assert prepared.size == (256, 128)
+        assert tensor.shape == (1, 3, 224, 224)
+        assert np.array_equal(tensor[0, 0], tensor[0, 1])
+        assert tensor[0, 0, 0, 0] < 0.05 and tensor[0, 0, 0, -1] > 0.95
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -10,7 +10,10 @@ import sys
 # Ajouter le répertoire parent au path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+import config
+import src.encryption_manager as encryption_module
 from src.encryption_manager import EncryptionManager
+from src.model_container import MAGIC
 
 
 class TestEncryptionManager:
@@ -150,6 +153,124 @@ class TestEncryptionManager:
         # Le déchiffrement devrait échouer
         assert success is False
 
+    def test_writes_chunked_format(self, temp_files):
+        """Les nouveaux fichiers sont des conteneurs par blocs"""
+        manager = EncryptionManager()
+        manager.chunk_size = 8
+        manager.encrypt_file(temp_files['source'], temp_files['encrypted'])
+        
+        assert temp_files['encrypted'].read_bytes().startswith(MAGIC)
+        assert manager.is_legacy_format(temp_files['encrypted']) is False
+        assert manager.decrypt_to_memory(temp_files['encrypted']) == temp_files['source'].read_bytes()
+    
+    def test_reads_legacy_fernet_format(self, temp_files):
+        """Les fichiers chiffrés par l'ancienne version (jeton Fernet) restent lisibles"""
+        manager = EncryptionManager()
+        original = temp_files['source'].read_bytes()
+        temp_files['encrypted'].write_bytes(manager.fernet.encrypt(original))
+        
+        assert manager.is_legacy_format(temp_files['encrypted']) is True
+        assert manager.decrypt_to_memory(temp_files['encrypted']) == original
+        assert manager.verify_encrypted_file(temp_files['encrypted']) is True
+    
+    def test_tampered_file_rejected(self, temp_files):
+        """Un octet modifié dans un bloc rend le fichier indéchiffrable"""
+        manager = EncryptionManager()
+        manager.chunk_size = 8
+        manager.encrypt_file(temp_files['source'], temp_files['encrypted'])
+        
+        data = bytearray(temp_files['encrypted'].read_bytes())
+        data[-20] ^= 0x01
+        temp_files['encrypted'].write_bytes(bytes(data))
+        
+        assert manager.decrypt_to_memory(temp_files['encrypted']) is None
+        assert manager.verify_encrypted_file(temp_files['encrypted']) is False
+    
+    def test_quick_integrity_check(self, temp_files):
+        """Contrôle rapide : bilan avec blocs vérifiés et confiance"""
+        manager = EncryptionManager()
+        manager.chunk_size = 4
+        manager.encrypt_file(temp_files['source'], temp_files['encrypted'])
+        
+        report = manager.check_integrity(temp_files['encrypted'], sample=2)
+        assert report['valid'] is True
+        assert report['format'] == "chunked"
+        assert report['manifest_checked'] is True
+        assert (report['chunks_checked'], report['chunk_count']) == (2, 7)
+        assert 0 < report['confidence'] < 1
+        
+        full = manager.check_integrity(temp_files['encrypted'])
+        assert full['complete'] is True and full['confidence'] == 1.0
+        
+        structural = manager.check_integrity(temp_files['encrypted'], sample=0)
+        assert structural['valid'] is True
+        assert structural['chunks_checked'] == 0 and structural['confidence'] == 0.0
+        
+        wrong_key = EncryptionManager(EncryptionManager.generate_key())
+        report = wrong_key.check_integrity(temp_files['encrypted'], sample=2)
+        assert report['valid'] is False
+        assert "MAC" in report['error']
+
+
+
+class _MemoryKeyring:
+    """Trousseau en mémoire (interface get_password/set_password du paquet keyring)"""
+    
+    def __init__(self):
+        self.entries = {}
+    
+    def get_password(self, service, username):
+        return self.entries.get((service, username))
+    
+    def set_password(self, service, username, password):
+        self.entries[(service, username)] = password
+
+
+class TestKeyDerivation:
+    """Tests pour la dérivation mémorisée de la clé"""
+    
+    @pytest.fixture
+    def derivations(self, monkeypatch):
+        """Compte les dérivations PBKDF2, mémoire du processus vidée"""
+        calls = []
+        real_kdf = encryption_module.PBKDF2HMAC
+        
+        def counting_kdf(*args, **kwargs):
+            calls.append(kwargs.get("salt"))
+            return real_kdf(*args, **kwargs)
+        
+        monkeypatch.setattr(encryption_module, "PBKDF2HMAC", counting_kdf)
+        monkeypatch.setattr(encryption_module, "_derived_keys", {})
+        return calls
+    
+    def test_derivation_memoized(self, derivations):
+        """Un même mot de passe n'est dérivé qu'une fois par processus"""
+        first = EncryptionManager(key=b"mot de passe")
+        second = EncryptionManager(key=b"mot de passe")
+        other = EncryptionManager(key=b"autre mot de passe")
+        
+        assert len(derivations) == 2
+        assert first.encryption_key == second.encryption_key != other.encryption_key
+    
+    def test_keyring_cache(self, derivations, monkeypatch):
+        """La clé conservée dans le trousseau évite la dérivation d'un nouveau processus"""
+        memory_keyring = _MemoryKeyring()
+        monkeypatch.setattr(encryption_module, "keyring", memory_keyring)
+        monkeypatch.setattr(config, "KDF_KEYRING_CACHE", True)
+        
+        key = EncryptionManager(key=b"mot de passe").encryption_key
+        assert len(derivations) == 1 and len(memory_keyring.entries) == 1
+        
+        # Nouveau processus : mémoire vide, clé relue depuis le trousseau
+        monkeypatch.setattr(encryption_module, "_derived_keys", {})
+        assert EncryptionManager(key=b"mot de passe").encryption_key == key
+        assert len(derivations) == 1
+        
+        # Mot de passe changé : l'entrée ne correspond plus, la clé est redérivée
+        monkeypatch.setattr(encryption_module, "_derived_keys", {})
+        assert EncryptionManager(key=b"nouveau mot de passe").encryption_key != key
+        assert len(derivations) == 2
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,232 @@
+"""
+Tests pour le moteur d'inférence
+"""
+
+import pytest
+import io
+import tempfile
+from pathlib import Path
+import sys
+
+import numpy as np
+import onnxruntime as ort
+from PIL import Image
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config
+from src import inference_engine as inference_module
+from src.image_filter import ImageFilter
+from src.inference_engine import InferenceEngine
+from src.ort_session import IOBindingRunner, create_session
+from src.quota_manager import QuotaManager
+from src.result_cache import ResultCache
+from src.worker_pool import InferenceWorkerPool
+
+# Le modèle de filtrage (3 classes, batch dynamique) sert de modèle de test
+TEST_MODEL_PATH = Path(__file__).parent.parent / config.FILTER_MODEL_PATH
+
+
+class RecordingSession:
+    """Enveloppe une session ONNX et enregistre la taille des lots"""
+
+    def __init__(self, session):
+        self.session = session
+        self.batch_sizes = []
+
+    def run(self, output_names, feeds):
+        for tensor in feeds.values():
+            self.batch_sizes.append(tensor.shape[0])
+        return self.session.run(output_names, feeds)
+
+    def get_inputs(self):
+        return self.session.get_inputs()
+
+    def get_providers(self):
+        return self.session.get_providers()
+
+
+class TestInferenceEngine:
+    """Tests pour InferenceEngine"""
+
+    @pytest.fixture
+    def engine(self, monkeypatch):
+        """Crée un moteur chargé avec le modèle de test, sans filtre ni modèle chiffré"""
+        temp_file = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json')
+        temp_file.close()
+        quota_manager = QuotaManager(Path(temp_file.name))
+        quota_manager.set_premium(True)
+
+        monkeypatch.setattr(inference_module, "get_quota_manager", lambda: quota_manager)
+        monkeypatch.setattr(inference_module, "get_image_filter", lambda: ImageFilter())
+        monkeypatch.setattr(InferenceEngine, "_ensure_model_file", lambda self: None)
+
+        session = ort.InferenceSession(str(TEST_MODEL_PATH), providers=['CPUExecutionProvider'])
+        engine = InferenceEngine()
+        engine.session = RecordingSession(session)
+        engine.input_name = session.get_inputs()[0].name
+        engine.output_names = [output.name for output in session.get_outputs()]
+        engine.input_shape = session.get_inputs()[0].shape
+        engine.model_version = "test"
+        engine.result_cache = None
+        engine.is_loaded = True
+
+        yield engine
+
+        Path(temp_file.name).unlink(missing_ok=True)
+
+    @pytest.fixture
+    def images(self):
+        """Génère des images synthétiques de tailles variées"""
+        rng = np.random.default_rng(0)
+        return [
+            rng.integers(0, 256, size=(96 + 16 * i, 128, 3), dtype=np.uint8)
+            for i in range(5)
+        ]
+
+    def test_predict_batch_matches_predict(self, engine, images):
+        """Les résultats par lot sont identiques aux prédictions unitaires"""
+        single_results = [engine.predict(image) for image in images]
+        batch_results = engine.predict_batch(images, batch_size=4)
+
+        assert len(batch_results) == len(images)
+        for single, batched in zip(single_results, batch_results):
+            assert batched["prediction"] == single["prediction"]
+            assert batched["class_id"] == single["class_id"]
+            assert batched["confidence"] == pytest.approx(single["confidence"], abs=1e-3)
+
+    def test_predict_batch_groups_inferences(self, engine, images):
+        """Un seul session.run par lot"""
+        engine.predict_batch(images, batch_size=4)
+
+        assert engine.session.batch_sizes == [4, 1]
+
+    def test_predict_batch_fixed_batch_dimension(self, engine, images):
+        """Un modèle à dimension batch fixe de 1 est traité image par image"""
+        engine.input_shape = [1, 3, 224, 224]
+
+        results = engine.predict_batch(images, batch_size=8)
+
+        assert all(result is not None for result in results)
+        assert engine.session.batch_sizes == [1] * len(images)
+
+    def test_predict_accepts_in_memory_sources(self, engine, images):
+        """Octets encodés, image PIL et tableau numpy donnent le même résultat"""
+        image = Image.fromarray(images[0])
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+
+        from_array = engine.predict(images[0])
+        from_pil = engine.predict(image)
+        from_bytes = engine.predict(buffer.getvalue())
+
+        assert from_pil["probabilities"] == from_array["probabilities"]
+        assert from_bytes["probabilities"] == from_array["probabilities"]
+
+    def test_warmup_does_not_consume_quota(self, engine):
+        """Le préchauffage exécute des inférences sans décompter le quota"""
+        quota_manager = inference_module.get_quota_manager()
+        used_before = quota_manager.get_used_analyses()
+
+        assert engine.warmup(iterations=3) is True
+        assert engine.session.batch_sizes == [1, 1, 1]
+        assert quota_manager.get_used_analyses() == used_before
+
+    def test_result_cache(self, engine, images, monkeypatch):
+        """Une image déjà analysée est servie depuis le cache sans inférence"""
+        monkeypatch.setattr(config, "RESULT_CACHE_COUNT_QUOTA", False)
+        engine.result_cache = ResultCache(max_entries=16, ttl_seconds=60)
+        quota_manager = inference_module.get_quota_manager()
+
+        first = engine.predict(images[0])
+        used_after_first = quota_manager.get_used_analyses()
+        second = engine.predict(images[0].copy())
+        batch = engine.predict_batch([images[0], images[1]])
+
+        assert "cached" not in first
+        assert second["cached"] is True
+        assert second["probabilities"] == first["probabilities"]
+        assert batch[0]["cached"] is True and "cached" not in batch[1]
+        assert engine.session.batch_sizes == [1, 1]
+        assert quota_manager.get_used_analyses() == used_after_first + 1
+        assert engine.result_cache.get_stats()["hits"] == 2
+
+    def test_cache_key_includes_preprocessing_settings(self, engine, images, monkeypatch):
+        """Les réglages de prétraitement font partie de la clé de cache"""
+        engine.result_cache = ResultCache(max_entries=16, ttl_seconds=60)
+        image = inference_module.prepare_image(images[0])
+
+        keys = set()
+        for fast_decode in (False, True):
+            for uint8_input in (False, True):
+                monkeypatch.setattr(config, "FAST_IMAGE_DECODE", fast_decode)
+                monkeypatch.setattr(config, "ORT_UINT8_INPUT", uint8_input)
+                keys.add(engine._cache_key(image))
+
+        assert len(keys) == 4
+        assert None not in keys
+
+    def test_uint8_input_model(self, engine, images):
+        """Un modèle à entrée uint8 reçoit les pixels bruts et donne les mêmes résultats"""
+        expected = engine.predict_batch(images)
+
+        session = create_session(TEST_MODEL_PATH, "latency", uint8_input=True)
+        engine.session = RecordingSession(session)
+        engine.input_shape = session.get_inputs()[0].shape
+        engine.input_type = session.get_inputs()[0].type
+
+        assert engine.preprocess_image(images[0]).dtype == np.uint8
+        for result, reference in zip(engine.predict_batch(images), expected):
+            assert result["class_id"] == reference["class_id"]
+            assert result["confidence"] == pytest.approx(reference["confidence"], abs=1e-3)
+
+    def test_io_binding(self, engine, images):
+        """Le chemin IOBinding donne les mêmes résultats que session.run"""
+        expected = engine.predict_batch(images, batch_size=4)
+
+        engine.io_runner = IOBindingRunner(engine.session.session, max_batch_size=4)
+        results = engine.predict_batch(images, batch_size=4)
+        single = engine.predict(images[0])
+
+        for result, reference in zip(results, expected):
+            assert result["class_id"] == reference["class_id"]
+            assert result["confidence"] == pytest.approx(reference["confidence"], abs=1e-3)
+        assert single["confidence"] == pytest.approx(expected[0]["confidence"], abs=1e-3)
+        assert engine.session.batch_sizes == [4, 1]
+
+    def test_worker_pool(self, engine, images):
+        """Les inférences déléguées aux processus donnent les mêmes résultats"""
+        expected = engine.predict_batch(images, batch_size=4)
+
+        engine.worker_pool = InferenceWorkerPool(TEST_MODEL_PATH.read_bytes(), 2, "latency")
+        try:
+            engine.worker_pool.start()
+            results = engine.predict_batch(images, batch_size=4)
+            info = engine.get_model_info()
+        finally:
+            engine.unload_model()
+
+        for result, reference in zip(results, expected):
+            assert result["class_id"] == reference["class_id"]
+            assert result["confidence"] == pytest.approx(reference["confidence"], abs=1e-3)
+        assert engine.session is None
+        assert info["workers"]["alive"] == 2
+
+    def test_stage_timings(self, engine, images):
+        """Chaque résultat porte ses durées par étape"""
+        single = engine.predict(images[0])
+        batch = engine.predict_batch(images[1:3])
+
+        for result in [single] + batch:
+            assert {"filter_ms", "preprocess_ms", "inference_ms", "softmax_ms", "quota_write_ms"} <= set(result["timings"])
+        assert batch[0]["timings"] == batch[1]["timings"]
+
+    def test_predict_batch_empty(self, engine):
+        """Une liste vide ne lance aucune inférence"""
+        assert engine.predict_batch([]) == []
+        assert engine.session.batch_sizes == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
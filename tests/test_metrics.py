@@ -0,0 +1,92 @@
+"""
+Tests pour les compteurs du service et l'exposition au format Prometheus
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.metrics import Histogram, PrometheusExposition, ServiceMetrics
+
+
+class TestServiceMetrics:
+    """Tests pour ServiceMetrics"""
+
+    def test_requests_and_in_flight(self):
+        """Requêtes comptées par route et statut, en cours décrémentées à la fin"""
+        metrics = ServiceMetrics()
+        metrics.request_started()
+        metrics.request_started()
+        assert metrics.in_flight == 2
+
+        metrics.request_finished("/predict", 200)
+        metrics.request_finished("/predict", 400)
+        assert metrics.in_flight == 0
+        assert metrics.request_counts() == {("/predict", "200"): 1, ("/predict", "400"): 1}
+
+    def test_filter_decisions(self):
+        """Décisions du filtre comptées par catégorie"""
+        metrics = ServiceMetrics()
+        metrics.observe_filter([
+            {"accepted": True, "category": "breast_cancer"},
+            {"accepted": False, "category": "non_medical"},
+            {"accepted": False, "category": "non_medical"},
+        ])
+
+        assert metrics.filter_decisions() == {
+            ("breast_cancer", "accepted"): 1,
+            ("non_medical", "rejected"): 2,
+        }
+
+
+class TestPrometheusExposition:
+    """Tests pour PrometheusExposition"""
+
+    def test_counter_and_gauge(self):
+        """Une famille = HELP, TYPE puis ses échantillons étiquetés"""
+        exposition = PrometheusExposition()
+        exposition.counter("app_requests_total", "Requêtes", [({"status": "200"}, 3)])
+        exposition.gauge("app_ratio", "Taux", [({}, 0.25)])
+
+        assert exposition.render() == (
+            "# HELP app_requests_total Requêtes\n"
+            "# TYPE app_requests_total counter\n"
+            'app_requests_total{status="200"} 3\n'
+            "# HELP app_ratio Taux\n"
+            "# TYPE app_ratio gauge\n"
+            "app_ratio 0.25\n"
+        )
+
+    def test_histogram_in_seconds(self):
+        """Seaux cumulés convertis en secondes, +Inf égal au compte"""
+        histogram = Histogram(buckets=(1, 2.5))
+        histogram.observe(2)
+        histogram.observe(2000)
+
+        exposition = PrometheusExposition()
+        exposition.histogram("app_duration_seconds", "Durée", [({"stage": "decode"}, histogram)], scale=0.001)
+        lines = exposition.render().splitlines()
+
+        assert lines[2:5] == [
+            'app_duration_seconds_bucket{stage="decode",le="0.001"} 0',
+            'app_duration_seconds_bucket{stage="decode",le="0.0025"} 1',
+            'app_duration_seconds_bucket{stage="decode",le="+Inf"} 2',
+        ]
+        name, value = lines[5].split(" ")
+        assert name == 'app_duration_seconds_sum{stage="decode"}'
+        assert float(value) == pytest.approx(2.002)
+        assert lines[6] == 'app_duration_seconds_count{stage="decode"} 2'
+
+    def test_label_escaping(self):
+        """Guillemets, barres obliques inverses et sauts de ligne échappés"""
+        exposition = PrometheusExposition()
+        exposition.gauge("app_info", "Info", [({"path": 'a"b\\c\nd'}, 1)])
+
+        assert exposition.render().splitlines()[-1] == 'app_info{path="a\\"b\\\\c\\nd"} 1'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
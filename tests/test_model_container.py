@@ -0,0 +1,231 @@
+"""
+Tests pour le conteneur chiffré par blocs
+"""
+
+import pytest
+import io
+import os
+from pathlib import Path
+import sys
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from src.model_container import (
+    ContainerHeader, TAG_SIZE, decrypt_container, derive_file_key, detection_confidence,
+    verify_container, write_container
+)
+
+KEY = bytes(range(32))
+
+
+def encrypt(data: bytes, chunk_size: int) -> bytes:
+    """Conteneur chiffré des données"""
+    output = io.BytesIO()
+    write_container(io.BytesIO(data), len(data), output, KEY, chunk_size)
+    return output.getvalue()
+
+
+class TestModelContainer:
+    """Tests pour write_container et decrypt_container"""
+
+    @pytest.mark.parametrize("size", [0, 1, 64, 65, 1000])
+    def test_round_trip(self, size):
+        """Toutes les tailles, y compris un dernier bloc partiel ou vide"""
+        data = os.urandom(size)
+        container = encrypt(data, chunk_size=64)
+
+        assert decrypt_container(io.BytesIO(container), KEY) == data
+
+    def test_header_and_index(self):
+        """L'index donne la position et la taille chiffrée de chaque bloc"""
+        container = encrypt(os.urandom(150), chunk_size=64)
+        header = ContainerHeader.read(io.BytesIO(container))
+
+        assert header.plaintext_size == 150
+        assert [length for _, length in header.chunks] == [64 + TAG_SIZE, 64 + TAG_SIZE, 22 + TAG_SIZE]
+        assert header.chunks[0][0] == header.size
+        assert header.chunks[-1][0] + header.chunks[-1][1] == len(container)
+
+    def test_swapped_chunks_rejected(self):
+        """Deux blocs échangés sont détectés (numéro du bloc dans le nonce)"""
+        container = bytearray(encrypt(os.urandom(128), chunk_size=64))
+        (first, length), (second, _) = ContainerHeader.read(io.BytesIO(bytes(container))).chunks
+        container[first:first + length], container[second:second + length] = (
+            container[second:second + length], container[first:first + length]
+        )
+
+        with pytest.raises(ValueError, match="bloc 0"):
+            decrypt_container(io.BytesIO(bytes(container)), KEY)
+
+    def test_truncated_and_wrong_key(self):
+        """Fichier tronqué ou mauvaise clé : ValueError"""
+        container = encrypt(os.urandom(100), chunk_size=64)
+
+        with pytest.raises(ValueError, match="tronqué"):
+            decrypt_container(io.BytesIO(container[:-1]), KEY)
+        with pytest.raises(ValueError):
+            decrypt_container(io.BytesIO(container), bytes(32))
+
+    @pytest.mark.parametrize("size", [0, 100])
+    def test_trailing_data_rejected(self, size):
+        """Des octets ajoutés après le dernier bloc rendent le conteneur invalide"""
+        container = encrypt(os.urandom(size), chunk_size=64) + b"\x00"
+
+        with pytest.raises(ValueError, match="après le dernier bloc"):
+            decrypt_container(io.BytesIO(container), KEY)
+        with pytest.raises(ValueError, match="après le dernier bloc"):
+            verify_container(io.BytesIO(container), KEY, sample=1)
+
+    @pytest.mark.parametrize("threads", [1, 4])
+    @pytest.mark.parametrize("use_mmap", [True, False])
+    def test_file_decryption(self, tmp_path, threads, use_mmap):
+        """Fichier projeté en mémoire ou lu par blocs, en série ou en parallèle"""
+        data = os.urandom(1000)
+        path = tmp_path / "model.enc"
+        path.write_bytes(encrypt(data, chunk_size=64))
+
+        with open(path, "rb") as f:
+            assert decrypt_container(f, KEY, threads=threads, use_mmap=use_mmap) == data
+
+    def test_verify_without_plaintext(self, tmp_path):
+        """Vérification des tags sans déchiffrer dans un tampon complet"""
+        container = bytearray(encrypt(os.urandom(1000), chunk_size=64))
+        path = tmp_path / "model.enc"
+        path.write_bytes(bytes(container))
+        with open(path, "rb") as f:
+            verify_container(f, KEY, threads=2)
+
+        container[-1] ^= 0x01
+        path.write_bytes(bytes(container))
+        with open(path, "rb") as f, pytest.raises(ValueError, match="Bloc 15"):
+            verify_container(f, KEY)
+
+    def test_parallel_tampered_chunk(self):
+        """Un bloc altéré fait échouer le déchiffrement parallèle"""
+        container = bytearray(encrypt(os.urandom(1000), chunk_size=64))
+        offset, _ = ContainerHeader.read(io.BytesIO(bytes(container))).chunks[7]
+        container[offset] ^= 0x01
+
+        with pytest.raises(ValueError, match="bloc 7"):
+            decrypt_container(io.BytesIO(bytes(container)), KEY, threads=4)
+
+
+class _FixedSample:
+    """Tirage imposé (interface sample de random.Random)"""
+
+    def __init__(self, numbers):
+        self.numbers = numbers
+
+    def sample(self, population, k):
+        return self.numbers[:k]
+
+
+class TestIntegrityVerification:
+    """Tests pour le manifeste authentifié et la vérification par échantillon"""
+
+    def test_mac_rejects_wrong_key_and_altered_manifest(self):
+        """Clé fausse ou manifeste modifié : MAC invalide, sans déchiffrer de bloc"""
+        container = bytearray(encrypt(os.urandom(300), chunk_size=64))
+        with pytest.raises(ValueError, match="MAC"):
+            verify_container(io.BytesIO(bytes(container)), bytes(32), sample=1)
+
+        header = ContainerHeader.read(io.BytesIO(bytes(container)))
+        container[header.size - 40] ^= 0x01  # dernier tag du manifeste
+        with pytest.raises(ValueError, match="MAC"):
+            verify_container(io.BytesIO(bytes(container)), KEY, sample=1)
+
+    def test_swapped_chunks_caught_by_manifest(self):
+        """Blocs échangés détectés par le manifeste, même hors de l'échantillon"""
+        container = bytearray(encrypt(os.urandom(256), chunk_size=64))
+        chunks = ContainerHeader.read(io.BytesIO(bytes(container))).chunks
+        (first, length), (second, _) = chunks[1], chunks[2]
+        container[first:first + length], container[second:second + length] = (
+            container[second:second + length], container[first:first + length]
+        )
+
+        with pytest.raises(ValueError, match="manifeste"):
+            verify_container(io.BytesIO(bytes(container)), KEY, sample=1, rng=_FixedSample([0]))
+
+    def test_sampled_verification(self):
+        """Seuls les blocs tirés sont authentifiés, avec la confiance correspondante"""
+        container = bytearray(encrypt(os.urandom(1000), chunk_size=64))
+        offset, _ = ContainerHeader.read(io.BytesIO(bytes(container))).chunks[3]
+        container[offset] ^= 0x01
+
+        result = verify_container(io.BytesIO(bytes(container)), KEY, sample=2, rng=_FixedSample([0, 9]))
+        assert result.chunks_checked == 2
+        assert result.chunk_count == 16
+        assert result.complete is False
+        assert result.confidence == pytest.approx(2 / 16)
+
+        with pytest.raises(ValueError, match="Bloc 3"):
+            verify_container(io.BytesIO(bytes(container)), KEY, sample=2, rng=_FixedSample([3, 9]))
+        with pytest.raises(ValueError, match="Bloc 3"):
+            verify_container(io.BytesIO(bytes(container)), KEY)
+
+    def test_structural_check_without_decryption(self):
+        """sample=0 : MAC et manifeste seuls, confiance nulle sur le contenu des blocs"""
+        container = bytearray(encrypt(os.urandom(1000), chunk_size=64))
+        offset, _ = ContainerHeader.read(io.BytesIO(bytes(container))).chunks[3]
+        container[offset] ^= 0x01
+
+        result = verify_container(io.BytesIO(bytes(container)), KEY, sample=0)
+        assert result.chunks_checked == 0
+        assert result.manifest_checked is True
+        assert result.complete is False
+        assert result.confidence == 0.0
+
+        with pytest.raises(ValueError, match="MAC"):
+            verify_container(io.BytesIO(bytes(container)), bytes(32), sample=0)
+        with pytest.raises(ValueError, match="invalide"):
+            verify_container(io.BytesIO(bytes(container)), KEY, sample=-1)
+
+    def test_empty_container_wrong_key(self):
+        """Conteneur sans bloc : la clé fausse est détectée par le MAC au déchiffrement"""
+        container = encrypt(b"", chunk_size=64)
+
+        assert decrypt_container(io.BytesIO(container), KEY) == b""
+        with pytest.raises(ValueError, match="MAC"):
+            decrypt_container(io.BytesIO(container), bytes(32))
+
+    def test_detection_confidence(self):
+        """Probabilité hypergéométrique de tirer au moins un bloc altéré"""
+        assert detection_confidence(100, 10) == pytest.approx(0.1)
+        assert detection_confidence(100, 100) == 1.0
+        assert detection_confidence(100, 96, assumed_corruption=0.05) == 1.0
+
+        missed = 1.0
+        for drawn in range(10):
+            missed *= (95 - drawn) / (100 - drawn)
+        assert detection_confidence(100, 10, assumed_corruption=0.05) == pytest.approx(1 - missed)
+
+    def test_reads_version_1(self):
+        """Les conteneurs de version 1 (sans manifeste) restent lisibles et vérifiables"""
+        data = os.urandom(150)
+        header = ContainerHeader(64, 150, os.urandom(16), os.urandom(8), ((0, 0),) * 3, version=1)
+        offset = header.size
+        chunks = []
+        for length in (64, 64, 22):
+            chunks.append((offset, length + TAG_SIZE))
+            offset += length + TAG_SIZE
+        header = ContainerHeader(64, 150, header.salt, header.nonce_prefix, tuple(chunks), version=1)
+        associated_data = header.pack()
+        aesgcm = AESGCM(derive_file_key(KEY, header.salt))
+        container = associated_data + b"".join(
+            aesgcm.encrypt(header.nonce(number), data[number * 64:(number + 1) * 64], associated_data)
+            for number in range(3)
+        )
+
+        assert decrypt_container(io.BytesIO(container), KEY) == data
+        result = verify_container(io.BytesIO(container), KEY, sample=1)
+        assert result.manifest_checked is False
+        assert result.chunks_checked == 1
+        with pytest.raises(ValueError, match="manifeste"):
+            verify_container(io.BytesIO(container), KEY, sample=0)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
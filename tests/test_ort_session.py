@@ -0,0 +1,154 @@
+"""
+Tests pour la création des sessions ONNX Runtime
+"""
+
+import pytest
+import logging
+import threading
+from pathlib import Path
+import sys
+
+import numpy as np
+import onnxruntime as ort
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config
+from src import ort_session as ort_session_module
+from src.ort_session import (
+    IOBindingRunner, build_session_options, create_session, get_optimized_cache_path, get_profile_settings,
+    wrap_uint8_input
+)
+from src.preprocessing import PreparedImage
+
+TEST_MODEL_PATH = Path(__file__).parent.parent / config.FILTER_MODEL_PATH
+
+
+class TestOrtSession:
+    """Tests pour les profils SessionOptions"""
+
+    @pytest.mark.parametrize("profile_name", sorted(config.ORT_PROFILES))
+    def test_profiles_build_session(self, profile_name):
+        """Chaque profil configuré produit une session fonctionnelle"""
+        session = create_session(TEST_MODEL_PATH, profile_name)
+        assert session.get_inputs()[0].name == "input"
+
+    def test_low_memory_profile(self):
+        """Le profil low_memory désactive l'arena et le memory pattern"""
+        options = build_session_options("low_memory")
+
+        assert options.enable_cpu_mem_arena is False
+        assert options.enable_mem_pattern is False
+        assert options.intra_op_num_threads == 1
+        assert options.graph_optimization_level == ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+
+    def test_thread_override(self, monkeypatch):
+        """Les variables d'environnement surchargent le nombre de threads"""
+        monkeypatch.setattr(config, "ORT_INTRA_OP_THREADS", "3")
+
+        assert get_profile_settings("latency")["intra_op_num_threads"] == 3
+        assert build_session_options("latency").intra_op_num_threads == 3
+
+    def test_optimized_model_cache(self, monkeypatch, tmp_path, caplog):
+        """Le graphe optimisé est chiffré sur disque puis réutilisé"""
+        monkeypatch.setattr(config, "ORT_CACHE_DIR", tmp_path)
+        model_data = TEST_MODEL_PATH.read_bytes()
+        feed = {"input": np.random.default_rng(0).random((2, 3, 224, 224), dtype=np.float32)}
+
+        first = create_session(model_data, "latency", use_optimized_cache=True)
+        cache_files = list(tmp_path.iterdir())
+        assert [path.name for path in cache_files] == [
+            get_optimized_cache_path(model_data, "latency", first.get_providers()).name
+        ]
+        assert b"input" not in cache_files[0].read_bytes()
+
+        with caplog.at_level(logging.INFO, logger="src.ort_session"):
+            second = create_session(model_data, "latency", use_optimized_cache=True)
+        assert "chargé depuis le cache" in caplog.text
+        assert list(tmp_path.iterdir()) == cache_files
+        np.testing.assert_allclose(second.run(None, feed)[0], first.run(None, feed)[0], rtol=1e-5)
+
+    def test_optimized_cache_key_depends_on_cpu(self, monkeypatch):
+        """Un graphe optimisé sur un autre processeur n'est pas réutilisé"""
+        model_data = TEST_MODEL_PATH.read_bytes()
+        providers = ["CPUExecutionProvider"]
+        local = get_optimized_cache_path(model_data, "latency", providers)
+
+        monkeypatch.setattr(ort_session_module, "_cpu_fingerprint", lambda: "x86_64|other|sse2")
+        assert get_optimized_cache_path(model_data, "latency", providers) != local
+
+    def test_uint8_input_matches_float_preprocessing(self):
+        """L'entrée uint8 NHWC donne les mêmes sorties que le prétraitement NumPy"""
+        rng = np.random.default_rng(0)
+        images = [PreparedImage(rng.integers(0, 256, (180, 240, 3), dtype=np.uint8)) for _ in range(2)]
+
+        float_session = create_session(TEST_MODEL_PATH, "latency")
+        uint8_session = create_session(TEST_MODEL_PATH, "latency", uint8_input=True)
+
+        model_input = uint8_session.get_inputs()[0]
+        assert model_input.name == "input"
+        assert model_input.type == "tensor(uint8)"
+        assert model_input.shape[1:] == [224, 224, 3]
+
+        pixels = np.concatenate([image.pixels((224, 224)) for image in images])
+        tensors = np.concatenate([image.tensor((224, 224)) for image in images])
+        np.testing.assert_allclose(
+            uint8_session.run(None, {"input": pixels})[0],
+            float_session.run(None, {"input": tensors})[0],
+            rtol=1e-5, atol=1e-5
+        )
+
+    def test_wrap_uint8_input_is_idempotent(self):
+        """Un modèle déjà en entrée uint8 n'est pas modifié"""
+        wrapped = wrap_uint8_input(TEST_MODEL_PATH.read_bytes())
+
+        assert wrap_uint8_input(wrapped) == wrapped
+
+    def test_io_binding_runner(self):
+        """IOBinding donne les mêmes sorties que session.run et réutilise ses tampons"""
+        session = create_session(TEST_MODEL_PATH, "latency")
+        runner = IOBindingRunner(session, max_batch_size=4)
+        rng = np.random.default_rng(0)
+        samples = [rng.random((1, 3, 224, 224), dtype=np.float32) for _ in range(4)]
+
+        for batch_size in (1, 3, 4):
+            expected = session.run(None, {"input": np.concatenate(samples[:batch_size])})[0]
+            output = runner.run(samples[:batch_size])[0]
+            np.testing.assert_allclose(output, expected, rtol=1e-5, atol=1e-6)
+
+        # En régime établi, mêmes tampons d'une inférence à l'autre
+        first = runner.run(samples[:2])[0]
+        second = runner.run(samples[2:4])[0]
+        assert first.ctypes.data == second.ctypes.data
+
+        with pytest.raises(ValueError):
+            runner.run(samples + samples[:1])
+
+    def test_io_binding_buffers_per_thread(self):
+        """Chaque thread dispose de ses propres tampons"""
+        runner = IOBindingRunner(create_session(TEST_MODEL_PATH, "latency"), max_batch_size=2)
+        sample = np.zeros((1, 3, 224, 224), dtype=np.float32)
+        addresses = []
+        barrier = threading.Barrier(2)
+
+        def worker():
+            addresses.append(runner.run([sample])[0].ctypes.data)
+            barrier.wait(5)  # Garder les deux threads (et leurs tampons) en vie
+
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(set(addresses)) == 2
+
+    def test_unknown_profile(self):
+        """Un profil inconnu est refusé"""
+        with pytest.raises(ValueError):
+            get_profile_settings("turbo")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,142 @@
+"""
+Tests pour le prétraitement partagé des images
+"""
+
+import pytest
+import io
+from pathlib import Path
+import sys
+
+import numpy as np
+from PIL import Image
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config
+from src.preprocessing import PreparedImage, load_image, prepare_image
+
+
+class TestPreprocessing:
+    """Tests pour load_image et PreparedImage"""
+
+    @pytest.fixture
+    def png_bytes(self):
+        """Image PNG synthétique encodée en mémoire"""
+        rng = np.random.default_rng(0)
+        array = rng.integers(0, 256, size=(300, 200, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(array).save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def test_load_image_sources(self, png_bytes, tmp_path):
+        """Chemin, octets, image PIL et tableau numpy sont acceptés"""
+        path = tmp_path / "image.png"
+        path.write_bytes(png_bytes)
+        reference = np.asarray(load_image(png_bytes))
+
+        assert np.array_equal(np.asarray(load_image(path)), reference)
+        assert np.array_equal(np.asarray(load_image(str(path))), reference)
+        assert np.array_equal(np.asarray(load_image(reference)), reference)
+        assert np.array_equal(np.asarray(load_image(Image.fromarray(reference))), reference)
+
+        with pytest.raises(TypeError):
+            load_image(42)
+
+    def test_tensor_layout(self, png_bytes):
+        """Le tenseur est normalisé, en CHW, avec une dimension batch"""
+        tensor = PreparedImage(png_bytes).tensor((224, 224))
+
+        assert tensor.shape == (1, 3, 224, 224)
+        assert tensor.dtype == np.float32
+        assert 0.0 <= tensor.min() and tensor.max() <= 1.0
+
+        # Identique au prétraitement historique (resize LANCZOS puis transpose)
+        image = Image.open(io.BytesIO(png_bytes)).convert('RGB')
+        expected = np.array(image.resize((224, 224), Image.Resampling.LANCZOS), dtype=np.float32) / 255.0
+        expected = np.expand_dims(np.transpose(expected, (2, 0, 1)), axis=0)
+        assert np.array_equal(tensor, expected)
+
+    def test_tensor_cached_per_size(self, png_bytes):
+        """Un seul redimensionnement par taille cible, tenseur en lecture seule"""
+        prepared = prepare_image(png_bytes)
+
+        first = prepared.tensor((224, 224))
+        assert prepared.tensor((224, 224)) is first
+        assert prepared.tensor((128, 128)).shape == (1, 3, 128, 128)
+        assert not first.flags.writeable
+
+        assert prepare_image(prepared) is prepared
+
+    def test_pixels_layout(self, png_bytes):
+        """Les pixels bruts sont en uint8 NHWC contigu et cohérents avec le tenseur"""
+        prepared = PreparedImage(png_bytes)
+        pixels = prepared.pixels((224, 224))
+
+        assert pixels.shape == (1, 224, 224, 3)
+        assert pixels.dtype == np.uint8
+        assert pixels.flags.c_contiguous and not pixels.flags.writeable
+        assert prepared.pixels((224, 224)) is pixels
+
+        expected = np.transpose(pixels.astype(np.float32) / 255.0, (0, 3, 1, 2))
+        assert np.array_equal(prepared.tensor((224, 224)), expected)
+
+    @pytest.fixture
+    def large_jpeg(self):
+        """Grande image JPEG synthétique (dégradés lisses, comme une radiographie)"""
+        y, x = np.mgrid[0:1600, 0:2000]
+        array = np.stack([x % 256, y % 256, (x + y) // 16 % 256], axis=-1).astype(np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(array).save(buffer, format='JPEG', quality=90)
+        return buffer.getvalue()
+
+    def test_fast_decode_reduces_jpeg(self, large_jpeg, monkeypatch):
+        """Le décodage rapide décode un JPEG à résolution réduite, proche du résultat exact"""
+        exact = PreparedImage(large_jpeg).tensor((224, 224))
+
+        monkeypatch.setattr(config, "FAST_IMAGE_DECODE", True)
+        prepared = PreparedImage(large_jpeg)
+        fast = prepared.tensor((224, 224))
+
+        decoded = prepared.decode((224, 224))
+        assert decoded.size == (1000, 800)
+        assert prepared.size == (2000, 1600)
+        assert fast.shape == exact.shape
+        assert np.abs(fast - exact).mean() < 0.02
+
+        # Une taille cible plus grande redécode à une résolution suffisante
+        assert prepared.decode((600, 600)).size == (2000, 1600)
+
+    def test_fast_decode_size_hint(self, large_jpeg, monkeypatch):
+        """L'indication de taille permet un seul décodage pour plusieurs tailles cibles"""
+        monkeypatch.setattr(config, "FAST_IMAGE_DECODE", True)
+        prepared = prepare_image(large_jpeg, size_hint=(300, 300))
+
+        prepared.tensor((224, 224))
+        decoded = prepared.decode((224, 224))
+        prepared.tensor((300, 300))
+
+        assert decoded.size == (1000, 800)
+        assert prepared.decode((300, 300)) is decoded
+        # La pleine résolution reste accessible
+        assert prepared.image.size == (2000, 1600)
+
+    def test_fast_decode_disabled_is_exact(self, large_jpeg, monkeypatch):
+        """Sans décodage rapide, la pleine résolution est toujours utilisée"""
+        monkeypatch.setattr(config, "FAST_IMAGE_DECODE", False)
+        prepared = PreparedImage(large_jpeg)
+
+        assert prepared.decode((224, 224)).size == (2000, 1600)
+
+    def test_fast_decode_keeps_pil_source(self, large_jpeg, monkeypatch):
+        """Une image PIL fournie par l'appelant n'est jamais modifiée"""
+        monkeypatch.setattr(config, "FAST_IMAGE_DECODE", True)
+        source = Image.open(io.BytesIO(large_jpeg))
+
+        PreparedImage(source).tensor((224, 224))
+
+        assert source.size == (2000, 1600)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
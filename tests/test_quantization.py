@@ -0,0 +1,115 @@
+"""
+Tests pour la quantification INT8 du modèle
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+import numpy as np
+from PIL import Image
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config
+from src import inference_engine as inference_module
+from src.encryption_manager import ModelDecryptor
+from src.inference_engine import InferenceEngine
+from src.ort_session import create_session
+from src.quantization import compare_models, list_calibration_images, quantize_model
+
+TEST_MODEL_PATH = Path(__file__).parent.parent / config.FILTER_MODEL_PATH
+
+
+@pytest.fixture
+def calibration_dir(tmp_path):
+    """Dossier de calibration : images étiquetées par sous-dossier et une image non étiquetée"""
+    rng = np.random.default_rng(0)
+    for index, folder in enumerate(["Bénin", "malin", "."]):
+        (tmp_path / folder).mkdir(exist_ok=True)
+        pixels = rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)
+        Image.fromarray(pixels).save(tmp_path / folder / f"image_{index}.png")
+    (tmp_path / "notes.txt").write_text("ignoré")
+    return tmp_path
+
+
+class TestQuantization:
+    """Tests pour la construction et l'évaluation du modèle INT8"""
+
+    def test_list_calibration_images(self, calibration_dir):
+        """Seules les images supportées sont retenues, sous-dossiers inclus"""
+        images = list_calibration_images(calibration_dir)
+
+        assert len(images) == 3
+        assert all(path.suffix == ".png" for path in images)
+
+    @pytest.mark.parametrize("mode", ["dynamic", "static"])
+    def test_quantized_model_runs(self, mode, calibration_dir):
+        """La variante INT8 se charge et produit des sorties de même forme"""
+        fp32_model = TEST_MODEL_PATH.read_bytes()
+        int8_model = quantize_model(fp32_model, mode, list_calibration_images(calibration_dir))
+
+        session = create_session(int8_model, "latency")
+        feed = {"input": np.zeros((2, 3, 224, 224), dtype=np.float32)}
+        assert session.run(None, feed)[0].shape == (2, 3)
+
+    def test_static_requires_calibration_images(self):
+        """La quantification statique refuse un jeu de calibration vide"""
+        with pytest.raises(ValueError):
+            quantize_model(TEST_MODEL_PATH.read_bytes(), "static", [])
+
+    def test_compare_models_report(self, calibration_dir):
+        """Le rapport compare latence, exactitude et accord des deux précisions"""
+        fp32_model = TEST_MODEL_PATH.read_bytes()
+        images = list_calibration_images(calibration_dir)
+        int8_model = quantize_model(fp32_model, "static", images)
+
+        report = compare_models(fp32_model, int8_model, images, labels_root=calibration_dir)
+
+        assert report["images"] == 3
+        assert report["labeled_images"] == 2
+        assert 0.0 <= report["top1_agreement"] <= 1.0
+        for precision in ("fp32", "int8"):
+            assert report[precision]["latency_ms"]["p50"] > 0
+            assert 0.0 <= report[precision]["accuracy"] <= 1.0
+        assert report["int8"]["size_mb"] < report["fp32"]["size_mb"]
+
+    def test_engine_precision_selection(self, monkeypatch, tmp_path, calibration_dir):
+        """Le moteur charge la variante INT8 demandée, ou le FP32 si elle est absente"""
+        fp32_model = TEST_MODEL_PATH.read_bytes()
+        decryptor = ModelDecryptor()
+        decryptor.encrypted_model_path = tmp_path / "model.onnx.enc"
+        decryptor.int8_encrypted_model_path = tmp_path / "model.int8.onnx.enc"
+        decryptor.encryption_manager.encrypt_to_file(fp32_model, decryptor.encrypted_model_path)
+
+        class PremiumAuth:
+            def is_premium(self):
+                return True
+
+        monkeypatch.setattr(inference_module, "get_model_decryptor", lambda: decryptor)
+        monkeypatch.setattr(inference_module, "get_auth_manager", lambda: PremiumAuth())
+
+        engine = InferenceEngine()
+        assert engine.load_model(precision="int8")
+        assert engine.get_model_info()["precision"] == "fp32"
+        fp32_version = engine.model_version
+
+        int8_model = quantize_model(fp32_model, "dynamic", list_calibration_images(calibration_dir))
+        decryptor.encryption_manager.encrypt_to_file(int8_model, decryptor.int8_encrypted_model_path)
+
+        assert engine.load_model(force_reload=True)
+        assert engine.get_model_info()["precision"] == "int8"
+        assert engine.model_version != fp32_version
+
+        assert engine.load_model(precision="fp32")
+        assert engine.loaded_precision == "fp32"
+
+    def test_unknown_precision(self):
+        """Une précision inconnue est refusée"""
+        with pytest.raises(ValueError):
+            ModelDecryptor().get_encrypted_model_path("fp16")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
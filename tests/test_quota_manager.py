@@ -4,6 +4,7 @@ Tests pour le gestionnaire de quota
 
 import pytest
 import tempfile
+import threading
 from pathlib import Path
 import sys
 
@@ -91,6 +92,25 @@ class TestQuotaManager:
         assert stats['remaining'] == 4995
         assert stats['is_premium'] is False
         assert stats['limit'] == 5000
+    
+    def test_concurrent_increments(self, temp_quota_file):
+        """Test des incréments concurrents (aucune mise à jour perdue)"""
+        manager = QuotaManager(temp_quota_file)
+        manager.set_premium(True)
+        
+        def worker():
+            for _ in range(50):
+                manager.increment_usage()
+        
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert manager.get_used_analyses() == 200
+        assert manager.is_premium() is True
+        assert not list(temp_quota_file.parent.glob(f"{temp_quota_file.name}.*.tmp"))
 
 
 if __name__ == "__main__":
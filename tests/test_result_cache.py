@@ -0,0 +1,74 @@
+"""
+Tests pour le cache des résultats de prédiction
+"""
+
+import pytest
+import time
+from pathlib import Path
+import sys
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.result_cache import ResultCache, make_cache_key
+
+
+class TestResultCache:
+    """Tests pour ResultCache"""
+
+    def test_hit_and_miss(self):
+        """Les compteurs de hits/misses sont tenus à jour"""
+        cache = ResultCache(max_entries=4, ttl_seconds=60)
+        key = make_cache_key("abc", "v1")
+
+        assert cache.get(key) is None
+        cache.set(key, {"prediction": "Bénin"})
+
+        assert cache.get(key) == {"prediction": "Bénin"}
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_returns_copies(self):
+        """Modifier un résultat renvoyé ne modifie pas le cache"""
+        cache = ResultCache(max_entries=4, ttl_seconds=60)
+        cache.set("key", {"probabilities": {"Bénin": 90.0}})
+
+        cache.get("key")["probabilities"]["Bénin"] = 0.0
+
+        assert cache.get("key")["probabilities"]["Bénin"] == 90.0
+
+    def test_lru_eviction(self):
+        """L'entrée la moins récemment utilisée est évincée"""
+        cache = ResultCache(max_entries=2, ttl_seconds=60)
+        cache.set("a", {"value": 1})
+        cache.set("b", {"value": 2})
+        cache.get("a")
+        cache.set("c", {"value": 3})
+
+        assert cache.get("b") is None
+        assert cache.get("a") == {"value": 1}
+        assert cache.get_stats()["size"] == 2
+
+    def test_ttl_expiration(self):
+        """Une entrée expirée n'est plus servie"""
+        cache = ResultCache(max_entries=4, ttl_seconds=0.05)
+        cache.set("key", {"value": 1})
+        time.sleep(0.1)
+
+        assert cache.get("key") is None
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        """Le niveau disque conserve les résultats entre deux instances"""
+        ResultCache(max_entries=4, ttl_seconds=60, disk_dir=tmp_path).set("key", {"value": 1})
+
+        restarted = ResultCache(max_entries=4, ttl_seconds=60, disk_dir=tmp_path)
+
+        assert restarted.get("key") == {"value": 1}
+        restarted.clear()
+        assert list(tmp_path.iterdir()) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,131 @@
+"""
+Tests pour la coalescence des requêtes identiques
+"""
+
+import pytest
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import sys
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.single_flight import AsyncSingleFlight, SingleFlight
+
+
+class TestSingleFlight:
+    """Tests pour SingleFlight (threads)"""
+
+    def test_concurrent_calls_share_one_computation(self):
+        """Les appels concurrents de même clé n'exécutent la fonction qu'une fois"""
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {"prediction": "Bénin"}
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            leader = pool.submit(flight.do, "hash", compute)
+            started.wait(5)
+            waiters = [pool.submit(flight.do, "hash", compute) for _ in range(3)]
+            while flight._calls["hash"].waiters < 3:
+                threading.Event().wait(0.001)
+            release.set()
+            results = [leader.result()] + [waiter.result() for waiter in waiters]
+
+        assert len(calls) == 1
+        assert [shared for _, shared in results] == [False, True, True, True]
+        assert all(result == {"prediction": "Bénin"} for result, _ in results)
+        # Chaque appelant reçoit sa propre copie
+        assert len({id(result) for result, _ in results}) == 4
+        assert flight.in_flight == 0
+
+    def test_error_propagates_to_waiters(self):
+        """Une exception du calcul est levée chez tous les appelants"""
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def compute():
+            started.set()
+            release.wait(5)
+            raise RuntimeError("échec")
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(flight.do, "hash", compute)
+            started.wait(5)
+            waiter = pool.submit(flight.do, "hash", compute)
+            while flight._calls["hash"].waiters < 1:
+                threading.Event().wait(0.001)
+            release.set()
+            for future in (leader, waiter):
+                with pytest.raises(RuntimeError):
+                    future.result()
+
+        assert flight.in_flight == 0
+
+    def test_sequential_calls_recompute(self):
+        """Un appel après la fin du calcul relance la fonction"""
+        flight = SingleFlight()
+        calls = []
+
+        for _ in range(2):
+            flight.do("hash", lambda: calls.append(1))
+
+        assert len(calls) == 2
+
+
+class TestAsyncSingleFlight:
+    """Tests pour AsyncSingleFlight"""
+
+    def test_concurrent_coroutines_share_one_computation(self):
+        """Les coroutines concurrentes de même clé partagent le calcul"""
+        calls = []
+
+        async def compute(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return {"key": key}
+
+        async def scenario():
+            flight = AsyncSingleFlight()
+            results = await asyncio.gather(
+                *(flight.do(key, lambda key=key: compute(key)) for key in "aaab")
+            )
+            return flight, results
+
+        flight, results = asyncio.run(scenario())
+
+        assert sorted(calls) == ["a", "b"]
+        assert [shared for _, shared in results] == [False, True, True, False]
+        assert [result["key"] for result, _ in results] == list("aaab")
+        assert flight.in_flight == 0
+
+    def test_cancelled_caller_does_not_cancel_computation(self):
+        """L'annulation du premier appelant n'interrompt pas les autres"""
+
+        async def compute():
+            await asyncio.sleep(0.02)
+            return "ok"
+
+        async def scenario():
+            flight = AsyncSingleFlight()
+            leader = asyncio.create_task(flight.do("hash", compute))
+            await asyncio.sleep(0)
+            waiter = asyncio.create_task(flight.do("hash", compute))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await waiter
+
+        assert asyncio.run(scenario()) == ("ok", True)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,85 @@
+"""
+Tests pour la mesure des durées par étape et les histogrammes
+"""
+
+import pytest
+import time
+from pathlib import Path
+import sys
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.metrics import Histogram, StageHistograms
+from src.timing import StageTimings
+
+
+class TestStageTimings:
+    """Tests pour StageTimings"""
+
+    def test_measure_accumulates(self):
+        """Une étape mesurée plusieurs fois cumule ses durées"""
+        timings = StageTimings()
+        for _ in range(2):
+            with timings.measure("preprocess"):
+                time.sleep(0.005)
+
+        assert timings.get("preprocess") >= 10
+        assert timings.get("inference") == 0.0
+
+    def test_pipeline_order_and_round_trip(self):
+        """Les étapes suivent l'ordre du pipeline et survivent à as_dict/from_dict"""
+        timings = StageTimings()
+        timings.add("inference", 12.5)
+        timings.add("decode", 3.25)
+        timings.add("filter", 4.0)
+
+        assert [stage for stage, _ in timings.items()] == ["decode", "filter", "inference"]
+        assert timings.as_dict() == {"decode_ms": 3.25, "filter_ms": 4.0, "inference_ms": 12.5}
+        restored = StageTimings.from_dict({**timings.as_dict(), "total_ms": 99.0})
+        assert restored.as_dict() == timings.as_dict()
+
+    def test_server_timing_header(self):
+        """Format de l'en-tête Server-Timing"""
+        timings = StageTimings()
+        timings.add("decode", 3.214)
+        timings.add("inference", 12.5)
+
+        assert timings.server_timing(17.0) == "decode;dur=3.21, inference;dur=12.50, total;dur=17.00"
+
+
+class TestHistogram:
+    """Tests pour Histogram et StageHistograms"""
+
+    def test_buckets_are_cumulative(self):
+        """Une valeur égale à une borne tombe dans ce seau ("le")"""
+        histogram = Histogram(buckets=(1, 10, 100))
+        for value in (0.5, 1, 5, 50, 500):
+            histogram.observe(value)
+
+        assert histogram.cumulative_counts() == {"1": 2, "10": 3, "100": 4, "+Inf": 5}
+        assert histogram.count == 5
+        assert histogram.sum == pytest.approx(556.5)
+
+    def test_quantile_estimate(self):
+        """Les quantiles sont estimés par interpolation dans les seaux"""
+        histogram = Histogram(buckets=(10, 20, 30))
+        histogram.observe(15, count=100)
+
+        assert 10 <= histogram.quantile(0.5) <= 20
+        assert Histogram().quantile(0.5) is None
+
+    def test_stage_histograms(self):
+        """Les durées d'un lot comptent pour chacune de ses images"""
+        histograms = StageHistograms()
+        timings = StageTimings()
+        timings.add("inference", 8.0)
+        histograms.observe(timings, count=4)
+
+        stats = histograms.get_stats()
+        assert stats["inference"]["count"] == 4
+        assert stats["inference"]["mean_ms"] == 8.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,146 @@
+"""
+Tests pour les processus d'inférence partageant un modèle déchiffré
+"""
+
+import pytest
+import multiprocessing as mp
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import sys
+
+import numpy as np
+import onnxruntime as ort
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config
+from src.worker_pool import InferenceWorkerPool, split_cpus
+
+TEST_MODEL_PATH = Path(__file__).parent.parent / config.FILTER_MODEL_PATH
+
+START_METHODS = [method for method in ("fork", "spawn") if method in mp.get_all_start_methods()]
+
+
+@pytest.fixture(scope="module")
+def model_data():
+    return TEST_MODEL_PATH.read_bytes()
+
+
+def make_inputs(count: int):
+    """Entrées [1, 3, 224, 224] distinctes"""
+    rng = np.random.default_rng(0)
+    return [rng.random((1, 3, 224, 224), dtype=np.float32) for _ in range(count)]
+
+
+class TestSplitCpus:
+    """Tests pour la répartition des cœurs"""
+
+    def test_disjoint_groups(self):
+        """Chaque cœur est attribué à un seul processus"""
+        groups = split_cpus(3, range(8))
+        assert [len(group) for group in groups] == [3, 3, 2]
+        assert sorted(cpu for group in groups for cpu in group) == list(range(8))
+
+    def test_more_workers_than_cpus(self):
+        """Au-delà du nombre de cœurs, les processus partagent les cœurs"""
+        assert split_cpus(3, [0, 1]) == [[0], [1], [0]]
+
+
+class TestInferenceWorkerPool:
+    """Tests pour InferenceWorkerPool"""
+
+    @pytest.mark.parametrize("start_method", START_METHODS)
+    def test_matches_in_process_session(self, model_data, start_method):
+        """Les processus produisent les mêmes sorties qu'une session locale"""
+        session = ort.InferenceSession(model_data)
+        inputs = make_inputs(3)
+        expected = session.run(None, {"input": np.concatenate(inputs)})[0]
+
+        pool = InferenceWorkerPool(model_data, 2, "latency", start_method=start_method)
+        try:
+            metadata = pool.start()
+            assert metadata["input_name"] == "input"
+            assert metadata["input_shape"][1:] == [3, 224, 224]
+            np.testing.assert_allclose(pool.run(inputs), expected, rtol=1e-5, atol=1e-6)
+            assert pool.get_stats()["alive"] == 2
+        finally:
+            pool.stop()
+
+    def test_concurrent_requests(self, model_data):
+        """Les lots concurrents sont répartis et chaque appelant reçoit son résultat"""
+        session = ort.InferenceSession(model_data)
+        inputs = make_inputs(8)
+        expected = [session.run(None, {"input": sample})[0] for sample in inputs]
+
+        pool = InferenceWorkerPool(model_data, 2, "latency")
+        try:
+            pool.start()
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                outputs = list(executor.map(lambda sample: pool.run([sample]), inputs))
+        finally:
+            pool.stop()
+
+        for output, reference in zip(outputs, expected):
+            np.testing.assert_allclose(output, reference, rtol=1e-5, atol=1e-6)
+
+    @pytest.mark.parametrize("start_method", START_METHODS)
+    def test_dead_worker_is_restarted(self, model_data, start_method):
+        """Un processus tué est remplacé (toujours par spawn) et le pool reste utilisable"""
+        pool = InferenceWorkerPool(model_data, 1, "latency", start_method=start_method)
+        try:
+            pool.start()
+            pool._workers[0].process.kill()
+
+            deadline = time.monotonic() + 60
+            while not (pool.restarts == 1 and pool._workers[0].ready) and time.monotonic() < deadline:
+                time.sleep(0.05)
+
+            output = pool.run(make_inputs(1))
+            assert output.shape == (1, 3)
+            assert pool.restarts == 1
+            # Remplaçant créé depuis le thread de collecte : jamais par fork
+            assert type(pool._workers[0].process).__name__ == "SpawnProcess"
+        finally:
+            pool.stop()
+
+    def test_broken_restarts_give_up(self, model_data):
+        """Remplaçants en échec : délai croissant, puis emplacement abandonné et erreur immédiate"""
+        pool = InferenceWorkerPool(model_data, 1, "latency", max_restarts=2, restart_backoff=0.05)
+        try:
+            pool.start()
+            # Les remplaçants ne peuvent plus construire leur session
+            pool._model = b"pas un modele"
+            pool._workers[0].process.kill()
+
+            deadline = time.monotonic() + 120
+            while not pool.error and time.monotonic() < deadline:
+                time.sleep(0.05)
+
+            assert pool.restarts == 2
+            assert pool.dead.keys() == {0}
+            assert "hors service" in pool.error
+            assert pool.get_stats()["dead"] == [0]
+            with pytest.raises(RuntimeError, match="hors service"):
+                pool.run(make_inputs(1))
+        finally:
+            pool.stop()
+
+    def test_invalid_model_fails_to_start(self):
+        """Un modèle illisible fait échouer le démarrage"""
+        pool = InferenceWorkerPool(b"pas un modele", 1, "latency")
+        with pytest.raises(RuntimeError):
+            pool.start()
+
+    def test_run_after_stop(self, model_data):
+        """Un pool arrêté refuse les inférences"""
+        pool = InferenceWorkerPool(model_data, 1, "latency")
+        pool.start()
+        pool.stop()
+        with pytest.raises(RuntimeError):
+            pool.run(make_inputs(1))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -3,34 +3,61 @@ DIANA - Version Web
 Application web FastAPI modulaire avec composants réutilisables
 """
 
-import io
+import asyncio
 import logging
-import tempfile
-import os
-from pathlib import Path
+import time
+from contextlib import asynccontextmanager
 from typing import Optional
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from PIL import Image
+import psutil
 import uvicorn
 
 import config
 from src.quota_manager import get_quota_manager
 from src.auth_manager import get_auth_manager
 from src.inference_engine import get_inference_engine
+from src.batch_scheduler import get_micro_batcher
+from src.preprocessing import PreparedImage, prepare_image
+from src.dicom import DICOM_EXTENSIONS
+from src.executor import run_cpu_bound, shutdown_cpu_executor
+from src.metrics import (
+    PROMETHEUS_CONTENT_TYPE, PrometheusExposition, get_service_metrics, get_stage_histograms
+)
+from src.timing import StageTimings
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Démarre et arrête les services d'arrière-plan de l'application"""
+    if config.INFERENCE_WORKERS > 0 and not inference_engine.load_model():
+        # Processus d'inférence démarrés par "spawn" (défaut) : le filtre et ses
+        # threads ONNX Runtime existent déjà, un fork pourrait hériter d'un verrou tenu
+        logger.error("❌ Processus d'inférence non démarrés: chargement du modèle impossible")
+    await prediction_batcher.start()
+    warmup_task = asyncio.create_task(warm_up_models()) if config.WARMUP_ON_STARTUP else None
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+    await prediction_batcher.stop()
+    shutdown_cpu_executor()
+    if inference_engine.worker_pool is not None:
+        inference_engine.unload_model()
+
+
 # Créer l'application FastAPI
 app = FastAPI(
     title="DIANA Web",
     description="Diagnostic Intelligent Automatisé - Version Web",
-    version=config.APP_VERSION
+    version=config.APP_VERSION,
+    lifespan=lifespan
 )
 
 # Middleware pour limiter la taille des requêtes (50 MB)
@@ -50,6 +77,22 @@ async def limit_upload_size(request: Request, call_next):
     response = await call_next(request)
     return response
 
+# Middleware de comptage des requêtes (exposées par /metrics)
+@app.middleware("http")
+async def count_requests(request: Request, call_next):
+    """Compte les requêtes par route et statut, et les requêtes en cours"""
+    service_metrics = get_service_metrics()
+    service_metrics.request_started()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Gabarit de la route (ex: /static) plutôt que l'URL : cardinalité bornée
+        route = request.scope.get("route")
+        service_metrics.request_finished(getattr(route, "path", "other"), status_code)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -66,6 +109,7 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 quota_manager = get_quota_manager()
 auth_manager = get_auth_manager()
 inference_engine = get_inference_engine()
+prediction_batcher = get_micro_batcher()
 
 # Initialiser le filtre d'images
 try:
@@ -80,6 +124,34 @@ except Exception as e:
     logger.warning(f"Erreur initialisation filtre web: {e}")
 
 
+# État du préchauffage des modèles (consulté par /api/ready)
+warmup_state = {
+    "ready": not config.WARMUP_ON_STARTUP,
+    "error": None,
+    "duration_ms": None
+}
+
+
+async def warm_up_models():
+    """Charge et préchauffe le filtre puis le classifieur dans le pool CPU"""
+    start_time = time.perf_counter()
+    logger.info("Préchauffage des modèles...")
+    
+    # Le filtre est optionnel : son absence ne bloque pas la disponibilité
+    from src.image_filter import get_image_filter
+    if not await run_cpu_bound(get_image_filter().warmup):
+        logger.warning("⚠️ Filtre d'images non préchauffé - toutes les images seront acceptées")
+    
+    if not await run_cpu_bound(inference_engine.warmup):
+        warmup_state["error"] = "Échec du chargement du modèle de classification"
+        logger.error(f"❌ Préchauffage impossible: {warmup_state['error']}")
+        return
+    
+    warmup_state["duration_ms"] = (time.perf_counter() - start_time) * 1000
+    warmup_state["ready"] = True
+    logger.info(f"✅ Modèles préchauffés en {warmup_state['duration_ms']:.0f} ms - serveur prêt")
+
+
 # ========== ROUTES PRINCIPALES ==========
 
 @app.get("/", response_class=HTMLResponse)
@@ -162,10 +234,17 @@ async def app_page():
 
 # ========== ENDPOINTS API ==========
 
+def _decode_image(contents: bytes) -> PreparedImage:
+    """Décode une seule fois l'image uploadée en mémoire (exécuté dans le pool CPU)"""
+    image = prepare_image(contents, inference_engine.get_input_size())
+    image.decode(image.size_hint)  # Décodage immédiat pour valider l'upload
+    image.content_hash  # Empreinte calculée hors de la boucle (cache et coalescence)
+    return image
+
+
 @app.post("/predict")
 async def predict(file: UploadFile = File(...)):
     """Endpoint de prédiction"""
-    temp_path = None
     try:
         logger.info(f"Réception d'un fichier: {file.filename} ({file.content_type})")
         
@@ -176,24 +255,32 @@ async def predict(file: UploadFile = File(...)):
                 detail="Quota épuisé. Connectez-vous avec un compte Premium."
             )
         
-        # Vérifier le type de fichier
-        if not file.content_type or not file.content_type.startswith('image/'):
+        # Vérifier le type de fichier (les navigateurs n'annoncent pas toujours le DICOM)
+        is_dicom_upload = (
+            file.content_type == 'application/dicom'
+            or (file.filename or '').lower().endswith(DICOM_EXTENSIONS)
+        )
+        if not is_dicom_upload and (not file.content_type or not file.content_type.startswith('image/')):
             raise HTTPException(
                 status_code=400,
-                detail="Le fichier doit être une image (JPG, PNG, BMP, etc.)"
+                detail="Le fichier doit être une image (JPG, PNG, BMP, DICOM, etc.)"
             )
         
         # Lire le contenu du fichier
-        contents = await file.read()
+        request_start = time.perf_counter()
+        timings = StageTimings()
+        with timings.measure("upload_read"):
+            contents = await file.read()
         logger.info(f"Fichier lu: {len(contents)} octets")
         
         if len(contents) == 0:
             raise HTTPException(status_code=400, detail="Le fichier est vide")
         
-        # Vérifier que c'est une image valide
+        # Vérifier que c'est une image valide (décodage hors de la boucle asyncio)
         try:
-            image = Image.open(io.BytesIO(contents))
-            logger.info(f"Image chargée: {image.size}, mode: {image.mode}")
+            with timings.measure("decode"):
+                image = await run_cpu_bound(_decode_image, contents)
+            logger.info(f"Image chargée: {image.size}")
         except Exception as e:
             logger.error(f"Erreur lors du chargement de l'image: {e}")
             raise HTTPException(
@@ -201,48 +288,39 @@ async def predict(file: UploadFile = File(...)):
                 detail=f"Impossible de lire l'image: {str(e)}"
             )
         
-        # Créer un fichier temporaire sécurisé
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        if not file_ext:
-            file_ext = '.png'
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-            temp_path = Path(temp_file.name)
-            image.save(temp_path)
-            logger.info(f"Image sauvegardée temporairement: {temp_path}")
-        
-        # Faire la prédiction
+        # Faire la prédiction en mémoire (regroupée avec les requêtes concurrentes)
         logger.info("Début de la prédiction...")
-        result = inference_engine.predict(temp_path)
+        result = await prediction_batcher.submit(image)
         
         if not result:
             raise HTTPException(status_code=500, detail="Erreur lors de la prédiction")
         
+        # Durées propres au serveur web (lecture, décodage, file d'attente)...
+        timings.add("queue", result.get("batching", {}).get("queue_time_ms", 0.0))
+        get_stage_histograms().observe(timings)
+        # ...puis celles du moteur (filtre, inférence...), déjà agrégées par le moteur
+        timings.update(StageTimings.from_dict(result.get("timings")))
+        total_ms = (time.perf_counter() - request_start) * 1000
+        headers = {"Server-Timing": timings.server_timing(total_ms)}
+        
         # Vérifier si l'image a été rejetée par le filtre
         if result.get("error") and result.get("message"):
             logger.warning(f"Image rejetée: {result['message']}")
             raise HTTPException(
                 status_code=400, 
-                detail=result["message"]
+                detail=result["message"],
+                headers=headers
             )
         
-        logger.info(f"Prédiction réussie: {result['prediction']}")
-        return JSONResponse(content=result)
+        result["timings"] = {**timings.as_dict(), "total_ms": round(total_ms, 2)}
+        logger.info(f"Prédiction réussie: {result['prediction']} ({result['timings']})")
+        return JSONResponse(content=result, headers=headers)
     
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Erreur prédiction: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        # Nettoyer le fichier temporaire
-        if temp_path and temp_path.exists():
-            try:
-                temp_path.unlink()
-                logger.info(f"Fichier temporaire supprimé: {temp_path}")
-            except Exception as e:
-                logger.warning(f"Impossible de supprimer le fichier temporaire: {e}")
 
 
 @app.get("/api/stats")
@@ -251,12 +329,99 @@ async def get_stats():
     return JSONResponse(content=quota_manager.get_stats())
 
 
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Statistiques du cache de résultats"""
+    if inference_engine.result_cache is None:
+        return JSONResponse(content={"enabled": False})
+    return JSONResponse(content={"enabled": True, **inference_engine.result_cache.get_stats()})
+
+
+@app.get("/api/timings")
+async def get_timings():
+    """Histogrammes des durées par étape de prédiction (ms)"""
+    return JSONResponse(content=get_stage_histograms().get_stats())
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Métriques au format texte Prometheus (collecte par un serveur Prometheus local)"""
+    from src.image_filter import get_image_filter
+    
+    service_metrics = get_service_metrics()
+    exposition = PrometheusExposition()
+    
+    exposition.counter(
+        "diana_http_requests_total", "Requêtes HTTP traitées, par route et statut",
+        (({"handler": handler, "status": status}, count)
+         for (handler, status), count in sorted(service_metrics.request_counts().items()))
+    )
+    exposition.gauge("diana_http_requests_in_flight", "Requêtes HTTP en cours", [({}, service_metrics.in_flight)])
+    exposition.histogram(
+        "diana_stage_duration_seconds", "Durée des étapes de prédiction",
+        (({"stage": stage}, histogram) for stage, histogram in get_stage_histograms().items()),
+        scale=0.001
+    )
+    exposition.gauge("diana_batch_queue_depth", "Requêtes en attente dans le micro-batcher", [({}, prediction_batcher.queue_depth)])
+    exposition.histogram("diana_batch_size", "Taille des lots exécutés par le micro-batcher", [({}, service_metrics.batch_sizes)])
+    exposition.counter(
+        "diana_filter_decisions_total", "Images filtrées, par catégorie et décision",
+        (({"category": category, "decision": decision}, count)
+         for (category, decision), count in sorted(service_metrics.filter_decisions().items()))
+    )
+    
+    if inference_engine.result_cache is not None:
+        cache_stats = inference_engine.result_cache.get_stats()
+        exposition.counter(
+            "diana_result_cache_requests_total", "Consultations du cache de résultats",
+            [({"result": "hit"}, cache_stats["hits"]), ({"result": "miss"}, cache_stats["misses"])]
+        )
+        exposition.gauge("diana_result_cache_hit_ratio", "Taux de succès du cache de résultats", [({}, cache_stats["hit_rate"])])
+        exposition.gauge("diana_result_cache_entries", "Entrées en mémoire du cache de résultats", [({}, cache_stats["size"])])
+    
+    load_times = [("classifier", inference_engine.load_time_ms), ("filter", get_image_filter().load_time_ms)]
+    exposition.gauge(
+        "diana_model_load_seconds", "Durée du dernier chargement de chaque modèle (déchiffrement compris)",
+        (({"model": model}, load_time_ms / 1000) for model, load_time_ms in load_times if load_time_ms is not None)
+    )
+    exposition.gauge("diana_model_loaded", "Modèle chargé en mémoire (1) ou non (0)", [
+        ({"model": "classifier"}, int(inference_engine.is_loaded)),
+        ({"model": "filter"}, int(get_image_filter().is_loaded))
+    ])
+    exposition.gauge("diana_process_resident_memory_bytes", "Mémoire résidente du processus web", [({}, psutil.Process().memory_info().rss)])
+    
+    return PlainTextResponse(exposition.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.get("/api/health")
 async def health_check():
     """Health check"""
     return {"status": "ok", "version": config.APP_VERSION}
 
 
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness check : 503 tant que les modèles ne sont pas préchauffés ou si les processus d'inférence sont hors service"""
+    worker_pool = inference_engine.worker_pool
+    if worker_pool is not None and worker_pool.error:
+        return JSONResponse(status_code=503, content={"status": "error", "detail": worker_pool.error})
+    
+    if not warmup_state["ready"]:
+        return JSONResponse(
+            status_code=503,
+            content={
+                "status": "error" if warmup_state["error"] else "warming_up",
+                "detail": warmup_state["error"] or "Préchauffage des modèles en cours"
+            }
+        )
+    
+    return {
+        "status": "ready",
+        "version": config.APP_VERSION,
+        "warmup_ms": warmup_state["duration_ms"]
+    }
+
+
 @app.get("/api/filter/status")
 async def get_filter_status():
     """Statut du filtre d'images"""